@@ -0,0 +1,117 @@
+"""Micro-batching of synchronous jobs executed in an application pool."""
+from asyncio import Future, Task, TimerHandle, create_task, get_running_loop
+from functools import partial
+from typing import Any, Callable
+
+from base.executor import ExecutorKind, Executors
+
+__all__ = ["Batcher"]
+
+
+class Batcher:
+    """Collects jobs into batches, each batch is one call of `func` in the pool.
+
+    A batch is sent when `batch_size` jobs are collected or `delay` seconds after
+    its first job, so under load a trip to the pool is shared by many jobs,
+    and without load a job waits no longer than `delay`.
+    An exception returned by `func` in place of a result is raised to its job only,
+    an exception raised by `func` is raised to every job of the batch.
+    For the process pool `func` must be a module level function,
+    its items and result must be picklable.
+    """
+
+    def __init__(
+        self,
+        func: Callable[..., list[Any]],
+        *args,
+        executor: ExecutorKind = "thread",
+        batch_size: int = 64,
+        delay: float = 0.001,
+    ):
+        """Initialization.
+
+        Args:
+            func: `func(items, *args)` returns a list of results in the order of the items,
+                an exception instance for a failed item
+            args: additional arguments of each call, example: the key
+            executor: pool kind
+            batch_size: maximum number of jobs in one batch
+            delay: maximum time in seconds to wait for the batch to be filled
+        """
+        self.func = func
+        self.args = args
+        self.executor = executor
+        self.batch_size = batch_size
+        self.delay = delay
+        self.batches = 0
+        self.jobs = 0
+        self._items: list[Any] = []
+        self._futures: list[Future] = []
+        self._timer: TimerHandle | None = None
+        self._tasks: set[Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """Add the job to the current batch and wait for its result."""
+        future = get_running_loop().create_future()
+        self._items.append(item)
+        self._futures.append(future)
+        if len(self._items) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = get_running_loop().call_later(self.delay, self._flush)
+        return await future
+
+    async def close(self):
+        """Send the collected jobs and wait for the sent batches."""
+        self._flush()
+        for task in list(self._tasks):
+            await task
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "batches": self.batches,
+            "jobs": self.jobs,
+            "batch_avg": self.jobs / self.batches if self.batches else 0.0,
+        }
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._items:
+            return
+        items, futures = self._items, self._futures
+        self._items, self._futures = [], []
+        task = create_task(self._run(items, futures))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items: list[Any], futures: list[Future]):
+        self.batches += 1
+        self.jobs += len(items)
+        try:
+            results = await get_running_loop().run_in_executor(
+                Executors.get(self.executor), partial(self.func, items, *self.args)
+            )
+        except Exception as e:
+            self._reject(futures, e)
+            return
+        self._resolve(futures, results)
+
+    @staticmethod
+    def _resolve(futures: list[Future], results: list[Any]):
+        for future, result in zip(futures, results):
+            # the job may have been cancelled by the caller
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def _reject(futures: list[Future], error: Exception):
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
@@ -0,0 +1,49 @@
+"""Bloom filter, a probabilistic set without false negatives."""
+from hashlib import blake2b
+from math import ceil, log
+from typing import Iterator
+
+__all__ = ["BloomFilter"]
+
+
+class BloomFilter:
+    """Bloom filter.
+
+    The answer `item not in filter` is always correct,
+    the answer `item in filter` is correct with the probability `1 - error_rate`.
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        """Initialization.
+
+        Args:
+            capacity: expected number of items
+            error_rate: acceptable probability of a false positive answer
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = ceil(-capacity * log(error_rate) / log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        """Bit positions of the item, double hashing on one blake2b digest."""
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        """Add an item to the filter."""
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item)
+        )
+
+    def __len__(self) -> int:
+        return self.count
@@ -0,0 +1,85 @@
+"""In-process cache used in the application."""
+from collections import OrderedDict
+from time import time
+from typing import Any, Hashable, Optional
+
+__all__ = ["LRUCache"]
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Bounded LRU cache with the expiration time of the records.
+
+    Not thread safe, it is intended to be used in the event loop.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        """Initialization.
+
+        Args:
+            max_size: the maximum number of records, the least recently used record is evicted
+            ttl: default lifetime of a record in seconds, None - timeless
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[Any, Optional[float]]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a record.
+
+        Args:
+            key: record key
+            default: returned if the record is not found or expired
+
+        Returns:
+            Any: record value
+        """
+        value, expires = self._data.get(key, (_MISSING, None))
+        if value is _MISSING or (expires is not None and expires <= time()):
+            if value is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, expires: Optional[float] = None):
+        """Save a record.
+
+        Args:
+            key: record key
+            value: record value
+            expires: unix timestamp when the record expires, by default now + `ttl`
+        """
+        if expires is None and self.ttl is not None:
+            expires = time() + self.ttl
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        """Delete a record, if it exists."""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Delete all records."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        """Cache counters, for monitoring."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,184 @@
+"""Circuit breaker and adaptive concurrency limit for calls to external services."""
+from asyncio import Future, get_running_loop, timeout
+from collections import deque
+from math import ceil
+from time import monotonic
+
+__all__ = [
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "AdaptiveLimiter",
+    "ConcurrencyLimitError",
+    "OverloadError",
+]
+
+
+class OverloadError(ConnectionError):
+    """The call is rejected without an attempt, it may be repeated after `retry_after` seconds.
+
+    `headers` are passed to the response, see `ExceptionHandler`.
+    """
+
+    def __init__(self, message: str, retry_after: float = 1):
+        super().__init__(message)
+        self.retry_after = max(1, ceil(retry_after))
+        self.headers = {"Retry-After": str(self.retry_after)}
+
+
+class CircuitOpenError(OverloadError):
+    """The service is considered unavailable, the call is rejected without an attempt."""
+
+
+class ConcurrencyLimitError(OverloadError):
+    """No free slot appeared during the waiting time."""
+
+
+class CircuitBreaker:
+    """Circuit breaker: closed -> open -> half-open -> closed.
+
+    closed - calls are allowed, failures are counted;
+    open - after `failure_threshold` consecutive failures, calls are rejected
+    during `reset_timeout` seconds;
+    half-open - one trial call is allowed, its success closes the circuit,
+    its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 5):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether the call is allowed."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def on_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def on_cancel(self):
+        """The call was cancelled, the result of the trial call is unknown."""
+        self._probing = False
+
+    def on_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = monotonic()
+            self._probing = False
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until a trial call is allowed."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (monotonic() - self.opened_at))
+
+    @property
+    def stats(self) -> dict[str, str | int]:
+        return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+class AdaptiveLimiter:
+    """Concurrency limit adapted by observed latency (AIMD).
+
+    A fast successful call increases the limit additively (by 1/limit),
+    a failure or a call slower than `latency_threshold` decreases it multiplicatively.
+    Calls above the limit wait for a free slot no longer than `wait_timeout`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 5,
+        min_limit: int = 1,
+        max_limit: int = 100,
+        latency_threshold: float = 0.5,
+        backoff_ratio: float = 0.5,
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.backoff_ratio = backoff_ratio
+        self.in_flight = 0
+        self._waiters: deque[Future] = deque()
+
+    async def acquire(self, wait_timeout: float):
+        """Take a slot, waits if all slots are busy.
+
+        Raises:
+            ConcurrencyLimitError: if no slot appeared during `wait_timeout`
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with timeout(wait_timeout):
+                await waiter
+        except TimeoutError:
+            self._abandon(waiter)
+            raise ConcurrencyLimitError(
+                f"Concurrency limit of '{self.name}' is reached: {int(self.limit)}"
+            ) from None
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def release(self, latency: float, success: bool):
+        """Return the slot and adapt the limit.
+
+        Args:
+            latency: duration of the call in seconds
+            success: whether the call was successful
+        """
+        if success and latency <= self.latency_threshold:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        else:
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        self._free_slot()
+
+    def cancel(self):
+        """Return the slot of a cancelled call, the limit is not changed."""
+        self._free_slot()
+
+    def _abandon(self, waiter: Future):
+        """The waiter is no longer waiting: it leaves the queue or returns the given slot."""
+        if waiter.done() and not waiter.cancelled():
+            self._free_slot()
+        elif waiter in self._waiters:
+            self._waiters.remove(waiter)
+
+    def _free_slot(self):
+        """Return the slot and give the free slots to the waiters."""
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        return {"limit": self.limit, "in_flight": self.in_flight, "waiting": len(self._waiters)}
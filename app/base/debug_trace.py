@@ -0,0 +1,58 @@
+"""Debug records, switchable per module."""
+from typing import Any
+
+__all__ = ["DebugTrace"]
+
+
+class DebugTrace:
+    """Debug records of a module.
+
+    Disabled by default, the module is enabled by `LogSettings.debug_modules`.
+    On hot paths the call is guarded, so a disabled trace costs one attribute check
+    and the arguments are not even evaluated:
+
+        trace = DebugTrace(__name__)
+
+        if trace.enabled:
+            trace("token verified", jti=token.jti)
+    """
+
+    __slots__ = ("module", "enabled", "logger")
+    _instances: list["DebugTrace"] = []
+
+    def __init__(self, module: str):
+        self.module = module
+        self.enabled = False
+        self.logger = None
+        self._instances.append(self)
+
+    def __call__(self, message: str, **fields: Any):
+        """Emit the record through the application logger, at the DEBUG level.
+
+        Args:
+            message: what happened
+            fields: data of the record, with loguru they are also bound to the record
+        """
+        if not self.enabled:
+            return
+        text = " ".join([f"{self.module}: {message}", *(f"{k}={v!r}" for k, v in fields.items())])
+        if bind := getattr(self.logger, "bind", None):
+            bind(trace=self.module, **fields).debug(text)
+        else:
+            self.logger.debug(text)
+
+    @classmethod
+    def configure(cls, logger: Any, modules: list[str]):
+        """Enable the traces of the modules.
+
+        Args:
+            logger: application logger
+            modules: names or prefixes of the modules, example: `core.middelware`, `store`,
+            "*" - all modules
+        """
+        for trace in cls._instances:
+            trace.logger = logger
+            trace.enabled = any(
+                module == "*" or trace.module == module or trace.module.startswith(module + ".")
+                for module in modules
+            )
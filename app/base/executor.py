@@ -0,0 +1,74 @@
+"""Application executors for running synchronous code."""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Literal
+
+__all__ = ["ExecutorKind", "Executors"]
+
+ExecutorKind = Literal["thread", "process"]
+
+
+class Executors:
+    """Executors which live for the whole application lifetime.
+
+    thread - a thread pool, for synchronous I/O bound code
+    or code which releases the GIL (hashlib, cryptography);
+    process - an optional process pool, for CPU bound code,
+    the callable and its arguments must be picklable.
+    """
+
+    _pools: dict[str, Executor] = {}
+
+    @classmethod
+    def start(cls, thread_workers: int = None, process_workers: int = 0):
+        """Create the pools.
+
+        A thread pool created by `get` before the start is replaced by the sized one,
+        it is shut down without waiting, its running jobs are finished.
+
+        Args:
+            thread_workers: size of the thread pool, None - the ThreadPoolExecutor default
+            process_workers: size of the process pool, 0 - the process pool is not created
+        """
+        cls._replace("thread", ThreadPoolExecutor(thread_workers, thread_name_prefix="app"))
+        if process_workers:
+            cls._replace("process", ProcessPoolExecutor(process_workers))
+
+    @classmethod
+    def get(cls, kind: ExecutorKind = "thread") -> Executor:
+        """Get a pool.
+
+        The thread pool is created on the first call if the application is not started yet,
+        for example when it is used outside the application.
+
+        Args:
+            kind: kind of the pool
+
+        Returns:
+            object: Executor
+        """
+        if pool := cls._pools.get(kind):
+            return pool
+        if kind == "thread":
+            cls._pools["thread"] = ThreadPoolExecutor(thread_name_prefix="app")
+            return cls._pools["thread"]
+        raise RuntimeError(
+            "The process pool is disabled, set EXECUTOR_PROCESS_WORKERS greater than 0"
+        )
+
+    @classmethod
+    def shutdown(cls):
+        """Stop the pools, waits for the running jobs."""
+        while cls._pools:
+            _, pool = cls._pools.popitem()
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        """Sizes of the started pools."""
+        return {kind: pool._max_workers for kind, pool in cls._pools.items()}  # noqa
+
+    @classmethod
+    def _replace(cls, kind: ExecutorKind, pool: Executor):
+        if (previous := cls._pools.get(kind)) is not None:
+            previous.shutdown(wait=False)
+        cls._pools[kind] = pool
@@ -0,0 +1,181 @@
+"""Metrics of the application, exposed in the Prometheus text format.
+
+Recording is a dictionary update in the process, without locks and I/O,
+so the counters and histograms can be used on the request path.
+Every application process (uvicorn worker) has its own registry.
+"""
+from bisect import bisect_left
+from typing import Callable, Iterator
+
+Labels = tuple[str | int, ...]
+Stats = dict[str, int | float | str]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """Monotonic counter, a value per combination of the label values."""
+
+    __slots__ = ("name", "description", "labels", "values")
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Labels = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str | int, value: float = 1):
+        """Increase the counter, the label values are given in the order of `labels`."""
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        for values, value in self.values.items():
+            yield self.name, format_labels(self.labels, values), value
+
+
+class Histogram:
+    """Distribution of the observed values, in seconds as a rule.
+
+    A series keeps the number of the values of each bucket and their sum,
+    the cumulative counts are calculated at the exposition.
+    """
+
+    __slots__ = ("name", "description", "labels", "buckets", "values")
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self.values: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, *labels: str | int):
+        """Record the value, the label values are given in the order of `labels`."""
+        series = self.values.get(labels)
+        if series is None:
+            # bucket counts, the count of the values above the last bucket, the sum
+            series = self.values[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        for values, series in self.values.items():
+            count = 0
+            for bound, number in zip((*self.buckets, "+Inf"), series):
+                count += number
+                labels = format_labels((*self.labels, "le"), (*values, str(bound)))
+                yield self.name + "_bucket", labels, count
+            labels = format_labels(self.labels, values)
+            yield self.name + "_count", labels, count
+            yield self.name + "_sum", labels, series[-1]
+
+
+class MetricsRegistry:
+    """Registry of the metrics of the process."""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._collectors: dict[str, tuple[str, str, Callable[[], dict[str, Stats]]]] = {}
+
+    def counter(self, name: str, description: str, labels: Labels = ()) -> Counter:
+        """Get a counter, it is created on the first call."""
+        return self._get(Counter, name, description, labels)
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labels: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Get a histogram, it is created on the first call."""
+        return self._get(Histogram, name, description, labels, buckets)
+
+    def collector(
+        self, name: str, description: str, label: str, stats: Callable[[], dict[str, Stats]]
+    ):
+        """Expose the `stats` of the components as gauges.
+
+        The statistics is read at the exposition, so the component is not changed.
+        Every numeric value becomes the gauge `{name}_{key}`, labeled with the component,
+        a string value becomes the gauge `{name}_{key}` equal to 1 with the value in a label.
+
+        Args:
+            name: prefix of the gauge names
+            description: description of the gauges
+            label: name of the label of the component
+            stats: statistics of the components, example: `{"redis": {"state": "closed"}}`
+        """
+        self._collectors[name] = (description, label, stats)
+
+    def render(self) -> str:
+        """Metrics in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {value}" for name, labels, value in metric.samples())
+        for name, (description, label, stats) in self._collectors.items():
+            lines.extend(self._render_stats(name, description, label, stats))
+        return "\n".join(lines) + "\n"
+
+    def _get(self, cls: type, name: str, *args) -> Counter | Histogram:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args)
+        assert isinstance(metric, cls), f"Metric `{name}` is already registered as {metric.kind}"
+        return metric
+
+    @staticmethod
+    def _render_stats(
+        name: str, description: str, label: str, stats: Callable[[], dict[str, Stats]]
+    ) -> list[str]:
+        try:
+            gauges = group_stats(name, label, stats())
+        except Exception as e:  # noqa, a broken component does not break the exposition
+            return [f"# {name}: {str(e)}"]
+        lines = []
+        for gauge, samples in gauges.items():
+            lines.extend((f"# HELP {gauge} {description}", f"# TYPE {gauge} gauge", *samples))
+        return lines
+
+
+def group_stats(name: str, label: str, components: dict[str, Stats]) -> dict[str, list[str]]:
+    """Samples of the gauges, by the name of the gauge."""
+    gauges: dict[str, list[str]] = {}
+    for component, values in components.items():
+        for key, value in values.items():
+            if sample := format_stat(label, component, key, value):
+                gauges.setdefault(f"{name}_{key}", []).append(f"{name}_{key}{sample}")
+    return gauges
+
+
+def format_stat(label: str, component: str, key: str, value: int | float | str) -> str | None:
+    """Labels and value of the gauge, None if the value is not exposed."""
+    if isinstance(value, str):
+        return f"{format_labels((label, key), (component, value))} 1"
+    if isinstance(value, int | float):
+        return f"{format_labels((label,), (component,))} {float(value)}"
+    return None
+
+
+def format_labels(names: Labels, values: Labels) -> str:
+    if not names:
+        return ""
+    labels = ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+    return "{" + labels + "}"
+
+
+def escape(value: str | int) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+REGISTRY = MetricsRegistry()
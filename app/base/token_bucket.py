@@ -0,0 +1,38 @@
+"""Token bucket, in-process rate limit."""
+from time import monotonic
+
+__all__ = ["TokenBucket"]
+
+
+class TokenBucket:
+    """Token bucket.
+
+    The bucket holds up to `capacity` tokens and is refilled with `capacity`
+    tokens per `period` seconds, each call takes one token.
+    """
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = monotonic()
+
+    def take(self) -> float:
+        """Take a token.
+
+        Returns:
+            float: 0 if the token is taken, otherwise seconds until a token is available
+        """
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def refund(self):
+        """Return the taken token, the request was rejected by another limit."""
+        self.tokens = min(self.capacity, self.tokens + 1)
@@ -0,0 +1,167 @@
+"""Export of the kept traces to a file or to an OTLP collector.
+
+The spans are handed over to a background thread through a bounded queue,
+the request is not waiting for the I/O. If the queue is full, the trace is dropped.
+"""
+import json
+from queue import Empty, Full, Queue
+from threading import Thread
+from time import monotonic
+from typing import Callable
+from urllib.request import Request, urlopen
+
+from base.tracing import Span
+
+__all__ = ["SpanExporter", "FileWriter", "OtlpWriter"]
+
+Writer = Callable[[list[Span]], None]
+
+
+class SpanExporter:
+    """Queue of the kept traces, written in batches by a background thread."""
+
+    def __init__(
+        self,
+        writer: Writer,
+        batch_size: int = 512,
+        flush_interval: float = 5,
+        queue_size: int = 1000,
+    ):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue: Queue[list[Span] | None] = Queue(queue_size)
+        self._thread = Thread(target=self._run, name="trace-exporter", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Write the queued traces and stop the thread, blocks until it is done."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def export(self, spans: list[Span]):
+        try:
+            self._queue.put_nowait(spans)
+        except Full:
+            self.dropped += len(spans)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queued": self._queue.qsize(),
+        }
+
+    def _run(self):
+        is_stopped = False
+        while not is_stopped:
+            batch, is_stopped = self._collect()
+            if batch:
+                self._write(batch)
+
+    def _collect(self) -> tuple[list[Span], bool]:
+        """Spans queued during `flush_interval`, no more than `batch_size`.
+
+        Returns:
+            object: spans, True if the exporter is stopped
+        """
+        batch: list[Span] = []
+        deadline = monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                spans = self._queue.get(timeout=max(deadline - monotonic(), 0))
+            except Empty:
+                break
+            if spans is None:
+                return batch, True
+            batch.extend(spans)
+        return batch, False
+
+    def _write(self, batch: list[Span]):
+        try:
+            self.writer(batch)
+            self.exported += len(batch)
+        except Exception:  # noqa, the export must not stop the thread, whatever the reason
+            self.failed += len(batch)
+
+
+class FileWriter:
+    """Spans as JSON lines, appended to the file."""
+
+    def __init__(self, path: str, service: str):
+        self.path = path
+        self.service = service
+
+    def __call__(self, spans: list[Span]):
+        lines = [
+            json.dumps({"service": self.service, **span.as_dict()}, default=str) + "\n"
+            for span in spans
+        ]
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.writelines(lines)
+
+
+class OtlpWriter:
+    """Spans sent to the collector in the OTLP/HTTP JSON format."""
+
+    def __init__(self, endpoint: str, service: str, timeout: float = 5):
+        self.endpoint = endpoint
+        self.service = service
+        self.timeout = timeout
+
+    def __call__(self, spans: list[Span]):
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": otlp_attributes({"service.name": self.service})},
+                    "scopeSpans": [
+                        {"scope": {"name": self.service}, "spans": [otlp_span(s) for s in spans]}
+                    ],
+                }
+            ]
+        }
+        request = Request(
+            self.endpoint,
+            data=json.dumps(payload, default=str).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def otlp_span(span: Span) -> dict:
+    data = {
+        "traceId": f"{span.trace.trace_id:032x}",
+        "spanId": f"{span.span_id:016x}",
+        "name": span.name,
+        "kind": 2 if span is span.trace.root else 1,
+        "startTimeUnixNano": str(span.start),
+        "endTimeUnixNano": str(span.end),
+        "attributes": otlp_attributes(span.attributes),
+        # 1 - ok, 2 - error
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        data["parentSpanId"] = f"{span.parent_id:016x}"
+    return data
+
+
+def otlp_attributes(attributes: dict) -> list[dict]:
+    result = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            result.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            result.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            result.append({"key": key, "value": {"doubleValue": value}})
+        else:
+            result.append({"key": key, "value": {"stringValue": str(value)}})
+    return result
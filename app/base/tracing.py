@@ -0,0 +1,262 @@
+"""Tracing of the requests.
+
+A span is the time of one stage of the request: the request itself, an accessor call,
+a transaction. The current span is kept in a context variable, so the spans created
+in the tasks of the request (`asyncio.gather`) get the right parent.
+A span without a parent starts a new trace.
+
+Head sampling: the trace is kept with the probability `sample_rate`,
+the spans of the dropped traces are not created at all.
+Tail sampling: the spans of every trace are collected, and the trace is kept
+after its end if it failed or took longer than `tail_latency`.
+"""
+from contextvars import ContextVar
+from functools import wraps
+from random import getrandbits, random
+from time import time_ns
+from typing import Any, Callable, Optional, Protocol
+
+__all__ = ["Span", "Trace", "Tracer", "TRACER", "NOOP_SPAN"]
+
+
+class Exporter(Protocol):
+    def export(self, spans: list["Span"]):
+        """Accept the spans of a kept trace, must not block."""
+
+
+class NoopSpan:
+    """Span of a trace which is not recorded, all the methods do nothing."""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any):
+        pass
+
+    def set_error(self, message: str):
+        pass
+
+    def update_name(self, name: str):
+        pass
+
+    def __enter__(self) -> "NoopSpan":
+        return self
+
+    def __exit__(self, *args) -> bool:
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Trace:
+    """Spans of one trace and the sampling decision."""
+
+    __slots__ = ("tracer", "trace_id", "sampled", "recording", "root", "spans", "has_error")
+
+    def __init__(self, tracer: "Tracer", trace_id: int, sampled: bool):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.recording = sampled or tracer.is_tail_sampling
+        self.root: Optional[Span] = None
+        self.spans: list[Span] = []
+        self.has_error = False
+
+    def finish(self, span: "Span"):
+        if not self.recording:
+            return
+        self.spans.append(span)
+        self.has_error = self.has_error or span.error is not None
+        if span is self.root and self.is_kept():
+            self.tracer.export(self.spans)
+
+    def is_kept(self) -> bool:
+        if self.sampled:
+            return True
+        if self.has_error and self.tracer.tail_errors:
+            return True
+        duration = (self.root.end - self.root.start) / 1e9
+        return bool(self.tracer.tail_latency) and duration >= self.tracer.tail_latency
+
+
+class Span:
+    """Recorded span, it is the current span inside the `with` block."""
+
+    __slots__ = (
+        "trace",
+        "span_id",
+        "parent_id",
+        "name",
+        "attributes",
+        "start",
+        "end",
+        "error",
+        "_token",
+    )
+
+    def __init__(self, trace: Trace, parent_id: int | None, name: str, attributes: dict):
+        self.trace = trace
+        self.span_id = getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = self.end = 0
+        self.error: str | None = None
+        if trace.root is None:
+            trace.root = self
+
+    def set(self, **attributes: Any):
+        """Add attributes, example: `span.set(operation="Select")`."""
+        self.attributes.update(attributes)
+
+    def set_error(self, message: str):
+        """Mark the span as failed, without an exception."""
+        self.error = message
+
+    def update_name(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "Span":
+        self.start = time_ns()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end = time_ns()
+        _current.reset(self._token)
+        if isinstance(exc, Exception):
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.trace.finish(self)
+        return False
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": f"{self.trace.trace_id:032x}",
+            "span_id": f"{self.span_id:016x}",
+            "parent_id": f"{self.parent_id:016x}" if self.parent_id else None,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "duration_ms": (self.end - self.start) / 1e6,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current: ContextVar[Span | None] = ContextVar("span", default=None)
+
+
+class Tracer:
+    """Creates the spans, disabled until `configure` is called."""
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.tail_latency = 0.0
+        self.tail_errors = False
+        self.exporter: Exporter | None = None
+
+    @property
+    def is_tail_sampling(self) -> bool:
+        return bool(self.tail_latency) or self.tail_errors
+
+    def configure(
+        self,
+        exporter: Exporter,
+        sample_rate: float = 1.0,
+        tail_latency: float = 0.0,
+        tail_errors: bool = False,
+    ):
+        """Enable the tracing.
+
+        Args:
+            exporter: receiver of the kept traces
+            sample_rate: share of the traces kept at their start (head sampling)
+            tail_latency: the slower traces are kept, seconds, 0 - disabled
+            tail_errors: True - the failed traces are kept
+        """
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.tail_latency = tail_latency
+        self.tail_errors = tail_errors
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.exporter = None
+
+    def span(self, name: str, **attributes: Any) -> Span | NoopSpan:
+        """Child span of the current span, or the root span of a new trace.
+
+        Example:
+            with TRACER.span("postgres.transaction") as span:
+                span.set(operation="Select")
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = _current.get()
+        if parent is None:
+            return self.start_trace(name, **attributes)
+        if not parent.trace.recording:
+            return NOOP_SPAN
+        return Span(parent.trace, parent.span_id, name, attributes)
+
+    def start_trace(
+        self, name: str, traceparent: str | None = None, **attributes: Any
+    ) -> Span | NoopSpan:
+        """Root span of a new trace.
+
+        Args:
+            name: name of the span
+            traceparent: W3C `traceparent` header of the caller, its trace is continued
+            attributes: attributes of the span
+
+        Returns:
+            object: span, its trace is not recorded if it is not sampled
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        caller = parse_traceparent(traceparent) if traceparent else None
+        if caller:
+            trace_id, parent_id, sampled = caller
+        else:
+            trace_id, parent_id, sampled = getrandbits(128), None, random() < self.sample_rate
+        return Span(Trace(self, trace_id, sampled), parent_id, name, attributes)
+
+    def current(self) -> Span | NoopSpan:
+        """The current span, to add attributes to it."""
+        span = _current.get()
+        return span if span is not None and span.trace.recording else NOOP_SPAN
+
+    def traced(self, name: str = None) -> Callable:
+        """Decorator, the coroutine is executed in a span, named by the function by default."""
+
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__qualname__
+
+            @wraps(func)
+            async def inner(*args, **kwargs):
+                with self.span(span_name):
+                    return await func(*args, **kwargs)
+
+            return inner
+
+        return decorator
+
+    def export(self, spans: list[Span]):
+        if self.exporter is not None:
+            self.exporter.export(spans)
+
+
+def parse_traceparent(header: str) -> tuple[int, int, bool] | None:
+    """Trace id, parent span id and sampled flag, None if the header is invalid."""
+    try:
+        version, trace_id, parent_id, flags = header.strip().split("-")
+        trace_id, parent_id = int(trace_id, 16), int(parent_id, 16)
+        assert len(version) == 2 and trace_id and parent_id
+        return trace_id, parent_id, bool(int(flags, 16) & 1)
+    except (ValueError, AssertionError):
+        return None
+
+
+TRACER = Tracer()
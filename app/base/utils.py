@@ -1,23 +1,30 @@
 """Полезные утилиты используемые в приложении."""
 import logging
-from asyncio import (Event, Semaphore, create_task, get_event_loop, sleep,
-                     wait_for)
+from asyncio import get_running_loop, sleep, timeout
 from collections import defaultdict
-from concurrent import futures
-from functools import wraps
+from functools import partial, wraps
 from inspect import iscoroutinefunction
 from random import randint
 from typing import Any, Callable, Type
 from uuid import uuid4
 
-__all__ = ["TryRun", "try_run", "before_execution"]
+from base.circuit_breaker import (AdaptiveLimiter, CircuitBreaker,
+                                  CircuitOpenError, OverloadError)
+from base.executor import ExecutorKind, Executors
+from base.metrics import REGISTRY
+from base.tracing import TRACER
 
+__all__ = ["TryRun", "try_run", "before_execution"]
 
-async def timeout(event: Event, time_out: int) -> True:
-    """Вспомогательная функция которая по истечению time_out снимает блокировку с события event."""
-    await sleep(time_out)
-    event.set()
-    return True
+CALL_SECONDS = REGISTRY.histogram(
+    "call_seconds", "Time of an attempt of the wrapped method", ("group", "method", "status")
+)
+CALL_RETRIES = REGISTRY.counter(
+    "call_retries_total", "Repeated attempts of the wrapped method", ("method",)
+)
+CALL_FAILURES = REGISTRY.counter(
+    "call_failures_total", "Calls failed after all the attempts", ("method",)
+)
 
 
 def delta_time() -> float:
@@ -35,11 +42,13 @@ class TryRun:
     Который оборачивает все методы декларируемого класса в декоратор.
     Cуть, которого пытаться выполнить метод в течении некоторого времени.
     В соучастии неуспеха по умолчанию инициализирует ошибке которая была вызвана внутри декоратора.
-    Декоратор снабжен семафором, на случай если ограничения попыток
-    одновременного выполнения одних и тех же методов с одного инстанса."""
+    Каждая группа снабжена предохранителем (circuit breaker) и адаптивным ограничением
+    количества одновременных вызовов. Пока сервис недоступен, вызовы группы сразу
+    завершаются ошибкой `CircuitOpenError`, а не копятся в очереди."""
 
     __groups = defaultdict(set)
-    __semaphores: dict[str, Semaphore] = {}
+    __breakers: dict[str, CircuitBreaker] = {}
+    __limiters: dict[str, AdaptiveLimiter] = {}
 
     def __init__(
         self,
@@ -49,6 +58,11 @@ class TryRun:
         raise_exception: bool = True,
         fix_error: Callable = None,
         group: str = None,
+        exclude: tuple[str, ...] = (),
+        failure_threshold: int = 5,
+        reset_timeout: float = 5,
+        max_concurrency: int = 100,
+        executor: ExecutorKind = "thread",
     ):
         """Инициализация, задание параметров работы декоратора.
 
@@ -57,11 +71,20 @@ class TryRun:
             будут попытки выполнить декорируемую функцию.
             request_timeout: Время между попытками.
             logger: объект логирования
-            raise_exception: False - При не возможности выполнить функцию в конце будет возвращен None
-            True - возвращаться исключение
-            fix_error: Функция будет запускать при неудачной попытки исполнения декорируемой функции.
+            raise_exception: False - При не возможности выполнить функцию в конце будет
+            возвращен None, True - возвращаться исключение
+            fix_error: Функция будет запускать при неудачной попытки исполнения
+            декорируемой функции.
             group: группа к которой будет зачислин декарированный клас, это позволяет ограничить
             количество попыток одновременно выполнить тот или иной метод во время падения.
+            exclude: имена методов, которые не нужно оборачивать в декоратор.
+            failure_threshold: количество неудач подряд, после которого предохранитель группы
+            размыкается.
+            reset_timeout: время в секундах, через которое разомкнутый предохранитель
+            пропускает пробный вызов.
+            max_concurrency: верхняя граница адаптивного ограничения одновременных вызовов.
+            executor: пул для синхронных методов: "thread" - пул потоков,
+            "process" - пул процессов.
         Returns:
               object: результат исполнения.
         """
@@ -71,15 +94,25 @@ class TryRun:
         self.raise_exception = raise_exception
         self.fix_error = fix_error
         self.group_name = group
+        self.exclude = exclude
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_concurrency = max_concurrency
+        self.executor = executor
 
     def __call__(self, cls, *args, **kwargs):
         """Преобразование декорируемого класса"""
         if self.group_name is None:
             self.group_name = cls.__name__ + "_" + uuid4().hex[:6]
         self.__groups[self.group_name].add(cls)
-        self.__semaphores[self.group_name] = Semaphore(5)
+        self.__breakers[self.group_name] = CircuitBreaker(
+            self.group_name, self.failure_threshold, self.reset_timeout
+        )
+        self.__limiters[self.group_name] = AdaptiveLimiter(
+            self.group_name, max_limit=self.max_concurrency, latency_threshold=self.request_timeout
+        )
         for name, method in cls.__dict__.items():
-            if isinstance(method, Callable):
+            if isinstance(method, Callable) and name not in self.exclude:
                 setattr(
                     cls,
                     name,
@@ -90,6 +123,7 @@ class TryRun:
                         self.raise_exception,
                         self.fix_error,
                         group=self.group_name,
+                        executor=self.executor,
                     )(method),
                 )
         return cls
@@ -102,6 +136,7 @@ class TryRun:
         raise_exception: bool = False,
         fix_error: Callable = None,
         group=None,
+        executor: ExecutorKind = "thread",
     ) -> Any:
         """Декоратор, который пытается выполнить входящий вызываемый объект.
 
@@ -110,55 +145,46 @@ class TryRun:
         В случае неудачной попытки, засыпает на время указанное в `request_timeout` + delta_time(),
         и делает следующею попытку до тех пор, пока не наступит одно из событий:
             1. Общее время выполнения превысило `total_timeout`, и тогда возвращается None
-            2. Вызываемый объект `func` выполнился, и тогда возвращается результат выполнения `func`.
-        `raise_exception` - True: в конце выполнения функции при не удачной попытки инициализируется исключение.
+            2. Вызываемый объект `func` выполнился, и тогда возвращается результат `func`.
+        `raise_exception` - True: в конце выполнения функции при не удачной попытки
+                            инициализируется исключение.
                           - False: в конце выполнения функции при не удачной попытки вернется None
-        `fix_error`: вызываемый объект, задача которого попробовать исправить ошибку, возникшую в результате выполнения.
+        `fix_error`: вызываемый объект, задача которого попробовать исправить ошибку,
+                     возникшую в результате выполнения.
 
-        Неудачная попытка выводится в лог. В качестве люггера по умолчанию можно использовать loguru
-        https://pypi.org/project/loguru/
+        Неудачная попытка выводится в лог. В качестве люггера по умолчанию можно использовать
+        loguru https://pypi.org/project/loguru/
         """
 
         def func_wrapper(func: Callable):
             @wraps(func)
             async def inner(*args, **kwargs):
-                # по сути засекаем время которое будет работать цикл
-                event = Event()  # event блокирует выход из цикла
-                create_task(timeout(event, total_timeout))
-                error = None
-                delta = 0
-                async with self.__semaphores[group]:
-                    while not event.is_set():
-                        try:
-                            if error and fix_error:
-                                fix_task = create_task(run_method(fix_error, *args, **kwargs))
-                                await wait_for(fix_task, request_timeout)
-                            task = create_task(run_method(func, *args, **kwargs))
-                            result = await wait_for(task, request_timeout)
-                            # отменяем запущенный таймаут если он еще не кончился
-                            if not task.done():
-                                task.cancel()
-
-                            return result
-                        except Exception as ex:
-                            error = ex
-                            sec = randint(delta, delta + 1) + delta_time()
-                            logger.error(
-                                f"Error during execution of the called object '{func.__name__}': : {str(ex)}"
-                            )
-                            if delta < request_timeout:
-                                delta += 1
-                        await sleep(sec)
-
-                logger.warning(f" Failed to execute: {func.__name__}")
-                if raise_exception:
-                    raise error
-                return None
+                return await retry_call(
+                    func,
+                    args,
+                    kwargs,
+                    total_timeout,
+                    request_timeout,
+                    logger,
+                    raise_exception,
+                    fix_error,
+                    self.__breakers[group],
+                    self.__limiters[group],
+                    executor,
+                )
 
             return inner
 
         return func_wrapper
 
+    @classmethod
+    def get_state(cls) -> dict[str, dict[str, Any]]:
+        """Состояние групп для мониторинга: предохранитель и ограничение одновременных вызовов."""
+        return {
+            group: {**cls.__breakers[group].stats, **cls.__limiters[group].stats}
+            for group in cls.__breakers
+        }
+
 
 def try_run(
     cls=None,
@@ -167,6 +193,7 @@ def try_run(
     logger: logging.Logger = logging.getLogger(),
     raise_exception: bool = False,
     fix_error: Callable = None,
+    executor: ExecutorKind = "thread",
 ):
     lst = []
 
@@ -178,7 +205,12 @@ def try_run(
                     typ,
                     name,
                     before_execution(
-                        total_timeout, request_timeout, logger, raise_exception, fix_error
+                        total_timeout,
+                        request_timeout,
+                        logger,
+                        raise_exception,
+                        fix_error,
+                        executor,
                     )(method),
                 )
         return typ
@@ -194,6 +226,7 @@ def before_execution(
     logger: logging.Logger = logging.getLogger(),
     raise_exception: bool = False,
     fix_error: Callable = None,
+    executor: ExecutorKind = "thread",
 ) -> Any:
     """Декоратор, который пытается выполнить входящий вызываемый объект.
 
@@ -202,10 +235,13 @@ def before_execution(
     В случае неудачной попытки, засыпает на время указанное в `request_timeout` + delta_time(),
     и делает следующею попытку до тех пор, пока не наступит одно из событий:
         1. Общее время выполнения превысило `total_timeout`, и тогда возвращается None
-        2. Вызываемый объект `func` выполнился, и тогда возвращается результат выполнения `func`.
-    `raise_exception` - True: в конце выполнения функции при не удачной попытки инициализируется исключение.
+        2. Вызываемый объект `func` выполнился, и тогда возвращается результат `func`.
+    `raise_exception` - True: в конце выполнения функции при не удачной попытки
+                        инициализируется исключение.
                       - False: в конце выполнения функции при не удачной попытки вернется None
-    `fix_error`: вызываемый объект, задача которого попробовать исправить ошибку, возникшую в результате выполнения.
+    `fix_error`: вызываемый объект, задача которого попробовать исправить ошибку,
+                 возникшую в результате выполнения.
+    `executor`: пул для синхронного `func`: "thread" - пул потоков, "process" - пул процессов.
 
     Неудачная попытка выводится в лог. В качестве люггера по умолчанию можно использовать loguru
     https://pypi.org/project/loguru/
@@ -214,46 +250,207 @@ def before_execution(
     def func_wrapper(func: Callable):
         @wraps(func)
         async def inner(*args, **kwargs):
-            # по сути засекаем время которое будет работать цикл
-            event = Event()  # event блокирует выход из цикла
-            create_task(timeout(event, total_timeout))
-            error = None
-            delta = 0
-            while not event.is_set():
-                try:
-                    if error and fix_error:
-                        fix_task = create_task(run_method(fix_error, *args, **kwargs))
-                        await wait_for(fix_task, request_timeout)
-                    task = create_task(run_method(func, *args, **kwargs))
-                    result = await wait_for(task, request_timeout)
-                    # отменяем запущенный таймаут если он еще не кончился
-                    if not task.done():
-                        task.cancel()
-
-                    return result
-                except Exception as ex:
-                    error = ex
-                    sec = randint(delta, delta + 1) + delta_time()
-                    logger.error(
-                        f"Error during execution of the called object '{func.__name__}': : {str(ex)}"
-                    )
-                    if delta < request_timeout:
-                        delta += 1
-                await sleep(sec)
-
-            logger.warning(f" Failed to execute: {func.__name__}")
-            if raise_exception:
-                raise error
-            return None
+            return await retry_call(
+                func,
+                args,
+                kwargs,
+                total_timeout,
+                request_timeout,
+                logger,
+                raise_exception,
+                fix_error,
+                executor=executor,
+            )
 
         return inner
 
     return func_wrapper
 
 
+async def retry_call(
+    func: Callable,
+    args: tuple,
+    kwargs: dict,
+    total_timeout: float,
+    request_timeout: float,
+    logger: logging.Logger,
+    raise_exception: bool,
+    fix_error: Callable = None,
+    breaker: CircuitBreaker = None,
+    limiter: AdaptiveLimiter = None,
+    executor: ExecutorKind = "thread",
+) -> Any:
+    """Движок повторных попыток для `before_execution`.
+
+    Общее время работы ограничивается сроком (deadline), а время попытки - `asyncio.timeout`,
+    поэтому при успешном вызове не создается ни одной дополнительной задачи (Task).
+    Корутины вызываются напрямую, синхронные объекты через `run_method` в пуле `executor`.
+    Если задан предохранитель `breaker` и он разомкнут, попытки прекращаются сразу,
+    как и при отказе ограничения одновременных вызовов (`OverloadError`):
+    повтор только увеличил бы очередь, вызывающий получает 503 с Retry-After.
+    """
+    loop = get_running_loop()
+    deadline = loop.time() + total_timeout
+    error = None
+    delta = 0
+    while True:
+        try:
+            check_breaker(breaker)
+            # после неудачной попытки сначала вызывается `fix_error`
+            repair = fix_error if error else None
+            return await attempt(
+                func, args, kwargs, request_timeout, repair, breaker, limiter, executor
+            )
+        except OverloadError as ex:
+            error = ex
+            break
+        except Exception as ex:
+            error = ex
+            logger.error(
+                f"Error during execution of the called object '{func.__name__}': : {str(ex)}"
+            )
+        sec, delta = pause(delta, request_timeout)
+        if loop.time() + sec >= deadline:
+            break
+        CALL_RETRIES.inc(func.__qualname__)
+        await sleep(sec)
+    return give_up(func, error, logger, raise_exception)
+
+
+def check_breaker(breaker: CircuitBreaker | None):
+    """Проверка предохранителя перед попыткой.
+
+    Raises:
+        CircuitOpenError: предохранитель разомкнут, вызов не выполняется
+    """
+    if breaker is not None and not breaker.allow():
+        raise CircuitOpenError(
+            f"Service '{breaker.name}' is unavailable, try again later", breaker.retry_after
+        )
+
+
+async def attempt(
+    func: Callable,
+    args: tuple,
+    kwargs: dict,
+    request_timeout: float,
+    fix_error: Callable = None,
+    breaker: CircuitBreaker = None,
+    limiter: AdaptiveLimiter = None,
+    executor: ExecutorKind = "thread",
+) -> Any:
+    """Одна попытка: вызов `fix_error`, если он задан, затем вызов `func`."""
+    if fix_error is not None:
+        async with timeout(request_timeout):
+            await run_method(fix_error, *args, executor=executor, **kwargs)
+    return await guarded_call(func, args, kwargs, request_timeout, breaker, limiter, executor)
+
+
+def pause(delta: int, request_timeout: float) -> tuple[float, int]:
+    """Время ожидания перед следующей попыткой, растет с каждой попыткой до `request_timeout`.
+
+    Returns:
+        tuple: секунды ожидания, новое значение `delta`
+    """
+    sec = randint(delta, delta + 1) + delta_time()
+    if delta < request_timeout:
+        delta += 1
+    return sec, delta
+
+
+def give_up(func: Callable, error: Exception, logger: logging.Logger, raise_exception: bool):
+    """Завершение после всех неудачных попыток: исключение или None."""
+    CALL_FAILURES.inc(func.__qualname__)
+    logger.warning(f" Failed to execute: {func.__name__}")
+    if raise_exception:
+        raise error
+    return None
+
+
+async def guarded_call(
+    func: Callable,
+    args: tuple,
+    kwargs: dict,
+    request_timeout: float,
+    breaker: CircuitBreaker = None,
+    limiter: AdaptiveLimiter = None,
+    executor: ExecutorKind = "thread",
+) -> Any:
+    """Одна попытка выполнения с учетом предохранителя и ограничения одновременных вызовов.
+
+    Если слот не получен (`ConcurrencyLimitError`), сервис не вызывался,
+    поэтому это не считается неудачей предохранителя.
+    """
+    await acquire_slot(breaker, limiter, request_timeout)
+    started = get_running_loop().time()
+    try:
+        # a span per attempt, the retries are seen in the trace
+        with TRACER.span(func.__qualname__, group=getattr(breaker, "name", "")):
+            async with timeout(request_timeout):
+                result = await invoke(func, args, kwargs, executor)
+    except Exception:
+        finish_attempt(func, breaker, limiter, get_running_loop().time() - started, False)
+        raise
+    except BaseException:
+        cancel_attempt(breaker, limiter)
+        raise
+    finish_attempt(func, breaker, limiter, get_running_loop().time() - started, True)
+    return result
+
+
+async def acquire_slot(
+    breaker: CircuitBreaker | None, limiter: AdaptiveLimiter | None, wait_timeout: float
+):
+    """Получить слот ограничения одновременных вызовов.
+
+    Raises:
+        ConcurrencyLimitError: слот не получен, пробный вызов предохранителя не состоялся
+    """
+    if limiter is None:
+        return
+    try:
+        await limiter.acquire(wait_timeout)
+    except BaseException:
+        if breaker is not None:
+            breaker.on_cancel()
+        raise
+
+
+async def invoke(func: Callable, args: tuple, kwargs: dict, executor: ExecutorKind) -> Any:
+    """Вызов: корутина вызывается напрямую, синхронный объект в пуле `executor`."""
+    if iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+    return await run_method(func, *args, executor=executor, **kwargs)
+
+
+def finish_attempt(
+    func: Callable,
+    breaker: CircuitBreaker | None,
+    limiter: AdaptiveLimiter | None,
+    elapsed: float,
+    success: bool,
+):
+    """Учет завершенной попытки: метрика, ограничение одновременных вызовов, предохранитель."""
+    status = "ok" if success else "error"
+    CALL_SECONDS.observe(elapsed, getattr(breaker, "name", ""), func.__qualname__, status)
+    if limiter is not None:
+        limiter.release(elapsed, success)
+    if breaker is not None:
+        breaker.on_success() if success else breaker.on_failure()
+
+
+def cancel_attempt(breaker: CircuitBreaker | None, limiter: AdaptiveLimiter | None):
+    """Вызов отменен, это не говорит о состоянии сервиса."""
+    if limiter is not None:
+        limiter.cancel()
+    if breaker is not None:
+        breaker.on_cancel()
+
+
 def backoff(
     request_timeout: int = 3,
     logger: logging.Logger = logging.getLogger(),
+    executor: ExecutorKind = "thread",
 ) -> Any:
     """Декоратор, который пытается выполнить входящий вызываемый объект.
 
@@ -271,12 +468,13 @@ def backoff(
         async def inner(*args, **kwargs):
             while True:
                 try:
-                    task = create_task(run_method(func, *args, **kwargs))
-                    return await wait_for(task, request_timeout)
+                    async with timeout(request_timeout):
+                        return await run_method(func, *args, executor=executor, **kwargs)
                 except Exception as ex:
                     sec = randint(0, 1) + delta_time()
                     logger.error(
-                        f"Error during execution of the called object '{func.__name__}': : {str(ex)}"
+                        f"Error during execution of the called object '{func.__name__}':"
+                        f" : {str(ex)}"
                     )
                 await sleep(sec)
 
@@ -285,31 +483,27 @@ def backoff(
     return func_wrapper
 
 
-async def run_method(func: Callable, *args, **kwargs) -> Any:
+async def run_method(func: Callable, *args, executor: ExecutorKind = "thread", **kwargs) -> Any:
     """
     Запускает переданный вызываемый объект.
 
     В соответствии от типа, если объект не поддерживает асинхронный запуск
-    он запускается в отдельном пуле. В случае возникновения ошибки в процессе исполнения объекта будет
-    возвращено исключение.
+    он запускается в общем пуле приложения `executor`. В случае возникновения ошибки в процессе
+    исполнения объекта исключение пробрасывается дальше без изменений.
     :param func: Любой объект который можно вызвать. Пример: foo()
+    :param executor: пул для синхронного объекта: "thread" - пул потоков, для ввода-вывода,
+    "process" - пул процессов, для вычислений, объект и аргументы должны сериализоваться pickle.
     :param kwargs: именованные атрибуты для запуска. Пример: foo(**kwargs)
     :return: какой-то результат
     """
     try:
         if iscoroutinefunction(func):
-            if args or kwargs:
-                return await func(*args, **kwargs)
-            else:
-                return await func()
-        elif kwargs:
-            with futures.ProcessPoolExecutor() as pool:
-                return await get_event_loop().run_in_executor(pool, func, *args, *kwargs.values())
-        else:
-            with futures.ProcessPoolExecutor() as pool:
-                return await get_event_loop().run_in_executor(pool, func)
+            return await func(*args, **kwargs)
+        return await get_running_loop().run_in_executor(
+            Executors.get(executor), partial(func, *args, **kwargs)
+        )
     except Exception as e:
         # конкретную ошибку не отследить так как она зависит от вызываемого метода,
         # который может быть чем угодно
         logging.error(f"Error during execution of the called object '{func.__name__}': : {str(e)}")
-        raise Exception(str(e))
+        raise
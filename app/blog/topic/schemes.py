@@ -78,6 +78,11 @@ query_page_size: int = Query(
     gt=0,
     le=100,
 )
+query_cursor: str = Query(
+    default=None,
+    description="Cursor of the previous page, it is returned in the `X-Next-Cursor` header. "
+    "If specified, the page number is ignored",
+)
 query_sort_topic_id: Sorted_direction = Query(
     default=None,
     description="Sort unique identification of topic",
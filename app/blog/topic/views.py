@@ -4,12 +4,14 @@ from uuid import UUID
 
 from base.type_hint import Sorted_direction
 from blog.topic.schemes import (TopicSchemaIn, TopicSchemaOut,
-                                TopicSchemaUpdateIn, query_page_number,
-                                query_page_size, query_sort_created,
-                                query_sort_description, query_sort_modified,
-                                query_sort_title, query_sort_topic_id)
+                                TopicSchemaUpdateIn, query_cursor,
+                                query_page_number, query_page_size,
+                                query_sort_created, query_sort_description,
+                                query_sort_modified, query_sort_title,
+                                query_sort_topic_id)
 from core.components import Request
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from store.blog.models import TopicModel
 
 topic_route = APIRouter(prefix="/topic", tags=["TOPIC"])
 
@@ -65,18 +67,20 @@ async def delete_topic(request: Request, id_topic: UUID) -> Any:
 async def get_topic(request: Request, id_topic: UUID) -> Any:
     topic_data = await request.app.store.blog.get_topic_by_id(id_topic.hex)
     assert topic_data, f"Topic with id '{id_topic}' not found."
-    return TopicSchemaOut(**topic_data.as_dict())
+    return TopicSchemaOut(**topic_data)
 
 
 @topic_route.get(
     "/get",
     summary="Получить темы ",
-    description="Получить темы согласно условию пагинации .",
+    description="Получить темы согласно условию пагинации. "
+    "Курсор следующей страницы возвращается в заголовке `X-Next-Cursor`.",
     response_description="Список тем",
     response_model=list[TopicSchemaOut],
 )
 async def get_topic(
     request: Request,
+    response: Response,
     page: int = query_page_number,
     size: int = query_page_size,
     id: Sorted_direction = query_sort_topic_id,
@@ -84,11 +88,19 @@ async def get_topic(
     description: Sorted_direction = query_sort_description,
     created: Sorted_direction = query_sort_created,
     modified: Sorted_direction = query_sort_modified,
+    cursor: str = query_cursor,
 ) -> Any:
-    sorted_params = {
-        name: value
-        for index, (name, value) in enumerate(locals().items())
-        if int(index) > 2 and value
+    sort_fields = {
+        "id": id,
+        "title": title,
+        "description": description,
+        "created": created,
+        "modified": modified,
     }
-    topic_data = await request.app.store.blog.get_topics(page - 1, size, sorted_params)
-    return [TopicSchemaOut(**topic.as_dict()) for topic in topic_data]
+    sorted_params = {name: value for name, value in sort_fields.items() if value}
+    topic_data = await request.app.store.blog.get_topics(page - 1, size, sorted_params, cursor)
+    if len(topic_data) == size and (
+        next_cursor := request.app.postgres.get_cursor(TopicModel, topic_data[-1], sorted_params)
+    ):
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [TopicSchemaOut(**topic) for topic in topic_data]
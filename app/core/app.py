@@ -3,6 +3,7 @@
 from core.components import Application
 # from core.exceptions import setup_exception
 from core.logger import setup_logging
+from core.metrics import setup_metrics
 from core.middelware import setup_middleware
 from core.routes import setup_routes
 from core.settings import Settings
@@ -15,6 +16,7 @@ def setup_app() -> Application:
     application.settings = Settings()
     setup_logging(application)
     setup_store(application)
+    setup_metrics(application)
     setup_middleware(application)
     # setup_exception(application)
     setup_routes(application)
@@ -10,7 +10,9 @@ from fastapi.openapi.utils import get_openapi
 from starlette.datastructures import State
 from store.database.postgres import Postgres
 from store.database.redis import RedisAccessor
+from store.executor.accessor import ExecutorAccessor
 from store.store import Store
+from store.tracing.accessor import TracingAccessor
 
 
 class Application(FastAPI):
@@ -24,6 +26,8 @@ class Application(FastAPI):
     store: Store
     redis: RedisAccessor
     postgres: Postgres
+    executor: ExecutorAccessor
+    tracing: TracingAccessor
     logger: logging.Logger
 
     def __init__(self):
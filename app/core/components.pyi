@@ -7,7 +7,9 @@ from fastapi import FastAPI
 from fastapi import Request as FastAPIRequest
 from store.database.postgres import Postgres
 from store.database.redis import RedisAccessor
+from store.executor.accessor import ExecutorAccessor
 from store.store import Store
+from store.tracing.accessor import TracingAccessor
 
 class Application(FastAPI):
     """Application главный класс.
@@ -20,6 +22,8 @@ class Application(FastAPI):
     settings: Settings
     redis: RedisAccessor
     postgres: Postgres
+    executor: ExecutorAccessor
+    tracing: TracingAccessor
     logger: logging.Logger
 
 class Request(FastAPIRequest):
@@ -1,27 +1,54 @@
+import json
 import logging
 import re
 import traceback
+from dataclasses import dataclass
 from logging import Logger
+from typing import Callable
 
+from base.circuit_breaker import OverloadError
+from base.debug_trace import DebugTrace
 from core.utils import HTTP_EXCEPTION
 from httpcore import URL
-from icecream import ic
+from jose import JWSError
+from sqlalchemy.exc import IntegrityError, ProgrammingError
 from starlette import status
-from starlette.responses import JSONResponse
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+
+
+trace = DebugTrace(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class ErrorResult:
+    """Ответ на конкретное исключение, создается заново для каждой ошибки."""
+
+    message: str
+    status_code: int = status.HTTP_400_BAD_REQUEST
+    level: int = logging.WARNING
+
+
+Handler = Callable[[Exception], ErrorResult]
+
+
+def encode_prefix(status_code: int) -> bytes:
+    """Начало тела ответа с ошибкой, до сообщения пользователю."""
+    detail = json.dumps(HTTP_EXCEPTION.get(status_code), ensure_ascii=False)
+    return f'{{"detail":{detail},"message":'.encode()
 
 
 class ExceptionHandler:
-    handlers = {}
+    """Формирует ответ на исключение, возникшее при обработке запроса.
 
-    def __init__(
-        self,
-    ):
-        self.exception = Exception("Unknown error...")
-        self.logger = Logger(__name__)
-        self.level = logging.WARNING
-        self.message = "Unknown error..."
-        self.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
-        self.is_traceback = False
+    Экземпляр не хранит состояния запроса, поэтому один объект middleware
+    безопасно обслуживает одновременные запросы.
+    Обработчик ищется по MRO типа исключения, результат поиска запоминается для типа.
+    """
+
+    handlers: dict[type[Exception], Handler] = {}
+    _resolved: dict[type[Exception], Handler] = {}
+    _prefixes: dict[int, bytes] = {code: encode_prefix(code) for code in HTTP_EXCEPTION}
 
     def __call__(
         self,
@@ -29,111 +56,154 @@ class ExceptionHandler:
         url: URL,
         logger: Logger = None,
         is_traceback: bool = False,
-    ) -> JSONResponse:
-        self.exception = exception
-        self.logger = logger
-        self.is_traceback = is_traceback
-        if handler := self.handlers.get(exception.__class__.__name__):
-            handler(self)  # noqa
-        else:
-            self.handler_unknown_error()
-        return self.error_response(url)
-
-    def handler_unknown_error(self):
-        """Обработчик исключений связанных с исключениями которые не учтены в приложении.
-
-        Выводится сообщение в лог, о том что нужно строчно решить проблему.
-        """
-        self.message = "Unknown error..."
-        self.status_code = status.HTTP_400_BAD_REQUEST
-        self.level = logging.WARNING
-
-    def handler_connection_to_error(self):
-        """Обработчик исключений связанных с подключением к внешним источникам.
-
-        Как пример обработка ошибки подключения к БД PostgresSQL.
-        """
-        self.message = "Failed to connect, try again later..."
-        self.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
-        self.level = logging.CRITICAL
-
-    def handler_assertion_error(self):
-        """Обработчик исключения AssertionError.
-
-        Чаще всего возникают в случаи обработки неправильных данных от пользователя.
-        """
-        if isinstance(self.exception.args[0], list):
-            self.message, *status_code = self.exception.args[0]
-            self.status_code = status_code[0]
-        else:
-            self.message = self.exception.args[0]
-            self.status_code = status.HTTP_400_BAD_REQUEST
-        self.level = logging.INFO
-
-    def handler_integrity_error_error(self):
-        """Обработчик исключения IntegrityError."""
-        key, value = get_error_content(self.exception.args[0])
-        self.message = (
-            f"{key.capitalize()} is already in use, try other {key}, not these `{value}`"
+    ) -> Response:
+        result = self.resolve(type(exception))(exception)
+        self.log(result, exception, url, logger, is_traceback)
+        return self.error_response(result, getattr(exception, "headers", None))
+
+    @classmethod
+    def register(cls, *exceptions: type[Exception]) -> Callable[[Handler], Handler]:
+        """Регистрирует обработчик для исключений и их наследников."""
+
+        def wrapper(handler: Handler) -> Handler:
+            for exception in exceptions:
+                cls.handlers[exception] = handler
+            cls._resolved.clear()
+            return handler
+
+        return wrapper
+
+    @classmethod
+    def resolve(cls, exception: type[Exception]) -> Handler:
+        """Обработчик ближайшего по MRO зарегистрированного типа."""
+        if handler := cls._resolved.get(exception):
+            return handler
+        handler = next(
+            (cls.handlers[base] for base in exception.__mro__ if base in cls.handlers),
+            handler_unknown_error,
         )
-        self.status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
-        self.level = logging.INFO
-
-    def handler_http_exception(self):
-        ic(self.exception)
-        if hasattr(self.exception, "status_code"):
-            self.status_code = self.exception.status_code
-        if hasattr(self.exception, "detail"):
-            self.message = self.exception.detail
-
-    def handler_jws_exception(self):
-        self.status_code = status.HTTP_400_BAD_REQUEST
-        self.message = "Token error. " + self.exception.args[0]
-
-    def error_response(self, url: URL) -> JSONResponse:
-        """Формирует и возвращает JSONResponse объект с ответом.
-
-        Так же выдает лог сообщение об ошибке.
-        """
-        content_data = {
-            "detail": HTTP_EXCEPTION.get(self.status_code),
-            "message": self.message,
-        }
-        if self.is_traceback:
+        cls._resolved[exception] = handler
+        return handler
+
+    @staticmethod
+    def log(
+        result: ErrorResult,
+        exception: Exception,
+        url: URL,
+        logger: Logger | None,
+        is_traceback: bool,
+    ):
+        """Выдает лог сообщение об ошибке."""
+        if logger is None:
+            return
+        # the traceback is formatted only for the errors, not for the ordinary 4xx answers
+        if is_traceback and result.level >= logging.ERROR:
             msg = traceback.format_exc()
         else:
-            msg = f"url={url}, exception={self.exception.__class__}, message_to_user={self.exception}"
-        match self.level:
-            case "CRITICAL" | 50:
+            msg = f"url={url}, exception={exception.__class__}, message_to_user={exception}"
+        match result.level:
+            case 50:
                 msg = (
                     f" \n_____________\n "
                     f"WARNING: an error has occurred to which there is no correct response of the application."
                     f" WE NEED TO RESPOND URGENTLY"
-                    f" \nExceptionHandler:  {str(self.exception)}\n"
+                    f" \nExceptionHandler:  {str(exception)}\n"
                     f" _____________\n" + traceback.format_exc()
                 )
-                self.logger.critical(msg)
-            case "ERROR" | 40:
-                self.logger.error(msg)
-            case "WARNING" | 30:
-                self.logger.warning(msg)
+                logger.critical(msg)
+            case 40:
+                logger.error(msg)
+            case 30:
+                logger.warning(msg)
             case _:
-                self.logger.info(msg)
-        return JSONResponse(content=content_data, status_code=self.status_code)
-
-    handlers.update(
-        {
-            "AssertionError": handler_assertion_error,
-            "ConnectionRefusedError": handler_connection_to_error,
-            "ConnectionError": handler_connection_to_error,
-            "IntegrityError": handler_integrity_error_error,
-            "ProgrammingError": handler_connection_to_error,
-            "HTTPException": handler_http_exception,
-            "JWSError": handler_jws_exception,
-        }
+                logger.info(msg)
+
+    @classmethod
+    def error_response(cls, result: ErrorResult, headers: dict | None = None) -> Response:
+        """Формирует ответ, тело собирается из заранее закодированного начала."""
+        prefix = cls._prefixes.get(result.status_code)
+        if prefix is None:
+            prefix = cls._prefixes[result.status_code] = encode_prefix(result.status_code)
+        message = json.dumps(result.message, ensure_ascii=False, separators=(",", ":"))
+        return Response(
+            content=prefix + message.encode() + b"}",
+            status_code=result.status_code,
+            headers=headers,
+            media_type="application/json",
+        )
+
+
+def handler_unknown_error(_: Exception) -> ErrorResult:
+    """Обработчик исключений связанных с исключениями которые не учтены в приложении.
+
+    Выводится сообщение в лог, о том что нужно строчно решить проблему.
+    """
+    return ErrorResult("Unknown error...", status.HTTP_400_BAD_REQUEST, logging.WARNING)
+
+
+@ExceptionHandler.register(ConnectionError, ProgrammingError)
+def handler_connection_to_error(_: Exception) -> ErrorResult:
+    """Обработчик исключений связанных с подключением к внешним источникам.
+
+    Как пример обработка ошибки подключения к БД PostgresSQL.
+    """
+    return ErrorResult(
+        "Failed to connect, try again later...",
+        status.HTTP_500_INTERNAL_SERVER_ERROR,
+        logging.CRITICAL,
     )
 
 
+@ExceptionHandler.register(OverloadError)
+def handler_overload_error(_: OverloadError) -> ErrorResult:
+    """Обработчик отказов предохранителя и ограничения одновременных вызовов.
+
+    Сервис не вызывался, это ожидаемая перегрузка, а не сбой приложения,
+    поэтому ответ 503 с заголовком Retry-After, в лог без traceback.
+    """
+    # the name of the service is written to the log only
+    return ErrorResult(
+        "Service is temporarily unavailable, try again later...",
+        status.HTTP_503_SERVICE_UNAVAILABLE,
+        logging.WARNING,
+    )
+
+
+@ExceptionHandler.register(AssertionError)
+def handler_assertion_error(exception: AssertionError) -> ErrorResult:
+    """Обработчик исключения AssertionError.
+
+    Чаще всего возникают в случаи обработки неправильных данных от пользователя.
+    """
+    if isinstance(exception.args[0], list):
+        message, status_code, *_ = exception.args[0]
+        return ErrorResult(message, status_code, logging.INFO)
+    return ErrorResult(exception.args[0], status.HTTP_400_BAD_REQUEST, logging.INFO)
+
+
+@ExceptionHandler.register(IntegrityError)
+def handler_integrity_error_error(exception: IntegrityError) -> ErrorResult:
+    """Обработчик исключения IntegrityError."""
+    key, value = get_error_content(exception.args[0])
+    return ErrorResult(
+        f"{key.capitalize()} is already in use, try other {key}, not these `{value}`",
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+        logging.INFO,
+    )
+
+
+@ExceptionHandler.register(HTTPException)
+def handler_http_exception(exception: HTTPException) -> ErrorResult:
+    if trace.enabled:
+        trace("http exception", exception=exception)
+    return ErrorResult(exception.detail, exception.status_code, logging.INFO)
+
+
+@ExceptionHandler.register(JWSError)
+def handler_jws_exception(exception: JWSError) -> ErrorResult:
+    return ErrorResult("Token error. " + exception.args[0], status.HTTP_400_BAD_REQUEST)
+
+
 def get_error_content(message: str) -> tuple[str, str]:
     m = re.findall(r"\(([A-Za-z0-9_@.]+)\)", message)
     return m[1], m[2]
@@ -1,32 +1,187 @@
 """Логирование."""
+import atexit
+import json
 import logging
 import sys
+from logging import BASIC_FORMAT
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from random import random
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import TextIO
 
-from core.settings import Settings
+from base.debug_trace import DebugTrace
+from core.settings import LogSettings, Settings
 from loguru import logger
 
 
+class LogFilter:
+    """Sampling by level and aggregation of repeated records.
+
+    A level listed in `sampling` keeps only the given share of its records.
+    Identical WARNING and higher records are written once per `dedup_window` seconds,
+    the next written record tells how many of them were dropped.
+    """
+
+    def __init__(self, sampling: dict[str, float], dedup_window: float):
+        self.sampling = {level.upper(): share for level, share in sampling.items()}
+        self.dedup_window = dedup_window
+        self._seen: dict[tuple[str, str], list[float | int]] = {}
+        self._lock = Lock()
+
+    def check(self, level: str, level_no: int, message: str) -> tuple[bool, int]:
+        """Whether the record is written.
+
+        Returns:
+            object: True if the record is written, number of the identical records dropped before
+        """
+        if level in self.sampling and random() >= self.sampling[level]:
+            return False, 0
+        if not self.dedup_window or level_no < logging.WARNING:
+            return True, 0
+        now = monotonic()
+        key = level, message
+        with self._lock:
+            if len(self._seen) > 10000:
+                self._seen.clear()
+            window = self._seen.get(key)
+            if window and now - window[0] < self.dedup_window:
+                window[1] += 1
+                return False, 0
+            self._seen[key] = [now, 0]
+        return True, window[1] if window else 0
+
+    def loguru(self, record: dict) -> bool:
+        is_written, repeated = self.check(
+            record["level"].name, record["level"].no, record["message"]
+        )
+        if repeated:
+            record["message"] += f" (repeated {repeated} times)"
+        return is_written
+
+
+class StdlibLogFilter(logging.Filter):
+    def __init__(self, log_filter: LogFilter):
+        super().__init__()
+        self.log_filter = log_filter
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        is_written, repeated = self.log_filter.check(
+            record.levelname, record.levelno, record.getMessage()
+        )
+        if repeated:
+            record.msg, record.args = f"{record.getMessage()} (repeated {repeated} times)", None
+        return is_written
+
+
+class BatchedSink:
+    """Sink which writes the records to the stream in batches.
+
+    The batch is written when it has `batch_size` records,
+    or every `flush_interval` seconds by the flusher thread, and at exit.
+    The buffer is swapped under the lock and written outside of it,
+    so a slow stream does not block the threads which log.
+    """
+
+    def __init__(self, stream: TextIO, batch_size: int = 100, flush_interval: float = 0.5):
+        self.stream = stream
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: list[str] = []
+        self._lock = Lock()
+        # keeps the order of the batches written by different threads
+        self._write_lock = Lock()
+        self._stopped = Event()
+        Thread(target=self._run, name="log-flusher", daemon=True).start()
+        atexit.register(self.stop)
+
+    def write(self, message: str):
+        with self._lock:
+            self._buffer.append(message)
+            is_full = len(self._buffer) >= self.batch_size
+        if is_full:
+            self._flush()
+
+    # not `flush`, loguru would call it after each record
+    def _flush(self):
+        with self._write_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if batch:
+                self.stream.write("".join(batch))
+                self.stream.flush()
+
+    def stop(self):
+        self._stopped.set()
+        self._flush()
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self._flush()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "name": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
 def setup_logging(app) -> None:
     """Настройка логирования в приложении.
 
     В данном случае есть вариант использовать loguru.
     https://github.com/Delgan/loguru
+    Запись в поток выполняется в отдельном потоке, пачками,
+    поэтому всплеск ошибок не нагружает цикл событий вводом-выводом.
     """
     settings = Settings().app_logging
+    log_filter = LogFilter(settings.sampling, settings.dedup_window)
     if settings.guru:
         logger.configure(
             **{
                 "handlers": [
                     {
-                        "sink": sys.stderr,
+                        "sink": BatchedSink(
+                            sys.stderr, settings.batch_size, settings.flush_interval
+                        ),
                         "level": settings.level,
                         "backtrace": settings.traceback,
+                        "diagnose": False,
+                        "enqueue": settings.enqueue,
+                        "serialize": settings.json_format,
+                        "filter": log_filter.loguru,
                     },
                 ],
             }
         )
         app.logger = logger
     else:
-        logging.basicConfig(level=settings.log_level)
+        setup_stdlib_logging(settings, log_filter)
         app.logger = logging
+    DebugTrace.configure(app.logger, settings.debug_modules)
     app.logger.info("Starting logging")
+
+
+def setup_stdlib_logging(settings: LogSettings, log_filter: LogFilter):
+    """The records are put into a queue, the listener thread writes them to the stream."""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(
+        JsonFormatter() if settings.json_format else logging.Formatter(BASIC_FORMAT)
+    )
+    records = SimpleQueue()
+    queue_handler = QueueHandler(records)
+    # the queued record carries the message with the traceback, the listener adds the rest
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    queue_handler.addFilter(StdlibLogFilter(log_filter))
+    logging.basicConfig(level=settings.level, handlers=[queue_handler], force=True)
+    listener = QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
@@ -0,0 +1,82 @@
+"""Exposition of the application metrics."""
+from hmac import compare_digest
+
+from base.executor import Executors
+from base.metrics import REGISTRY
+from base.utils import TryRun
+from core.components import Application
+from fastapi import APIRouter, HTTPException, Request, status
+from starlette.responses import PlainTextResponse
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+# the Authorization header is taken by the tokens of the users
+TOKEN_HEADER = "X-Metrics-Token"
+
+metrics_route = APIRouter(tags=["METRICS"])
+
+
+@metrics_route.get("/metrics", include_in_schema=False)
+async def metrics(request: Request) -> PlainTextResponse:
+    """Metrics of the process in the Prometheus text format.
+
+    If `APP_METRICS_TOKEN` is set, the scraper sends it in the `X-Metrics-Token` header.
+    """
+    if (token := request.app.settings.app_metrics_token) is not None and not compare_digest(
+        request.headers.get(TOKEN_HEADER, "").encode(), token.get_secret_value().encode()
+    ):
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Metrics token is not valid")
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+def setup_metrics(app: Application):
+    """Expose the statistics, which the components already keep, as gauges."""
+    if app.settings.app_metrics_token is None:
+        # the metrics tell the load, the routes and the state of the services
+        app.logger.warning("/metrics is open to all, set APP_METRICS_TOKEN to restrict it")
+    store = app.store
+    REGISTRY.collector(
+        "call_group", "State of the group of the wrapped methods", "group", TryRun.get_state
+    )
+    REGISTRY.collector(
+        "executor", "Workers of the executor pools", "pool", lambda: {"workers": Executors.stats()}
+    )
+    REGISTRY.collector(
+        "cache",
+        "Read-through cache counters",
+        "cache",
+        lambda: {
+            "topic": store.blog.topic_cache.stats,
+            "topics": store.blog.topics_cache.stats,
+        },
+    )
+    REGISTRY.collector(
+        "rate_limit_local",
+        "Local rate limit buckets",
+        "cache",
+        lambda: {"buckets": store.rate_limit.buckets.stats},
+    )
+    REGISTRY.collector(
+        "token_batcher",
+        "Batches of the token signing and verification",
+        "batcher",
+        lambda: {
+            name: batcher.stats
+            for name, batcher in {
+                "signer": store.token.signer,
+                "verifier": store.token.verifier,
+            }.items()
+            if batcher is not None
+        },
+    )
+    REGISTRY.collector(
+        "smtp_pool", "SMTP connection pool", "pool", lambda: {"ems": store.ems.stats}
+    )
+    REGISTRY.collector(
+        "outbox",
+        "Email outbox letters",
+        "stream",
+        lambda: {store.outbox.settings.ems_outbox_stream: store.outbox.stats},
+    )
+    REGISTRY.collector(
+        "tracing", "Spans of the kept traces", "exporter", lambda: {"spans": app.tracing.stats}
+    )
@@ -1,68 +1,128 @@
 """Middleware приложения."""
-import re
 from datetime import datetime
+from hashlib import sha256
+from time import perf_counter
 
+from base.cache import LRUCache
+from base.debug_trace import DebugTrace
+from base.metrics import REGISTRY
+from base.tracing import TRACER
 from core.components import Application
 from core.components import Request as RequestApp
 from core.exception_handler import ExceptionHandler
+from core.routing import RouteIndex
 from core.settings import AuthorizationSettings, Settings
 from core.utils import PUBLIC_ACCESS, Token
 from fastapi import HTTPException, status
-from icecream import ic
-from jose import JWSError, jws
-from starlette.middleware.base import (BaseHTTPMiddleware,
-                                       RequestResponseEndpoint)
+from jose import JWSError
+from starlette.datastructures import Headers
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.requests import Request
-from starlette.responses import Response
-from starlette.types import ASGIApp
-from store.cache.accessor import CacheAccessor
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from store.revocation.accessor import RevocationAccessor
+from store.token.accessor import TokenAccessor
 
+trace = DebugTrace(__name__)
 
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
-    """Обработка ошибок при выполнении обработчиков запроса."""
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_seconds",
+    "Time of the request handling, `_count` is the number of the answered requests",
+    ("method", "route", "status"),
+)
+
+
+class StatusSend:
+    """ASGI send channel, which remembers the status code of the response."""
+
+    __slots__ = ("send", "status_code")
+
+    def __init__(self, send: Send):
+        self.send = send
+        self.status_code: int | None = None
+
+    async def __call__(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.status_code = message["status"]
+        await self.send(message)
+
+
+class ErrorHandlingMiddleware:
+    """Обработка ошибок при выполнении обработчиков запроса.
+
+    Реализован как чистый ASGI middleware, без BaseHTTPMiddleware,
+    чтобы не создавать на каждый запрос дополнительные task group и потоки памяти.
+    Здесь же записывается время обработки запроса, статус ответа уже отслеживается,
+    поэтому для метрик не нужен отдельный слой.
+    """
 
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
+        self.app = app
         self.settings = Settings()
         self.exception_handler = ExceptionHandler()
+        self.route_index: RouteIndex | None = None
 
-    async def dispatch(self, request: RequestApp, call_next: RequestResponseEndpoint) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Обработка ошибок при исполнении handlers (views)."""
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        response_send = StatusSend(send)
+        request = RequestApp(scope, receive)
+        started = perf_counter()
         try:
             self.is_endpoint(request)
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, response_send)
         except Exception as error:
-            return self.exception_handler(
+            # заголовки уже отправлены клиенту, корректный ответ сформировать не получится
+            if response_send.status_code is not None:
+                raise
+            response = self.exception_handler(
                 error, request.url, request.app.logger, self.settings.app_logging.traceback
             )
+            await response(scope, receive, response_send)
+        finally:
+            self.observe(scope, perf_counter() - started, response_send.status_code)
 
     @staticmethod
-    def is_endpoint(request: "Request") -> bool:
+    def observe(scope: Scope, duration: float, status_code: int | None):
+        """Record the time of the request handling.
+
+        The router puts the matched route into the scope, the route is labeled
+        by its template, so the number of the series does not depend on the paths.
+        """
+        route = scope.get("route")
+        REQUEST_SECONDS.observe(
+            duration,
+            scope["method"],
+            route.path if route else "unmatched",
+            status_code or status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+    def is_endpoint(self, request: "Request") -> bool:
         """Checking if there is a requested endpoint.
 
+        The route index is built on the first request,
+        when all routes have already been added to the application.
+        The check precedes the authorization, see `RouteIndex`.
+
         Args:
             request: Request object
 
         Returns:
             object: True if there is a endpoint
         """
-        detail = "{message}, See the documentation: http://{host}:{port}{uri}"
+        if self.route_index is None:
+            self.route_index = RouteIndex(request.app.routes)
+        status_code = self.route_index.match(request.scope["path"], request.method)
+        if status_code == status.HTTP_200_OK:
+            return True
         message = "Not Found"
-        status_code = status.HTTP_404_NOT_FOUND
-        for route in request.app.routes:
-            if re.match(route.path_regex, request.url.path):
-                if request.method.upper() in route.methods:
-                    return True
-                status_code = status.HTTP_405_METHOD_NOT_ALLOWED
-                message = "Method Not Allowed"
-                ic(route.methods)
-                break
+        if status_code == status.HTTP_405_METHOD_NOT_ALLOWED:
+            message = "Method Not Allowed"
         raise HTTPException(
             status_code,
-            detail.format(
+            "{message}, See the documentation: http://{host}:{port}{uri}".format(
                 message=message,
                 host=request.app.settings.app_server_host,
                 port=request.app.settings.app_port,
@@ -71,53 +131,100 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
         )
 
 
-class AuthorizationMiddleware(BaseHTTPMiddleware):
+class TracingMiddleware:
+    """Root span of the request, the spans of the accessor calls are its children.
+
+    The trace of the caller is continued, if the request has the `traceparent` header.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        response_send = StatusSend(send)
+        with TRACER.start_trace(
+            f"{scope['method']} {scope['path']}",
+            Headers(scope=scope).get("traceparent"),
+            **{"http.method": scope["method"], "http.target": scope["path"]},
+        ) as span:
+            await self.app(scope, receive, response_send)
+            status_code = response_send.status_code
+            if route := scope.get("route"):
+                span.update_name(f"{scope['method']} {route.path}")
+                span.set(**{"http.route": route.path})
+            span.set(**{"http.status_code": status_code})
+            if status_code is None or status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+                span.set_error(f"Response status {status_code}")
+
+
+class AuthorizationMiddleware:
     """Authorization MiddleWare."""
 
-    def __init__(self, app: ASGIApp, cache: CacheAccessor):
-        self.cache = cache
+    def __init__(self, app: ASGIApp, revocation: RevocationAccessor, tokens: TokenAccessor):
+        self.app = app
+        self.revocation = revocation
+        self.tokens = tokens
         self.settings = AuthorizationSettings()
         self.public_access = PUBLIC_ACCESS
-        super().__init__(app)
+        self.token_cache = LRUCache(self.settings.auth_token_cache_size)
+        # the middleware is created by the application on the first request, after `setup_metrics`
+        REGISTRY.collector(
+            "auth_token_cache",
+            "Cache of the verified tokens",
+            "cache",
+            lambda: {"tokens": self.token_cache.stats},
+        )
 
-    async def dispatch(
-        self,
-        request: Request,
-        call_next: RequestResponseEndpoint,
-    ) -> Response | None:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Checking access rights to a resource.
 
-        Here a token is added to the request.
+        Here a token is added to the request state,
+        the state is stored in the `scope` and is available to the views.
 
         Args:
-            request: 'Request'
-            call_next: RequestResponseEndpoint
-
-        Returns:
-            object: Response
+            scope: ASGI connection scope
+            receive: ASGI receive channel
+            send: ASGI send channel
         """
-        token = self.extract_token(request)
-        if token.token:
-            await self.verify_token(token)
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request = Request(scope)
+        raw_token = self.extract_token(request)
+        token = await self.verify_token(raw_token) if raw_token else Token()
         self.check_permission(token.type, request.url.path, request.method)
         self.update_request_state(request, token)
-        return await call_next(request)
+        await self.app(scope, receive, send)
+
+    async def verify_token(self, raw_token: str) -> Token:
+        """Token verification.
 
-    async def verify_token(self, token: Token):
+        The parsed and verified token is cached until its expiration,
+        the check of the block list is performed on each request.
+
+        Args:
+            raw_token: encoded token
+
+        Returns:
+            object: verified token
+        """
+        key = sha256(raw_token.encode()).digest()
         try:
-            ic(token)
-            assert -2 == await self.cache.ttl(
-                token.token
+            if (token := self.token_cache.get(key)) is None:
+                token = await self.tokens.decode_token(raw_token)
+                if trace.enabled:
+                    trace("token verified", type=token.type, user_id=token.user_id, jti=token.jti)
+                assert token.exp > int(
+                    datetime.now().timestamp()
+                ), f"The '{token.type}' token has expired."
+                assert token.jti, f"The '{token.type}' token has no identifier."
+                self.token_cache.set(key, token, token.exp)
+            assert not await self.revocation.is_revoked(
+                token.jti
             ), f"The token {token.type} is blocked, an attempt to log in using the old token, a new token is needed"
-            assert token.exp > int(
-                datetime.now().timestamp()
-            ), f"The '{token.type}' token has expired."
-            jws.verify(
-                token.token,
-                self.settings.auth_key.get_secret_value(),
-                self.settings.auth_algorithms,
-            )
-            return
+            return token
         except JWSError as e:
             detail = status.HTTP_400_BAD_REQUEST
             message = e.args[0]
@@ -134,7 +241,8 @@ class AuthorizationMiddleware(BaseHTTPMiddleware):
             path: endpoint path to check permissions
             method: method to check permissions
         """
-        ic(token_type, path)
+        if trace.enabled:
+            trace("check permission", token_type=token_type, path=path, method=method)
         match token_type, path:
             case "anonymous", path:
                 if self.public_access.count([path, method.upper()]):
@@ -152,25 +260,25 @@ class AuthorizationMiddleware(BaseHTTPMiddleware):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
     @staticmethod
-    def extract_token(request: "Request") -> "Token":
+    def extract_token(request: "Request") -> str | None:
         """Попытка получить token из headers (authorization Bear).
 
         Args:
             request: Request
 
         Returns:
-            object: access token
+            object: encoded access token, None if the token is not specified
         """
         authorization = request.headers.get("Authorization", None)
         if not authorization:
-            return Token()
+            return None
         bearer, *token = authorization.split(" ")
         try:
             assert "Bearer" == bearer, "Bearer header not specified"
             assert token, "Token header not specified"
         except AssertionError as e:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.args[0])
-        return Token("".join(token))
+        return "".join(token)
 
     @staticmethod
     def update_request_state(request: "Request", token: Token):
@@ -189,6 +297,12 @@ def setup_middleware(app: Application):
         allow_methods=app.settings.app_allow_methods,
         allow_headers=app.settings.app_allow_headers,
         allow_credentials=app.settings.app_allow_credentials,
+        # the cursor of the next page, the browser does not show it to the script otherwise
+        expose_headers=["X-Next-Cursor"],
+    )
+    app.add_middleware(
+        AuthorizationMiddleware, revocation=app.store.revocation, tokens=app.store.token
     )
-    app.add_middleware(AuthorizationMiddleware, cache=app.store.cache)
     app.add_middleware(ErrorHandlingMiddleware)
+    if app.tracing.settings.tracing_enabled:
+        app.add_middleware(TracingMiddleware)
@@ -0,0 +1,66 @@
+"""Rate limit dependency of the views."""
+from json import JSONDecodeError
+from math import ceil
+
+from core.components import Request
+from fastapi import HTTPException, status
+
+
+class RateLimit:
+    """Rate limit of the route.
+
+    The rules are taken from `RATE_LIMIT_RULES` by the path of the route,
+    the key of a rule is the client IP, the user email or the user identifier.
+    The email is looked for in the query parameters and in the JSON body.
+
+    Example:
+        @auth_route.post("/login", dependencies=[Depends(RateLimit())])
+    """
+
+    async def __call__(self, request: Request):
+        limiter = request.app.store.rate_limit
+        path = request.scope["route"].path
+        keys = []
+        for rule in limiter.get_rules(path):
+            if value := await self.get_key(request, rule.key):
+                keys.append((rule, value))
+        if retry_after := await limiter.hit(path, keys):
+            raise HTTPException(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "Too many requests, try again later",
+                headers={"Retry-After": str(ceil(retry_after))},
+            )
+
+    @staticmethod
+    async def get_key(request: Request, key: str) -> str | None:
+        match key:
+            case "ip":
+                return RateLimit.get_ip(request)
+            case "user_id":
+                return request.state.user_id
+            case "email":
+                if email := request.query_params.get("email"):
+                    return email.lower()
+                try:
+                    # the body is already read and cached by FastAPI
+                    body = await request.json()
+                except (JSONDecodeError, UnicodeDecodeError):
+                    return None
+                email = body.get("email") if isinstance(body, dict) else None
+                return email.lower() if isinstance(email, str) else None
+
+    @staticmethod
+    def get_ip(request: Request) -> str | None:
+        """Client IP.
+
+        Behind a reverse proxy the IP is taken from `RATE_LIMIT_IP_HEADER`. The client can
+        put any addresses at the start of the header, so the address appended by the first
+        of `RATE_LIMIT_TRUSTED_PROXIES` trusted proxies is used.
+        """
+        settings = request.app.store.rate_limit.settings
+        if settings.rate_limit_ip_header and (
+            header := request.headers.get(settings.rate_limit_ip_header)
+        ):
+            addresses = [address.strip() for address in header.split(",")]
+            return addresses[max(0, len(addresses) - settings.rate_limit_trusted_proxies)]
+        return request.client.host if request.client else None
@@ -1,6 +1,7 @@
 """"Routes приложения """
 from blog.topic.views import topic_route
 from core.components import Application
+from core.metrics import metrics_route
 from user.views import auth_route
 
 
@@ -8,3 +9,4 @@ def setup_routes(app: Application):
     """Настройка подключаемых route к приложению."""
     app.include_router(auth_route)
     app.include_router(topic_route)
+    app.include_router(metrics_route)
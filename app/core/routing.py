@@ -0,0 +1,82 @@
+"""Precompiled route table of the application."""
+from collections import defaultdict
+from re import Pattern
+from typing import Iterable, Optional
+
+from starlette import status
+from starlette.routing import BaseRoute
+
+Methods = Optional[frozenset[str]]
+
+
+class RouteIndex:
+    """Route index, built once from the application routes.
+
+    Static paths are stored in a hash map, so they are resolved in constant time.
+    Parameterised paths are grouped by their first static segment,
+    only the routes of this group are checked with a regular expression.
+
+    The router's own match can not be reused: 404 and 405 are decided in
+    `ErrorHandlingMiddleware`, before `AuthorizationMiddleware`, so an unknown path
+    is answered with 404, not with 403, and without verifying the token.
+    The router matches the path only after the authorization, so a dynamic path
+    is matched twice, the index keeps the second match to the candidate routes.
+    """
+
+    def __init__(self, routes: Iterable[BaseRoute]):
+        """Building an index.
+
+        Args:
+            routes: application routes, example: `app.routes`
+        """
+        self.static: dict[str, Methods] = {}
+        self.dynamic: defaultdict[str, list[tuple[Pattern, Methods]]] = defaultdict(list)
+        for route in routes:
+            path = getattr(route, "path", None)
+            if path is None:
+                continue
+            methods = getattr(route, "methods", None)
+            methods = frozenset(methods) if methods is not None else None
+            if getattr(route, "param_convertors", None):
+                self.dynamic[self.get_prefix(path)].append((route.path_regex, methods))
+            else:
+                self.static[path] = self.merge_methods(self.static.get(path, frozenset()), methods)
+
+    def match(self, path: str, method: str) -> int:
+        """Check whether there is an endpoint for the path and method.
+
+        Args:
+            path: requested path, example: `/topic/get`
+            method: HTTP method, example: `GET`
+
+        Returns:
+            int: status code, 200 - if found, 404 - not found, 405 - method not allowed
+        """
+        method = method.upper()
+        methods = self.static.get(path, frozenset())
+        if methods is None or method in methods:
+            return status.HTTP_200_OK
+        candidates = self.dynamic.get(self.get_prefix(path), []) + self.dynamic.get("", [])
+        for path_regex, route_methods in candidates:
+            if path_regex.match(path):
+                methods = self.merge_methods(methods, route_methods)
+        if methods is None or method in methods:
+            return status.HTTP_200_OK
+        if methods:
+            return status.HTTP_405_METHOD_NOT_ALLOWED
+        return status.HTTP_404_NOT_FOUND
+
+    @staticmethod
+    def get_prefix(path: str) -> str:
+        """The first static segment of the path, example: `/topic/get/{id}` -> `/topic`."""
+        segment = path.split("/", 2)[1] if path.count("/") else path
+        if "{" in segment:
+            return ""
+        return "/" + segment
+
+    @staticmethod
+    def merge_methods(methods: Methods, route_methods: Methods) -> Methods:
+        """Union of allowed methods, None means that any method is allowed."""
+        if methods is None or route_methods is None:
+            return None
+        return methods | route_methods
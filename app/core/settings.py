@@ -1,8 +1,9 @@
 """Модуль начальных настроек приложения."""
 import os
+from typing import Literal
 
 from core.utils import ALGORITHM, ALGORITHMS, HEADERS, METHOD
-from pydantic import BaseModel, EmailStr, SecretStr, field_validator
+from pydantic import BaseModel, EmailStr, Field, SecretStr, field_validator
 from pydantic_settings import BaseSettings
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__name__)))
@@ -24,6 +25,17 @@ class LogSettings(BaseModel):
     level: str = "INFO"
     guru: bool = True
     traceback: bool = True
+    # modules with debug records, example: ["core.middelware", "store"], "*" - all modules
+    debug_modules: list[str] = []
+    # the records are written by a background thread, in batches
+    enqueue: bool = True
+    batch_size: int = 100
+    flush_interval: float = 0.5
+    json_format: bool = False
+    # share of the records kept by level, example: {"DEBUG": 0.1}
+    sampling: dict[str, float] = {}
+    # identical WARNING and higher records are written once per window, seconds, 0 - disabled
+    dedup_window: float = 10
 
 
 class Settings(Base):
@@ -43,6 +55,8 @@ class Settings(Base):
     app_allow_methods: str | list[METHOD] = "*"
     app_allow_headers: str | list[HEADERS] = "*"
     app_allow_credentials: bool = True
+    # the scraper sends it in the X-Metrics-Token header, None - /metrics is open to all
+    app_metrics_token: SecretStr | None = None
 
     app_logging: LogSettings = LogSettings()
 
@@ -68,6 +82,11 @@ class PostgresSettings(Base):
     postgres_host: str
     postgres_port: str
     postgres_db_schema: str
+    postgres_pool_size: int = 10
+    postgres_max_overflow: int = 20
+    postgres_pool_timeout: int = 30
+    postgres_pool_pre_ping: bool = True
+    postgres_pool_recycle: int = 1800
 
     def dsn(self, show_secret: bool = False) -> str:
         """Возвращает link настройки."""
@@ -108,6 +127,17 @@ class AuthorizationSettings(Base):
     auth_algorithms: str
     auth_access_expires_delta: int
     auth_refresh_expires_delta: int
+    auth_token_cache_size: int = 10000
+    auth_revocation_channel: str = "auth:revoked"
+    auth_revocation_capacity: int = 100000
+    auth_revocation_error_rate: float = 0.001
+    auth_revocation_rebuild_interval: int = 3600
+    # inline - on the event loop, thread/process - in the application pool, in batches
+    auth_crypto_mode: Literal["inline", "thread", "process"] = "inline"
+    auth_crypto_batch_size: int = 64
+    auth_crypto_batch_delay: float = 0.001
+    # token codec: jose - python-jose, hmac - standard library, HS256/HS384/HS512 only
+    auth_backend: Literal["jose", "hmac"] = "jose"
 
     @field_validator("auth_algorithms")
     def to_list(cls, data: str | list[ALGORITHM]) -> list[ALGORITHM]:  # noqa
@@ -122,6 +152,76 @@ class AuthorizationSettings(Base):
         return data
 
 
+class PasswordSettings(Base):
+    """Password hashing settings.
+
+    A hash made with other parameters is replaced at the next login of the user.
+    """
+
+    password_scheme: Literal["scrypt", "pbkdf2_sha256"] = "scrypt"
+    password_scrypt_n: int = 2**14
+    password_scrypt_r: int = 8
+    password_scrypt_p: int = 1
+    password_pbkdf2_iterations: int = 600000
+    password_salt_size: int = 16
+    password_workers: int = 4
+    password_max_pending: int = 64
+
+
+class RateLimitRule(BaseModel):
+    """Rate limit rule: no more than `limit` requests per `period` seconds for one key."""
+
+    key: Literal["ip", "email", "user_id"]
+    limit: int
+    period: int
+
+
+class RateLimitSettings(Base):
+    """Rate limit settings.
+
+    The rules of a route are set by its path,
+    example: RATE_LIMIT_RULES='{"/auth/login": [{"key": "ip", "limit": 20, "period": 60}]}'
+    """
+
+    rate_limit_rules: dict[str, list[RateLimitRule]] = {
+        "/auth/login": [
+            RateLimitRule(key="ip", limit=20, period=60),
+            RateLimitRule(key="email", limit=5, period=60),
+        ],
+        "/auth/create_user": [
+            RateLimitRule(key="ip", limit=5, period=60),
+            RateLimitRule(key="email", limit=3, period=600),
+        ],
+        "/auth/reset_password": [
+            RateLimitRule(key="ip", limit=5, period=60),
+            RateLimitRule(key="email", limit=3, period=600),
+        ],
+    }
+    rate_limit_local_size: int = 10000
+    rate_limit_redis_timeout: float = 0.1
+    # header with the client IP set by the reverse proxy, example: X-Forwarded-For,
+    # None - the clients connect directly, the IP of the connection is used
+    rate_limit_ip_header: str | None = None
+    # number of the trusted proxies, each of them appends an address to the header
+    rate_limit_trusted_proxies: int = 1
+
+
+class CacheSettings(Base):
+    """Read-through cache settings."""
+
+    cache_local_size: int = 1024
+    cache_local_ttl: int = 5
+    cache_ttl: int = 300
+
+
+class ExecutorSettings(Base):
+    """Executor pools for synchronous code."""
+
+    executor_thread_workers: int = 8
+    # 0 - the process pool is disabled
+    executor_process_workers: int = 0
+
+
 class EmailMessageServiceSettings(Base):
     """Email message service settings."""
 
@@ -131,3 +231,36 @@ class EmailMessageServiceSettings(Base):
     ems_user: str
     ems_password: SecretStr
     ems_sender: EmailStr
+    ems_pool_size: int = 4
+    ems_pool_acquire_timeout: float = 10
+    ems_pool_idle_timeout: float = 60
+    ems_pool_health_check_interval: float = 10
+    # letters sent over one connection before it is replaced
+    ems_pool_max_messages: int = Field(100, gt=0)
+    ems_outbox_stream: str = "ems:outbox"
+    ems_outbox_dead_letter_stream: str = "ems:outbox:dead"
+    ems_outbox_group: str = "ems"
+    ems_outbox_workers: int = 2
+    ems_outbox_batch_size: int = 10
+    ems_outbox_max_attempts: int = 5
+    ems_outbox_retry_delay: float = 1
+    ems_outbox_claim_idle: int = 60
+    ems_outbox_max_length: int = 100000
+
+
+class TracingSettings(Base):
+    """Request tracing settings."""
+
+    tracing_enabled: bool = False
+    # share of the traces kept at their start
+    tracing_sample_rate: float = 0.01
+    # the slower traces are kept regardless of the sample rate, seconds, 0 - disabled
+    tracing_tail_latency: float = 1
+    # the failed traces are kept regardless of the sample rate
+    tracing_tail_errors: bool = True
+    tracing_exporter: Literal["file", "otlp"] = "file"
+    tracing_file: str = "traces.jsonl"
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_batch_size: int = 512
+    tracing_flush_interval: float = 5
+    tracing_queue_size: int = 1000
@@ -1,16 +1,21 @@
 import json
-from dataclasses import dataclass, asdict
+from base64 import urlsafe_b64decode
+from binascii import Error as Base64Error
+from dataclasses import asdict, dataclass, fields
 from typing import Literal
 
-from jose import jws
+from jose import JWSError
 from starlette import status
 
 ALGORITHMS = [
     "HS512",
+    "HS384",
     "HS256",
     "HS128",
 ]
 ALGORITHM = Literal[
+    "HS512",
+    "HS384",
     "HS256",
     "HS128",
 ]
@@ -45,6 +50,7 @@ PUBLIC_ACCESS = [
     ["/auth/refresh", "GET"],
     ["/auth/reset_password", "POST"],
     ["/auth/reset_password", "GET"],
+    ["/metrics", "GET"],
 ]
 
 METHODS = [
@@ -64,7 +70,9 @@ HTTP_EXCEPTION = {
     status.HTTP_404_NOT_FOUND: "404 Not Found",
     status.HTTP_405_METHOD_NOT_ALLOWED: "405 Method Not Allowed",
     status.HTTP_422_UNPROCESSABLE_ENTITY: "422 Unavailable Entity",
+    status.HTTP_429_TOO_MANY_REQUESTS: "429 Too Many Requests",
     status.HTTP_500_INTERNAL_SERVER_ERROR: "500 Internal server error",
+    status.HTTP_503_SERVICE_UNAVAILABLE: "503 Service Unavailable",
 }
 forbidden_message = (
     "Perhaps you are trying to perform actions that are not implied by the logic of the application."
@@ -74,7 +82,36 @@ forbidden_message = (
 )
 
 
-@dataclass
+def b64decode(segment: bytes) -> bytes:
+    """Decoding of the base64url segment of the token, the padding is restored."""
+    return urlsafe_b64decode(segment + b"=" * (-len(segment) % 4))
+
+
+def decode_segments(token: str) -> tuple[dict, dict, bytes, bytes]:
+    """Split the token and decode its segments, the signature is not verified.
+
+    Args:
+        token: encoded token
+
+    Returns:
+        object: header, claims, signing input, signature
+
+    Raises:
+        JWSError: if the token is malformed
+    """
+    try:
+        signing_input, signature = token.encode().rsplit(b".", 1)
+        header, claims = signing_input.split(b".")
+        header, claims = json.loads(b64decode(header)), json.loads(b64decode(claims))
+        signature = b64decode(signature)
+    except (ValueError, Base64Error):
+        raise JWSError("Invalid token, the segments can not be decoded.")
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise JWSError("Invalid token, the header and the claims must be objects.")
+    return header, claims, signing_input, signature
+
+
+@dataclass(slots=True)
 class Token:
     token: str = None
     alg: str = None
@@ -82,16 +119,26 @@ class Token:
     iat: int = None
     email: str = None
     user_id: str = None
+    jti: str = None
     type: str = "anonymous"
 
-    def __init__(self, token: str = None):
-        data = {"token": token}
-        if token:
-            data.update(jws.get_unverified_headers(token))
-            data.update(json.loads(jws.get_unverified_claims(token)))
-            data.update(data.pop("subject", {}))
-        for key, value in data.items():
-            setattr(self, key, value)
+    def __init__(self, token: str = None, header: dict = None, claims: dict = None):
+        """Token from the encoded form.
+
+        The token is decoded once, the signature is not verified here,
+        the verified token is created by the codec, see `store.token.codec`.
+
+        Args:
+            token: encoded token
+            header: already decoded header
+            claims: already decoded claims
+        """
+        if token and claims is None:
+            header, claims, _, _ = decode_segments(token)
+        data = {**(header or {}), **(claims or {}), "token": token}
+        data.update(data.pop("subject", None) or {})
+        for field in fields(self):
+            setattr(self, field.name, data.get(field.name, field.default))
 
     @property
     def as_dict(self):
@@ -1,13 +1,23 @@
-from typing import Optional
+from typing import Any, Optional
 
 from base.base_accessor import BaseAccessor
 from base.type_hint import Sorted_order
 from store.blog.models import TopicModel, UserModel
+from store.cache.read_through import ReadThroughCache
 from store.database.postgres import Query
 
 
 class BlogAccessor(BaseAccessor):
-    """Blog service."""
+    """Blog service.
+
+    Topics are read through the cache: single topics are keyed by `id`,
+    pages by the normalized pagination and sort parameters.
+    Any change of the topics invalidates the topic and all pages.
+    """
+
+    def _init(self):
+        self.topic_cache = ReadThroughCache(self.app, "topics:id")
+        self.topics_cache = ReadThroughCache(self.app, "topics:page")
 
     async def create_user(self, name: str, email: str):
         """Create a new user.
@@ -38,6 +48,7 @@ class BlogAccessor(BaseAccessor):
         }
         query = self.app.postgres.get_query_insert(TopicModel, **insert_data)
         result = await self.app.postgres.query_execute(query.returning(TopicModel))
+        await self.topics_cache.clear()
         return result.scalar_one_or_none()
 
     async def update_topic(
@@ -50,24 +61,63 @@ class BlogAccessor(BaseAccessor):
         }
         query = self.app.postgres.get_query_update_by_field(TopicModel, "id", id, **update_data)
         result = await self.app.postgres.query_execute(query.returning(TopicModel))
+        await self.invalidate_topic(id)
         return result.scalar_one_or_none()
 
     async def delete_topic(self, id: str) -> Optional[TopicModel]:
         query = self.app.postgres.get_query_delete_by_field(TopicModel, "id", id)
         result = await self.app.postgres.query_execute(query.returning(TopicModel))
+        await self.invalidate_topic(id)
         return result.scalar_one_or_none()
 
-    async def get_topic_by_id(self, id: str) -> Optional[TopicModel]:
-        query = self.app.postgres.get_query_select_by_field(TopicModel, "id", id)
-        result = await self.app.postgres.query_execute(query)
-        return result.scalar_one_or_none()
+    async def invalidate_topic(self, id: str):
+        """Invalidate the cached topic and all cached pages."""
+        await self.topic_cache.invalidate(id)
+        await self.topics_cache.clear()
+
+    async def get_topic_by_id(self, id: str) -> Optional[dict[str, Any]]:
+        """Get topic by id, through the cache.
+
+        Args:
+            id: topic identifier, UUID hex
+
+        Returns:
+            object: topic data, `TopicModel.as_dict()`
+        """
+
+        async def load() -> Optional[dict[str, Any]]:
+            query = self.app.postgres.get_query_select_by_field(TopicModel, "id", id)
+            topic = (await self.app.postgres.query_execute(query)).scalar_one_or_none()
+            return topic.as_dict() if topic else None
+
+        return await self.topic_cache.get(id, load)
 
     async def get_topics(
-        self, page: int = 0, size: int = 10, sort_params: Sorted_order = None
-    ) -> list[TopicModel]:
-        query = self.app.postgres.get_query_filter(TopicModel, page, size, sort_params)
-        result = await self.app.postgres.query_execute(query)
-        return result.scalars().all()  # noqa
+        self, page: int = 0, size: int = 10, sort_params: Sorted_order = None, cursor: str = None
+    ) -> list[dict[str, Any]]:
+        """Get a page of topics, through the cache.
+
+        Args:
+            page: number of page, ignored if the cursor is specified
+            size: page size
+            sort_params: sort parameters
+            cursor: cursor of the previous page, enables keyset pagination
+
+        Returns:
+            list: topics data, `TopicModel.as_dict()`
+        """
+
+        async def load() -> list[dict[str, Any]]:
+            if cursor:
+                query = self.app.postgres.get_query_keyset(TopicModel, size, sort_params, cursor)
+            else:
+                query = self.app.postgres.get_query_filter(TopicModel, page, size, sort_params)
+            result = await self.app.postgres.query_execute(query)
+            return [topic.as_dict() for topic in result.scalars().all()]
+
+        sort = ",".join(f"{name}.{value.upper()}" for name, value in (sort_params or {}).items())
+        position = f"cursor={cursor}" if cursor else f"page={page}"
+        return await self.topics_cache.get(f"{position}:size={size}:sort={sort}", load)
 
     def get_query_create_user(self, name: str, email: str) -> Query:
         return self.app.postgres.get_query_insert(UserModel, name=name, email=email).returning(
@@ -1,8 +1,14 @@
+from typing import Any
+
 from base.base_accessor import BaseAccessor
 from base.utils import TryRun
+from redis.asyncio.client import Pipeline
+from redis.commands.core import AsyncScript
 
 
-@TryRun(total_timeout=10, group="redis")
+@TryRun(
+    total_timeout=10, group="redis", exclude=("pipeline", "transaction", "register_script")
+)
 class CacheAccessor(BaseAccessor):
     """Authorization service."""
 
@@ -19,6 +25,23 @@ class CacheAccessor(BaseAccessor):
         """
         return await self.app.redis.connector.set(name=name, value=value, ex=expires)  # noqa
 
+    async def mset(self, mapping: dict[str, str], expires: int = None) -> bool:
+        """Save several values in the cache, in one round trip.
+
+        Args:
+            mapping: names and values to set to the cache
+            expires: The time the cache expires, None - timeless
+
+        Returns:
+            bool: True if the cache was successfully
+        """
+        if expires is None:
+            return await self.app.redis.connector.mset(mapping)
+        async with self.pipeline() as pipe:
+            for name, value in mapping.items():
+                pipe.set(name=name, value=value, ex=expires)
+            return all(await pipe.execute())
+
     async def get(self, name: str) -> str | dict | None:
         """Get temporary data from the cache.
 
@@ -30,6 +53,17 @@ class CacheAccessor(BaseAccessor):
         """
         return await self.app.redis.connector.get(name=name)
 
+    async def mget(self, *names: str) -> list[str | None]:
+        """Get several values from the cache, in one round trip.
+
+        Args:
+            names: The names of the cache
+
+        Returns:
+            list: values in the order of the names, None if not found
+        """
+        return await self.app.redis.connector.mget(names)
+
     async def ttl(self, name: str) -> int:
         """Get a lifetime.
 
@@ -42,10 +76,111 @@ class CacheAccessor(BaseAccessor):
 
         return await self.app.redis.connector.ttl(name=name)
 
-    async def delete(self, name: str) -> bool:
-        """Delete one or more keys specified by 'names'.
+    async def incr(self, name: str) -> int:
+        """Increment the number stored in the cache, a missing number is 0.
 
         Args:
             name: The name of the cache
+
+        Returns:
+            int: the incremented number
+        """
+        return await self.app.redis.connector.incr(name)
+
+    async def keys(self, pattern: str) -> list[str]:
+        """Get the names of the cache matching the pattern.
+
+        The keys are iterated with SCAN, so as not to block Redis.
+
+        Args:
+            pattern: glob-style pattern, example: `user:*`
+
+        Returns:
+            list: names of the cache
+        """
+        return [key async for key in self.app.redis.connector.scan_iter(match=pattern, count=1000)]
+
+    async def publish(self, channel: str, message: str) -> int:
+        """Publish a message to the channel.
+
+        Args:
+            channel: The name of the channel
+            message: The message
+
+        Returns:
+            int: number of subscribers who received the message
+        """
+        return await self.app.redis.connector.publish(channel, message)
+
+    async def set_and_publish(
+        self, name: str, value: str, expires: int, channel: str, message: str
+    ) -> bool:
+        """Save a value and publish a message about it, in one round trip.
+
+        Args:
+            name: The name of the cache
+            value: The value to set to the cache
+            expires: The time the cache expires
+            channel: The name of the channel
+            message: The message
+
+        Returns:
+            bool: True if the cache was successfully
+        """
+        async with self.pipeline() as pipe:
+            is_set, _ = await pipe.set(name, value, ex=expires).publish(channel, message).execute()
+        return is_set
+
+    async def delete(self, *names: str) -> int:
+        """Delete one or more keys specified by 'names'.
+
+        Args:
+            names: The names of the cache
+
+        Returns:
+            int: number of deleted keys
+        """
+        return await self.app.redis.connector.delete(*names)
+
+    def pipeline(self, transaction: bool = False) -> Pipeline:
+        """Get a pipeline, the commands are buffered and sent in one round trip.
+
+        Example:
+            async with self.app.store.cache.pipeline() as pipe:
+                is_set, seconds = await pipe.set(name, value, ex=60, nx=True).ttl(name).execute()
+
+        Args:
+            transaction: True - the commands are executed atomically (MULTI/EXEC)
+
+        Returns:
+            object: Pipeline, an async context manager
+        """
+        return self.app.redis.connector.pipeline(transaction=transaction)
+
+    def transaction(self) -> Pipeline:
+        """Get a pipeline which executes the commands atomically (MULTI/EXEC)."""
+        return self.pipeline(transaction=True)
+
+    def register_script(self, script: str) -> AsyncScript:
+        """Get a Lua script, it is called by its SHA1 and loaded to Redis when needed.
+
+        Args:
+            script: Lua script
+
+        Returns:
+            object: script, it is called with `run_script`
+        """
+        return self.app.redis.connector.register_script(script)
+
+    async def run_script(self, script: AsyncScript, keys: list[str], args: list) -> Any:
+        """Run a Lua script, it is executed atomically.
+
+        Args:
+            script: script, see `register_script`
+            keys: names of the keys used by the script, KEYS
+            args: arguments of the script, ARGV
+
+        Returns:
+            Any: result of the script
         """
-        return await self.app.redis.connector.delete(name)
+        return await script(keys=keys, args=args)
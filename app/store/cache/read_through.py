@@ -0,0 +1,219 @@
+import json
+from asyncio import CancelledError, Future, current_task, get_running_loop, shield
+from time import time
+from typing import Any, Awaitable, Callable, Optional
+
+from base.cache import LRUCache
+from core.settings import CacheSettings
+from redis.commands.core import AsyncScript
+
+# KEYS: version of the namespace, version of the key; ARGV: namespace, key.
+# Returns the versions and the record, which is stored under the version of the namespace.
+READ_SCRIPT = """
+local namespace_version = redis.call('GET', KEYS[1]) or '0'
+local key_version = redis.call('GET', KEYS[2]) or '0'
+local record = redis.call('GET', ARGV[1] .. ':' .. namespace_version .. ':' .. ARGV[2])
+return {namespace_version, key_version, record}
+"""
+# KEYS: version of the namespace, version of the key, record;
+# ARGV: the versions read before the load, record, lifetime.
+# The record is saved only if nothing was invalidated during the load.
+WRITE_SCRIPT = """
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then
+    return 0
+end
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[3], ARGV[3], 'EX', ARGV[4])
+return 1
+"""
+# KEYS: version of the namespace, version of the key; ARGV: namespace, key, lifetime.
+INVALIDATE_SCRIPT = """
+local namespace_version = redis.call('GET', KEYS[1]) or '0'
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return redis.call('DEL', ARGV[1] .. ':' .. namespace_version .. ':' .. ARGV[2])
+"""
+
+Versions = tuple[str, str]
+
+
+class ReadThroughCache:
+    """Two-tier read-through cache: in-process LRU and Redis.
+
+    The records of the in-process tier live `cache_local_ttl` seconds,
+    this limits staleness of the record when it is changed by another worker.
+    Concurrent misses of the same key are merged into one load (single-flight).
+
+    The versions of the namespace and of the keys are kept in Redis, so they are shared
+    by all workers. `clear` increments the version of the namespace, the records of the
+    previous version are not read anymore and expire. A loaded value is saved only if
+    no version was changed during the load (compare-and-set), so a worker which read
+    the source before an invalidation does not save a stale record.
+    """
+
+    def __init__(self, app, namespace: str):
+        """Initialization.
+
+        Args:
+            app: The application
+            namespace: prefix of the Redis keys, example: `topics:id`
+        """
+        self.app = app
+        self.namespace = namespace
+        self.settings = CacheSettings()
+        self.local = LRUCache(self.settings.cache_local_size, self.settings.cache_local_ttl)
+        self.generation = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.staleness_max = 0.0
+        self.staleness_total = 0.0
+        self._in_flight: dict[str, Future] = {}
+        self._scripts: dict[str, AsyncScript] = {}
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Get the value from the cache, on a miss it is loaded and saved.
+
+        The value is returned as it is stored: decoded from JSON,
+        identifiers and dates are strings whichever tier it came from.
+
+        Args:
+            key: key in the namespace
+            loader: loads the value from the source, None values are not cached
+
+        Returns:
+            Any: value
+        """
+        if (record := self.local.get(key)) is not None:
+            return self._hit(record)
+        if (future := self._in_flight.get(key)) is not None:
+            return await self._wait(future, key, loader)
+        return await self._lead(key, loader)
+
+    async def invalidate(self, key: str):
+        """Delete the record of the key, in all workers."""
+        self.generation += 1
+        self.local.delete(key)
+        await self._run(
+            INVALIDATE_SCRIPT,
+            [self._version_key(), self._version_key(key)],
+            [self.namespace, key, self.settings.cache_ttl],
+        )
+
+    async def clear(self):
+        """Delete all records of the namespace, in all workers."""
+        self.generation += 1
+        self.local.clear()
+        await self.app.store.cache.incr(self._version_key())
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        """Cache counters, for monitoring.
+
+        Staleness is the age of the record at the moment it is returned.
+        """
+        hits = self.local.hits + self.redis_hits
+        total = hits + self.misses
+        return {
+            "local_hits": self.local.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": hits / total if total else 0.0,
+            "staleness_max": self.staleness_max,
+            "staleness_avg": self.staleness_total / hits if hits else 0.0,
+        }
+
+    async def _wait(self, future: Future, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Wait for the load of another task."""
+        self.coalesced += 1
+        try:
+            return await shield(future)
+        except CancelledError:
+            # the loading task was cancelled, not this one: the value is loaded again
+            if future.cancelled() and not current_task().cancelling():
+                return await self.get(key, loader)
+            raise
+
+    async def _lead(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Load the value, the concurrent misses of the key wait for it."""
+        future = get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await self._load(key, loader)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            # the exception is delivered to the waiters, and is not logged as never retrieved
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+            # the task is cancelled, the waiters must not wait forever
+            if not future.done():
+                future.cancel()
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        generation = self.generation
+        versions, data = await self._read(key)
+        if data is not None:
+            self.redis_hits += 1
+            record = json.loads(data)
+            self.local.set(key, record)
+            return self._hit(record)
+        self.misses += 1
+        value = await loader()
+        # the record was invalidated during the load, the value may be stale
+        if value is None or generation != self.generation:
+            return value
+        data = json.dumps({"t": time(), "v": value}, default=str)
+        record = json.loads(data)
+        self.local.set(key, record)
+        if versions is not None:
+            await self._write(key, versions, data)
+        return record["v"]
+
+    async def _read(self, key: str) -> tuple[Optional[Versions], Optional[str]]:
+        """The versions and the record stored in Redis, None if Redis is not available."""
+        try:
+            namespace_version, key_version, data = await self._run(
+                READ_SCRIPT,
+                [self._version_key(), self._version_key(key)],
+                [self.namespace, key],
+            )
+        except Exception as e:
+            self.app.logger.warning(f"Cache {self.namespace} is not available: {str(e)}")
+            return None, None
+        return (namespace_version, key_version), data
+
+    async def _write(self, key: str, versions: Versions, data: str):
+        namespace_version, key_version = versions
+        try:
+            await self._run(
+                WRITE_SCRIPT,
+                [
+                    self._version_key(),
+                    self._version_key(key),
+                    f"{self.namespace}:{namespace_version}:{key}",
+                ],
+                [namespace_version, key_version, data, self.settings.cache_ttl],
+            )
+        except Exception as e:
+            self.app.logger.warning(f"Cache {self.namespace} is not available: {str(e)}")
+
+    async def _run(self, script: str, keys: list[str], args: list) -> Any:
+        if (registered := self._scripts.get(script)) is None:
+            registered = self._scripts[script] = self.app.store.cache.register_script(script)
+        return await self.app.store.cache.run_script(registered, keys, args)
+
+    def _hit(self, record: dict) -> Any:
+        staleness = time() - record["t"]
+        self.staleness_max = max(self.staleness_max, staleness)
+        self.staleness_total += staleness
+        return record["v"]
+
+    def _version_key(self, key: str = None) -> str:
+        return f"{self.namespace}:version" if key is None else f"{self.namespace}:version:{key}"
@@ -1,24 +1,40 @@
 """Database..."""
+import json
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from contextlib import asynccontextmanager
 from dataclasses import asdict, dataclass, is_dataclass
-from typing import Any, Optional, Tuple, Type, TypeVar, Union
+from datetime import datetime
+from time import perf_counter
+from typing import Any, AsyncIterator, Optional, Tuple, Type, TypeVar, Union
 from uuid import uuid4
 
 from base.base_accessor import BaseAccessor
+from base.metrics import REGISTRY
+from base.tracing import TRACER
 from base.type_hint import Sorted_order
 from core.settings import PostgresSettings
-from sqlalchemy import (DATETIME, TIMESTAMP, Delete, MetaData, Result, Select,
-                        UpdateBase, ValuesBase, delete, func, insert, select,
-                        text, update)
+from sqlalchemy import (DATETIME, TIMESTAMP, ColumnElement, Delete, MetaData,
+                        Result, Select, UnaryExpression, UpdateBase,
+                        ValuesBase, and_, delete, func, insert, or_, select,
+                        tuple_, update)
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
-                                    create_async_engine)
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+                                    async_sessionmaker, create_async_engine)
+from sqlalchemy.orm import (DeclarativeBase, InstrumentedAttribute, Mapped,
+                            mapped_column)
 from sqlalchemy.orm.decl_api import DeclarativeAttributeIntercept
 
 Query = Union[ValuesBase, Select, UpdateBase, Delete]
 Model = TypeVar("Model", bound=DeclarativeAttributeIntercept)
 Field_table = Tuple[str, int]
 
+QUERY_SECONDS = REGISTRY.histogram(
+    "db_query_seconds",
+    "Time of the query with its transaction, by the query type",
+    ("operation", "status"),
+)
+
 
 @dataclass
 class Base(DeclarativeBase):
@@ -69,7 +85,7 @@ class Postgres(BaseAccessor):
 
     _engine: Optional[AsyncEngine] = None
     _db: Optional[Type[DeclarativeBase]] = None
-    session: Optional[AsyncSession] = None
+    session_maker: Optional[async_sessionmaker[AsyncSession]] = None
     settings: Optional[PostgresSettings] = None
 
     async def connect(self):
@@ -80,8 +96,13 @@ class Postgres(BaseAccessor):
             self.settings.dsn(True),
             echo=False,
             future=True,
+            pool_size=self.settings.postgres_pool_size,
+            max_overflow=self.settings.postgres_max_overflow,
+            pool_timeout=self.settings.postgres_pool_timeout,
+            pool_pre_ping=self.settings.postgres_pool_pre_ping,
+            pool_recycle=self.settings.postgres_pool_recycle,
         )
-        self.session = AsyncSession(self._engine, expire_on_commit=False)
+        self.session_maker = async_sessionmaker(self._engine, expire_on_commit=False)
         self.logger.info("Connected to Postgres, {dsn}".format(dsn=self.settings.dsn()))
 
     async def disconnect(self):
@@ -117,7 +138,9 @@ class Postgres(BaseAccessor):
         Returns:
             object: Query object
         """
-        return update(model).values(**update_data).where(text(f"{field_name} = '{field_value}'"))
+        return update(model).values(**update_data).where(
+            Postgres.get_column(model, field_name) == field_value
+        )
 
     @staticmethod
     def get_query_delete_by_field(model: Model, field_name: str, field_value: Any) -> Delete:
@@ -131,7 +154,7 @@ class Postgres(BaseAccessor):
         Returns:
             object: Query object
         """
-        return delete(model).where(text(f"{field_name} = '{field_value}'"))
+        return delete(model).where(Postgres.get_column(model, field_name) == field_value)
 
     @staticmethod
     def get_query_select_by_field(model: Model, field_name: str, field_value: Any) -> Query:
@@ -145,7 +168,25 @@ class Postgres(BaseAccessor):
         Returns:
             object: Query object
         """
-        return select(model).where(text(f"{field_name} = '{field_value}'"))
+        return select(model).where(Postgres.get_column(model, field_name) == field_value)
+
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator[AsyncSession]:
+        """Unit of work, a separate session from the connection pool.
+
+        The transaction is committed on exit,
+        and rolled back if an exception is raised.
+
+        Example:
+            async with self.app.postgres.unit_of_work() as session:
+                await session.execute(query)
+
+        Returns:
+            object: AsyncSession
+        """
+        with TRACER.span("postgres.transaction"):
+            async with self.session_maker.begin() as session:
+                yield session
 
     async def query_execute(self, query: Query) -> Result[Any]:
         """Query execute.
@@ -156,13 +197,18 @@ class Postgres(BaseAccessor):
         Returns:
               Any: result of query
         """
-        async with self.app.postgres.session.begin().session as session:
-            result = await session.execute(query)
-            await session.commit()
+        started, status = perf_counter(), "error"
+        try:
+            async with self.unit_of_work() as session:
+                TRACER.current().set(operation=query.__class__.__name__)
+                result = await session.execute(query)
+            status = "ok"
             return result
+        finally:
+            QUERY_SECONDS.observe(perf_counter() - started, query.__class__.__name__, status)
 
     async def query_executes(self, *query: Query) -> list[Result[Any]]:
-        """Query executes.
+        """Query executes, in one transaction.
 
         Args:
             query: CRUD query for Database
@@ -170,10 +216,14 @@ class Postgres(BaseAccessor):
         Returns:
               Any: result of query
         """
-        async with self.app.postgres.session as session:
-            result = [await session.execute(q) for q in query]
-            await session.commit()
-            return result
+        started, status = perf_counter(), "error"
+        try:
+            async with self.unit_of_work() as session:
+                results = [await session.execute(q) for q in query]
+            status = "ok"
+            return results
+        finally:
+            QUERY_SECONDS.observe(perf_counter() - started, "Transaction", status)
 
     @staticmethod
     def get_query_filter(
@@ -191,5 +241,172 @@ class Postgres(BaseAccessor):
             query: Query object
         """
         query = select(model).limit(size).offset(page * size)
-        query_sort = ", ".join([f"{name} {value}" for name, value in sort_params.items()])
-        return query.order_by(text(query_sort))
+        return query.order_by(*Postgres.get_order_by(model, sort_params))
+
+    @staticmethod
+    def get_query_keyset(
+        model: Model, size: int = 10, sort_params: Sorted_order = None, cursor: str = None
+    ) -> Query:
+        """Get query of the page following the cursor (keyset pagination).
+
+        Unlike `get_query_filter`, the previous rows are not scanned,
+        the cost of the query does not depend on the depth of the page.
+
+        Args:
+            model: Model table
+            size: page size
+            sort_params: sort parameters
+            cursor: cursor of the previous page, see `get_cursor`, None - the first page
+
+        Returns:
+            query: Query object
+        """
+        sort_params = Postgres.get_keyset_order(sort_params)
+        assert Postgres.is_keyset_order(
+            model, sort_params
+        ), "The cursor can not be used with sorting by a field which may be empty"
+        query = select(model).order_by(*Postgres.get_order_by(model, sort_params)).limit(size)
+        if cursor:
+            values = Postgres.decode_cursor(model, sort_params, cursor)
+            query = query.where(Postgres.get_keyset_condition(model, sort_params, values))
+        return query
+
+    @staticmethod
+    def get_cursor(
+        model: Model, row: dict[str, Any], sort_params: Sorted_order = None
+    ) -> str | None:
+        """Get an opaque cursor pointing after the row.
+
+        Args:
+            model: Table model
+            row: the last row of the page, example: `model.as_dict()`
+            sort_params: sort parameters the page was requested with
+
+        Returns:
+            str: cursor, None if the page can not be continued with a cursor
+        """
+        sort_params = Postgres.get_keyset_order(sort_params)
+        if not Postgres.is_keyset_order(model, sort_params):
+            return None
+        data = {name: row[name] for name in sort_params}
+        return urlsafe_b64encode(json.dumps(data, default=str).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(model: Model, sort_params: Sorted_order, cursor: str) -> list[Any]:
+        """Decode the cursor into the values of the sort columns.
+
+        Args:
+            model: Table model
+            sort_params: keyset sort parameters
+            cursor: cursor, see `get_cursor`
+
+        Returns:
+            list: values in the order of the sort parameters
+        """
+        try:
+            data = json.loads(urlsafe_b64decode(cursor.encode()))
+        except ValueError:
+            raise AssertionError("Invalid cursor")
+        assert isinstance(data, dict) and list(data) == list(
+            sort_params
+        ), "The cursor does not match the sort parameters"
+        return [
+            Postgres.get_cursor_value(Postgres.get_column(model, name).type.python_type, value)
+            for name, value in data.items()
+        ]
+
+    @staticmethod
+    def get_cursor_value(python_type: type, value: Any) -> Any:
+        """Value of the sort column from the cursor, checked by the type of the column."""
+        try:
+            if python_type is datetime:
+                return datetime.fromisoformat(value)
+            if python_type is uuid.UUID:
+                return uuid.UUID(value)
+        except (TypeError, ValueError, AttributeError):
+            raise AssertionError("Invalid cursor")
+        # bool is a subclass of int, the type is compared exactly
+        assert type(value) is python_type, "Invalid cursor"
+        return value
+
+    @staticmethod
+    def is_keyset_order(model: Model, sort_params: Sorted_order) -> bool:
+        """Whether the rows can be paged with a cursor in this order.
+
+        NULL is neither greater nor less than a value,
+        so the rows with an empty sort column would be skipped.
+        """
+        return not any(Postgres.get_column(model, name).nullable for name in sort_params)
+
+    @staticmethod
+    def get_keyset_order(sort_params: Sorted_order = None) -> Sorted_order:
+        """Sort parameters with `id` as the last column, it makes the order unique."""
+        sort_params = {name: value.upper() for name, value in (sort_params or {}).items()}
+        sort_params.setdefault("id", "ASC")
+        return sort_params
+
+    @staticmethod
+    def get_keyset_condition(
+        model: Model, sort_params: Sorted_order, values: list[Any]
+    ) -> ColumnElement[bool]:
+        """Get the condition `row is after the values` in the sort order.
+
+        Args:
+            model: Table model
+            sort_params: keyset sort parameters
+            values: values of the sort columns of the last row
+
+        Returns:
+            object: condition
+        """
+        columns = [Postgres.get_column(model, name) for name in sort_params]
+        directions = set(sort_params.values())
+        if len(directions) == 1:
+            # one direction, row comparison is supported by the index
+            if directions == {"DESC"}:
+                return tuple_(*columns) < tuple_(*values)
+            return tuple_(*columns) > tuple_(*values)
+        conditions = []
+        for index, (column, direction) in enumerate(zip(columns, sort_params.values())):
+            after = column < values[index] if direction == "DESC" else column > values[index]
+            equals = [prev == value for prev, value in zip(columns[:index], values[:index])]
+            conditions.append(and_(*equals, after))
+        return or_(*conditions)
+
+    @staticmethod
+    def get_column(model: Model, field_name: str) -> InstrumentedAttribute:
+        """Get a model column by name.
+
+        The value compared with a column is passed as a bound parameter,
+        so the SQL text of the query does not depend on the values,
+        and the prepared statement is reused.
+
+        Args:
+            model: Table model
+            field_name: Field name in the model
+
+        Returns:
+            object: model column
+        """
+        assert (
+            field_name in model.__mapper__.columns
+        ), f"Field `{field_name}` not found in the `{model.__tablename__}`"
+        return getattr(model, field_name)
+
+    @staticmethod
+    def get_order_by(model: Model, sort_params: Sorted_order = None) -> list[UnaryExpression]:
+        """Get sorting expressions.
+
+        Args:
+            model: Table model
+            sort_params: sort parameters, example: {"name": "ASC"}
+
+        Returns:
+            list: sorting expressions
+        """
+        return [
+            Postgres.get_column(model, name).desc()
+            if value.upper() == "DESC"
+            else Postgres.get_column(model, name).asc()
+            for name, value in (sort_params or {}).items()
+        ]
@@ -1,72 +1,88 @@
+from asyncio import Task, create_task
 from email.message import EmailMessage
-from typing import Dict, Tuple
 
-from aiosmtplib import SMTP, SMTPResponse
 from base.base_accessor import BaseAccessor
 from core.settings import EmailMessageServiceSettings
-from icecream import ic
 from pydantic import EmailStr
-from store.ems.templates_letters import EMAIL_VERIFIER_TEXT, TEMPLATE_HTML_TEXT
+from store.ems.smtp_pool import SMTPPool
+from store.ems.templates import LetterTemplate
+from store.ems.templates_letters import DEFAULT_LOCALE, LETTERS
 
 
 class EmailMessageService(BaseAccessor):
     """Email Message Service.
 
     Create and send email message.
+    The letters are put into the outbox, see `EmailOutbox`, and are sent
+    in the background over the pooled SMTP connections, see `SMTPPool`.
     """
 
     _settings: EmailMessageServiceSettings()
-    _smtp: SMTP
+    _pool: SMTPPool
 
     def _init(self):
         """initialization of additional service settings."""
         self._settings = EmailMessageServiceSettings()
+        self._pool = SMTPPool(self._settings)
+        self._reaper: Task | None = None
+        self._templates = {
+            key: LetterTemplate(self._settings.ems_sender, **letter)
+            for key, letter in LETTERS.items()
+        }
 
     async def connect(self):
-        """Connect to SMTP server."""
-        self._smtp = SMTP(
-            hostname=self._settings.ems_host,
-            port=self._settings.ems_port,
-            use_tls=self._settings.ems_is_tls,
-        )
-        if self._settings.ems_is_tls:
-            await self._smtp.starttls()
-        response = await self._smtp.connect()
-        assert response.code in range(
-            200, 300
-        ), "EmailMessageService, Connection error host={host}, message={message}".format(
-            host=self._settings.ems_host, message=response.message
-        )
-        response = await self._smtp.login(
-            self._settings.ems_user, self._settings.ems_password.get_secret_value()
-        )
-        assert response.code in range(
-            200, 300
-        ), "EmailMessageService, Authorization  error host={host}, message={message}".format(
-            host=self._settings.ems_host, message=response.message
-        )
+        """Connect to SMTP server.
+
+        The first connection of the pool is opened on startup,
+        so that the wrong settings are detected at once.
+        """
+        async with self._pool.connection():
+            pass
+        self._reaper = create_task(self._pool.run_reaper())
         self.logger.info("Connected to SMTP server: {smtp}".format(smtp=self._settings.ems_host))
-        self.logger.info("SMTP server response message: {msg}".format(msg=response.message))
 
     async def disconnect(self):
-        if self._smtp.is_connected:
-            self._smtp.close()
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        self._pool.close()
         self.logger.info("Disconnect SMTP server: {smtp}".format(smtp=self._settings.ems_host))
 
+    @property
+    def stats(self) -> dict[str, int | float]:
+        """Metrics of the SMTP connection pool."""
+        return self._pool.stats
+
     async def send(self, msg: EmailMessage):
         """Send an outgoing email with the user's credentials.
 
         Args:
             msg: email message to send
         """
-        if not self._smtp.is_connected:
-            await self._smtp.connect()
-            await self._smtp.login(
-                self._settings.ems_user, self._settings.ems_password.get_secret_value()
-            )
-        errors, message = await self._smtp.send_message(msg)
-        self._smtp.close()
-        assert not errors, message
+        await self.send_raw(msg["From"], msg.get_all("To", []), msg.as_bytes())
+
+    async def send_raw(self, sender: str, recipients: list[str], raw: str | bytes):
+        """Send an already assembled letter over a pooled connection.
+
+        Args:
+            sender: envelope sender
+            recipients: envelope recipients
+            raw: letter, as it is sent to the server
+        """
+        await self._pool.send(sender, recipients, raw.encode() if isinstance(raw, str) else raw)
+
+    async def send_many(self, messages: list[EmailMessage]) -> list[Exception | None]:
+        """Send the letters in bulk, the pooled connections are reused between the letters.
+
+        Args:
+            messages: email messages to send
+
+        Returns:
+            list: None for a sent letter, otherwise the error, in the order of the letters
+        """
+        return await self._pool.send_many(
+            [(msg["From"], msg.get_all("To", []), msg.as_bytes()) for msg in messages]
+        )
 
     def create_email_message(
         self,
@@ -94,42 +110,25 @@ class EmailMessageService(BaseAccessor):
         return msg
 
     async def send_message_to_confirm_email(
-        self, email: EmailStr, name: str, token: str, link: str
+        self, email: EmailStr, name: str, token: str, link: str, locale: str = DEFAULT_LOCALE
     ):
         """Send message to confirm email."""
-        subject = "Service My blog - Verifier of the email address"
-        text = EMAIL_VERIFIER_TEXT.format(name=name, token=token)
-        htm_text = TEMPLATE_HTML_TEXT.format(
-            **{
-                "name": name,
-                "title": "Подтверждение адреса электронной почты",
-                "text": "Для завершения регистрации требуется подтвердить"
-                " адрес электронной почты:",
-                "link": link,
-                "token": token,
-                "label": "подтвердить",
-            },
-        )
-        msg = self.create_email_message(email, subject, text, htm_text)
-        await self.send(msg)
+        await self.send_letter("confirm_email", locale, email, name=name, token=token, link=link)
 
     async def send_message_to_reset_password(
-        self, email: EmailStr, name: str, token: str, link: str
+        self, email: EmailStr, name: str, token: str, link: str, locale: str = DEFAULT_LOCALE
     ):
         """Send message to confirm email."""
-        subject = "Service My blog - Verifier of the email address"
-        text = EMAIL_VERIFIER_TEXT.format(name=name, token=token)
-        htm_text = TEMPLATE_HTML_TEXT.format(
-            **{
-                "name": name,
-                "title": "Сброс пароля",
-                "text": "Для сброса пароля необходимо перейти по ссылке. "
-                "Обратите внимание старый пароль будет изменен"
-                " только в момент внесения нового",
-                "link": link,
-                "token": token,
-                "label": "Сбросить",
-            },
-        )
-        msg = self.create_email_message(email, subject, text, htm_text)
-        await self.send(msg)
+        await self.send_letter("reset_password", locale, email, name=name, token=token, link=link)
+
+    async def send_letter(self, name: str, locale: str, email: EmailStr, **values: str):
+        """Assemble the letter from the precompiled template and put it into the outbox.
+
+        Args:
+            name: name of the letter, see `LETTERS`
+            locale: language of the letter
+            email: recipient
+            values: values of the dynamic fields of the template
+        """
+        raw = self._templates[name, locale].render(email, **values)
+        await self.app.store.outbox.enqueue_raw(self._settings.ems_sender, [email], raw)
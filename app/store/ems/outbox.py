@@ -0,0 +1,196 @@
+import os
+from asyncio import CancelledError, Task, create_task, sleep, wait
+from email.message import EmailMessage
+from socket import gethostname
+
+from base.base_accessor import BaseAccessor
+from base.tracing import TRACER
+from base.utils import delta_time
+from core.settings import EmailMessageServiceSettings
+from redis.exceptions import ResponseError
+
+# milliseconds, how long a worker waits for new letters, it checks the stop after the wait
+READ_BLOCK = 1000
+
+
+class EmailOutbox(BaseAccessor):
+    """Durable queue of outgoing letters on a Redis stream.
+
+    The request path only adds the letter to the stream, the background workers
+    of every application process read it in a consumer group and send it
+    over the persistent SMTP connection of `EmailMessageService`.
+    A failed letter is retried with exponential backoff,
+    after `ems_outbox_max_attempts` it is moved to the dead letter stream.
+    Letters of a stopped worker are claimed by the others after `ems_outbox_claim_idle`,
+    the idle time of a letter being retried is reset before every attempt,
+    so it is not claimed by another worker while its backoff lasts.
+    """
+
+    def _init(self):
+        self.settings = EmailMessageServiceSettings()
+        self.consumer = f"{gethostname()}-{os.getpid()}"
+        self.is_group_created = False
+        self.sent = 0
+        self.failed = 0
+        self.is_stopping = False
+        self._workers: list[Task] = []
+
+    async def connect(self):
+        self.is_stopping = False
+        self._workers = [
+            create_task(self._work(f"{self.consumer}-{number}"))
+            for number in range(self.settings.ems_outbox_workers)
+        ]
+        self.logger.info(
+            f"Email outbox started, stream: {self.settings.ems_outbox_stream},"
+            f" workers: {len(self._workers)}"
+        )
+
+    async def disconnect(self):
+        """Stop the workers, they finish the current batch of letters.
+
+        The workers are not cancelled in a blocking read: the cancelled read of Redis client
+        may never return. A worker which is not stopped in time is cancelled,
+        its letters stay pending and are claimed after the restart.
+        """
+        self.is_stopping = True
+        if self._workers:
+            _, pending = await wait(self._workers, timeout=READ_BLOCK / 1000 + 1)
+            for worker in pending:
+                worker.cancel()
+        self._workers = []
+        self.logger.info("Email outbox stopped")
+
+    async def enqueue(self, msg: EmailMessage) -> str:
+        """Add the letter to the outbox.
+
+        Args:
+            msg: email message to send
+
+        Returns:
+            str: identifier of the stream entry
+        """
+        return await self.enqueue_raw(msg["From"], msg.get_all("To", []), msg.as_bytes())
+
+    @TRACER.traced("outbox.enqueue")
+    async def enqueue_raw(self, sender: str, recipients: list[str], raw: bytes) -> str:
+        """Add an already assembled letter to the outbox.
+
+        Args:
+            sender: envelope sender
+            recipients: envelope recipients
+            raw: letter, as it is sent to the server
+
+        Returns:
+            str: identifier of the stream entry
+        """
+        fields = {
+            "sender": sender,
+            "recipients": ",".join(recipients),
+            # the letter is 7bit, it is decoded by Redis client and encoded back on sending
+            "raw": raw,
+        }
+        return await self.app.redis.connector.xadd(
+            self.settings.ems_outbox_stream,
+            fields,
+            maxlen=self.settings.ems_outbox_max_length,
+            approximate=True,
+        )
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"sent": self.sent, "failed": self.failed}
+
+    async def _work(self, consumer: str):
+        """Reading and sending of the letters, restarts in case of an error."""
+        while not self.is_stopping:
+            try:
+                await self._create_group()
+                for entry_id, fields in await self._claim(consumer) or await self._read(consumer):
+                    await self._deliver(consumer, entry_id, fields)
+            except CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Email outbox worker {consumer} error: {str(e)}")
+                # the stream may have been lost together with the group, e.g. Redis restart
+                self.is_group_created = False
+                await sleep(1)
+
+    async def _create_group(self):
+        if self.is_group_created:
+            return
+        try:
+            await self.app.redis.connector.xgroup_create(
+                self.settings.ems_outbox_stream, self.settings.ems_outbox_group, "0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self.is_group_created = True
+
+    async def _read(self, consumer: str) -> list[tuple[str, dict]]:
+        response = await self.app.redis.connector.xreadgroup(
+            self.settings.ems_outbox_group,
+            consumer,
+            {self.settings.ems_outbox_stream: ">"},
+            count=self.settings.ems_outbox_batch_size,
+            block=READ_BLOCK,
+        )
+        return response[0][1] if response else []
+
+    async def _claim(self, consumer: str) -> list[tuple[str, dict]]:
+        """Take over the letters which were not confirmed by other workers in time."""
+        _, entries, *_ = await self.app.redis.connector.xautoclaim(
+            self.settings.ems_outbox_stream,
+            self.settings.ems_outbox_group,
+            consumer,
+            self.settings.ems_outbox_claim_idle * 1000,
+            count=self.settings.ems_outbox_batch_size,
+        )
+        # the entries deleted from the stream are returned without fields
+        return [(entry_id, fields) for entry_id, fields in entries if fields]
+
+    async def _deliver(self, consumer: str, entry_id: str, fields: dict[str, str]):
+        error = None
+        for attempt in range(self.settings.ems_outbox_max_attempts):
+            if attempt:
+                await self._wait_retry(consumer, entry_id, attempt)
+            try:
+                await self.app.store.ems.send_raw(
+                    fields["sender"], fields["recipients"].split(","), fields["raw"]
+                )
+                self.sent += 1
+                break
+            except Exception as e:
+                error = e
+                self.logger.warning(f"Email outbox, letter {entry_id} is not sent: {str(e)}")
+        else:
+            self.failed += 1
+            await self.app.redis.connector.xadd(
+                self.settings.ems_outbox_dead_letter_stream,
+                {**fields, "error": str(error)},
+                maxlen=self.settings.ems_outbox_max_length,
+                approximate=True,
+            )
+        async with self.app.redis.connector.pipeline(transaction=True) as pipe:
+            await pipe.xack(
+                self.settings.ems_outbox_stream, self.settings.ems_outbox_group, entry_id
+            ).xdel(self.settings.ems_outbox_stream, entry_id).execute()
+
+    async def _wait_retry(self, consumer: str, entry_id: str, attempt: int):
+        """Backoff before the attempt, then the idle time of the entry is reset.
+
+        The total time of the retries may be longer than `ems_outbox_claim_idle`,
+        the idle time is counted from the last attempt only, one backoff is shorter
+        than a half of `ems_outbox_claim_idle`.
+        """
+        delay = self.settings.ems_outbox_retry_delay * 2 ** (attempt - 1) + delta_time()
+        await sleep(min(delay, self.settings.ems_outbox_claim_idle / 2))
+        await self.app.redis.connector.xclaim(
+            self.settings.ems_outbox_stream,
+            self.settings.ems_outbox_group,
+            consumer,
+            0,
+            [entry_id],
+            justid=True,
+        )
@@ -0,0 +1,213 @@
+from asyncio import Semaphore, gather, sleep, timeout
+from collections import deque
+from contextlib import asynccontextmanager
+from time import monotonic, perf_counter
+from typing import AsyncIterator
+
+from aiosmtplib import SMTP
+from base.metrics import REGISTRY
+from core.settings import EmailMessageServiceSettings
+
+Letter = tuple[str, list[str], bytes]
+
+# seconds, the rate of the letters is counted over this window
+RATE_WINDOW = 60
+
+SEND_SECONDS = REGISTRY.histogram(
+    "smtp_send_seconds", "Time of sending a letter over a pooled connection", ("status",)
+)
+
+
+class PooledSMTP:
+    """Authenticated SMTP connection of the pool."""
+
+    __slots__ = ("smtp", "messages", "last_used")
+
+    def __init__(self, smtp: SMTP):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = monotonic()
+
+
+class SMTPPool:
+    """Pool of authenticated SMTP connections.
+
+    An idle connection is closed after `ems_pool_idle_timeout` seconds by `run_reaper`,
+    a connection idle longer than `ems_pool_health_check_interval` is checked with NOOP
+    before reuse, a connection is replaced after `ems_pool_max_messages` letters.
+    The most recently used connection is taken first, so the others expire.
+    After `close` the connections in use are closed when they are returned.
+    """
+
+    def __init__(self, settings: EmailMessageServiceSettings):
+        self.settings = settings
+        self.messages = 0
+        self.opened = 0
+        self.is_closed = False
+        self._sent_at: deque[float] = deque()
+        self._slots = Semaphore(settings.ems_pool_size)
+        self._idle: deque[PooledSMTP] = deque()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[PooledSMTP]:
+        """Take a connection, it is returned to the pool after use.
+
+        A connection on which an error occurred or whose use was cancelled is closed,
+        its state is unknown.
+        """
+        async with timeout(self.settings.ems_pool_acquire_timeout):
+            await self._slots.acquire()
+        try:
+            connection = await self._get()
+            is_broken = True
+            try:
+                yield connection
+                is_broken = False
+            finally:
+                if is_broken:
+                    connection.smtp.close()
+                else:
+                    self._put(connection)
+        finally:
+            self._slots.release()
+
+    async def send(self, sender: str, recipients: list[str], raw: bytes):
+        """Send one letter."""
+        async with self.connection() as connection:
+            await self._send(connection, sender, recipients, raw)
+
+    async def send_many(self, letters: list[Letter]) -> list[Exception | None]:
+        """Send the letters, each connection of the pool sends a share of them one by one.
+
+        Args:
+            letters: sender, recipients and raw message of every letter
+
+        Returns:
+            list: None for a sent letter, otherwise the error, in the order of the letters
+        """
+        results: list[Exception | None] = [None] * len(letters)
+        workers = min(self.settings.ems_pool_size, len(letters))
+        await gather(*(self._send_share(letters, results, i, workers) for i in range(workers)))
+        return results
+
+    async def run_reaper(self):
+        """Close the expired idle connections periodically, runs until it is cancelled."""
+        while True:
+            await sleep(self.settings.ems_pool_idle_timeout / 2)
+            self.reap()
+
+    def reap(self):
+        """Close the connections idle longer than `ems_pool_idle_timeout`."""
+        # the connections are returned to the right, the oldest are on the left
+        deadline = monotonic() - self.settings.ems_pool_idle_timeout
+        while self._idle and self._idle[0].last_used < deadline:
+            self._idle.popleft().smtp.close()
+
+    def close(self):
+        self.is_closed = True
+        while self._idle:
+            self._idle.pop().smtp.close()
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        self._trim_rate()
+        return {
+            "messages": self.messages,
+            "messages_per_second": len(self._sent_at) / RATE_WINDOW,
+            "connections_opened": self.opened,
+            "connections_idle": len(self._idle),
+            # share of the letters sent without opening a new connection,
+            # the connections opened without a letter sent make it negative
+            "reuse_ratio": max(0.0, 1 - self.opened / self.messages) if self.messages else 0.0,
+        }
+
+    async def _send_share(
+        self, letters: list[Letter], results: list[Exception | None], start: int, step: int
+    ):
+        index = start
+        while index < len(letters):
+            try:
+                async with self.connection() as connection:
+                    # the connection is renewed after `ems_pool_max_messages` letters
+                    while index < len(letters) and not self._is_exhausted(connection):
+                        await self._send(connection, *letters[index])
+                        index += step
+            except Exception as e:
+                results[index] = e
+                index += step
+
+    async def _send(self, connection: PooledSMTP, sender: str, recipients: list[str], raw: bytes):
+        started = perf_counter()
+        try:
+            errors, message = await connection.smtp.sendmail(sender, recipients, raw)
+        except Exception:
+            SEND_SECONDS.observe(perf_counter() - started, "error")
+            raise
+        SEND_SECONDS.observe(perf_counter() - started, "error" if errors else "ok")
+        connection.messages += 1
+        self.messages += 1
+        self._sent_at.append(monotonic())
+        self._trim_rate()
+        assert not errors, message
+
+    async def _get(self) -> PooledSMTP:
+        while self._idle:
+            connection = self._idle.pop()
+            idle = monotonic() - connection.last_used
+            if idle > self.settings.ems_pool_idle_timeout or not connection.smtp.is_connected:
+                connection.smtp.close()
+                continue
+            if idle > self.settings.ems_pool_health_check_interval:
+                try:
+                    await connection.smtp.noop()
+                except Exception:  # noqa, the connection is broken, whatever the reason
+                    connection.smtp.close()
+                    continue
+            return connection
+        return await self._open()
+
+    def _put(self, connection: PooledSMTP):
+        if (
+            self.is_closed
+            or self._is_exhausted(connection)
+            or not connection.smtp.is_connected
+        ):
+            connection.smtp.close()
+            return
+        connection.last_used = monotonic()
+        self._idle.append(connection)
+
+    def _trim_rate(self):
+        deadline = monotonic() - RATE_WINDOW
+        while self._sent_at and self._sent_at[0] < deadline:
+            self._sent_at.popleft()
+
+    def _is_exhausted(self, connection: PooledSMTP) -> bool:
+        return connection.messages >= self.settings.ems_pool_max_messages
+
+    async def _open(self) -> PooledSMTP:
+        smtp = SMTP(
+            hostname=self.settings.ems_host,
+            port=self.settings.ems_port,
+            use_tls=self.settings.ems_is_tls,
+        )
+        try:
+            response = await smtp.connect()
+            assert response.code in range(
+                200, 300
+            ), "EmailMessageService, Connection error host={host}, message={message}".format(
+                host=self.settings.ems_host, message=response.message
+            )
+            response = await smtp.login(
+                self.settings.ems_user, self.settings.ems_password.get_secret_value()
+            )
+            assert response.code in range(
+                200, 300
+            ), "EmailMessageService, Authorization  error host={host}, message={message}".format(
+                host=self.settings.ems_host, message=response.message
+            )
+        except Exception:
+            smtp.close()
+            raise
+        self.opened += 1
+        return PooledSMTP(smtp)
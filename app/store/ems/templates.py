@@ -0,0 +1,149 @@
+"""Precompiled letter templates.
+
+A template is split into static and dynamic segments once, on startup.
+The static segments, the headers and the MIME structure of the letter
+are encoded in advance, a letter is assembled by joining the ready bytes
+with the encoded values, without building the `EmailMessage` tree.
+The body of a part is given a transfer encoding after the join, as the values
+may make a line of any length.
+"""
+from binascii import b2a_base64, b2a_qp
+from email.header import Header
+from email.utils import formatdate, make_msgid
+from html import escape
+from socket import getfqdn
+from string import Formatter
+from typing import Callable
+from uuid import uuid4
+
+CRLF = "\r\n"
+# the length of a base64 line, RFC 2045
+BASE64_LINE = 76
+
+
+def to_crlf(text: str) -> str:
+    """SMTP requires CRLF line endings."""
+    return text.replace(CRLF, "\n").replace("\n", CRLF)
+
+
+def encode_body(body: bytes) -> tuple[str, bytes]:
+    """Encode the body of a part into 7bit lines, as `EmailMessage.set_content` does.
+
+    SMTP limits a line to 998 bytes and 8bit data needs the 8BITMIME extension,
+    so the body is quoted-printable or base64, whichever is shorter.
+
+    Returns:
+        tuple: the transfer encoding and the encoded body
+    """
+    # the line breaks of the text are kept, the soft line breaks are CRLF as well
+    quoted = b2a_qp(body, istext=True)
+    encoded = b2a_base64(body, newline=False)
+    if len(quoted) <= len(encoded):
+        return "quoted-printable", quoted
+    lines = (encoded[i:i + BASE64_LINE] for i in range(0, len(encoded), BASE64_LINE))
+    return "base64", CRLF.encode().join(lines)
+
+
+class Template:
+    """Template split into static segments (bytes) and the names of the fields (str).
+
+    The values known at compile time, `constants`, are substituted at once
+    and become a part of the static segments.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        constants: dict[str, str] = None,
+        escape_value: Callable[[str], str] = None,
+    ):
+        self.escape_value = escape_value or (lambda value: value)
+        self.segments: list[bytes | str] = []
+        static = []
+        for literal, field, _, _ in Formatter().parse(source):
+            static.append(literal)
+            if field is None:
+                continue
+            if constants and field in constants:
+                static.append(self.escape_value(constants[field]))
+                continue
+            self._add_static(static)
+            self.segments.append(field)
+        self._add_static(static)
+
+    def render(self, values: dict[str, str]) -> list[bytes]:
+        """Segments of the rendered template, ready to be joined."""
+        return [
+            segment
+            if isinstance(segment, bytes)
+            else to_crlf(self.escape_value(str(values[segment]))).encode()
+            for segment in self.segments
+        ]
+
+    def _add_static(self, static: list[str]):
+        if text := "".join(static):
+            self.segments.append(to_crlf(text).encode())
+        static.clear()
+
+
+class LetterTemplate:
+    """Letter of one kind and locale: multipart/alternative with text and html parts.
+
+    Both parts are utf-8, the body of a part is assembled from the encoded segments
+    and is given the transfer encoding, see `encode_body`.
+    """
+
+    def __init__(
+        self, sender: str, subject: str, text: str, html: str, constants: dict[str, str]
+    ):
+        boundary = f"==============={uuid4().hex}=="
+        # make_msgid resolves the host name on every call without it
+        self.domain = getfqdn()
+        self.head = (
+            f"From: {sender}{CRLF}"
+            f"Subject: {Header(subject, 'utf-8').encode()}{CRLF}"
+            f"MIME-Version: 1.0{CRLF}"
+            f'Content-Type: multipart/alternative; boundary="{boundary}"{CRLF}'
+        ).encode()
+        self.text_head = self._part_head(boundary, "plain")
+        self.html_head = self._part_head(boundary, "html")
+        self.encoding_heads = {
+            encoding: f"Content-Transfer-Encoding: {encoding}{CRLF}{CRLF}".encode()
+            for encoding in ("quoted-printable", "base64")
+        }
+        self.tail = f"{CRLF}--{boundary}--{CRLF}".encode()
+        self.text = Template(text, constants)
+        self.html = Template(html, constants, escape)
+
+    def render(self, email: str, **values: str) -> bytes:
+        """Assemble the letter.
+
+        Args:
+            email: recipient
+            values: values of the dynamic fields of the templates
+
+        Returns:
+            bytes: letter, as it is sent to the server
+        """
+        return b"".join(
+            [
+                self.head,
+                f"To: {email}{CRLF}".encode(),
+                f"Date: {formatdate()}{CRLF}".encode(),
+                f"Message-ID: {make_msgid(domain=self.domain)}{CRLF}".encode(),
+                self.text_head,
+                *self._encode(self.text.render(values)),
+                self.html_head,
+                *self._encode(self.html.render(values)),
+                self.tail,
+            ]
+        )
+
+    def _encode(self, segments: list[bytes]) -> tuple[bytes, bytes]:
+        encoding, body = encode_body(b"".join(segments))
+        return self.encoding_heads[encoding], body
+
+    @staticmethod
+    def _part_head(boundary: str, subtype: str) -> bytes:
+        content_type = f'Content-Type: text/{subtype}; charset="utf-8"'
+        return f"{CRLF}--{boundary}{CRLF}{content_type}{CRLF}".encode()
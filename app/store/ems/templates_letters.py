@@ -51,3 +51,31 @@ TEMPLATE_HTML_TEXT = """\
     </td>
 </tr>
 """
+
+DEFAULT_LOCALE = "ru"
+
+# letters by (name, locale): subject, templates and the values which are the same in every letter
+LETTERS = {
+    ("confirm_email", "ru"): {
+        "subject": "Service My blog - Verifier of the email address",
+        "text": EMAIL_VERIFIER_TEXT,
+        "html": TEMPLATE_HTML_TEXT,
+        "constants": {
+            "title": "Подтверждение адреса электронной почты",
+            "text": "Для завершения регистрации требуется подтвердить адрес электронной почты:",
+            "label": "подтвердить",
+        },
+    },
+    ("reset_password", "ru"): {
+        "subject": "Service My blog - Verifier of the email address",
+        "text": EMAIL_VERIFIER_TEXT,
+        "html": TEMPLATE_HTML_TEXT,
+        "constants": {
+            "title": "Сброс пароля",
+            "text": "Для сброса пароля необходимо перейти по ссылке. "
+            "Обратите внимание старый пароль будет изменен"
+            " только в момент внесения нового",
+            "label": "Сбросить",
+        },
+    },
+}
@@ -0,0 +1,27 @@
+from asyncio import to_thread
+
+from base.base_accessor import BaseAccessor
+from base.executor import ExecutorKind, Executors
+from core.settings import ExecutorSettings
+
+
+class ExecutorAccessor(BaseAccessor):
+    """Pools for synchronous code, started and stopped with the application."""
+
+    def _init(self):
+        self.settings = ExecutorSettings()
+
+    async def connect(self):
+        Executors.start(
+            self.settings.executor_thread_workers, self.settings.executor_process_workers
+        )
+        self.logger.info(f"Executors started: {Executors.stats()}")
+
+    async def disconnect(self):
+        # waiting for the running jobs must not block the event loop
+        await to_thread(Executors.shutdown)
+        self.logger.info("Executors stopped")
+
+    @staticmethod
+    def get(kind: ExecutorKind = "thread"):
+        return Executors.get(kind)
@@ -0,0 +1,89 @@
+import os
+from asyncio import Semaphore, get_running_loop, to_thread
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, TypeVar
+
+from base.base_accessor import BaseAccessor
+from base.tracing import TRACER
+from core.settings import PasswordSettings
+from store.password.hashers import hash_password, verify_password
+
+T = TypeVar("T")
+
+
+class PasswordAccessor(BaseAccessor):
+    """Password hashing service.
+
+    The key derivation functions of hashlib release the GIL,
+    so the hashing is executed in its own bounded thread pool: it does not block
+    the event loop and does not occupy the shared executor of the application.
+    No more than `password_max_pending` hashing jobs are queued at once,
+    the others wait for their turn without occupying the pool.
+    """
+
+    def _init(self):
+        self.settings = PasswordSettings()
+        self.pool: Optional[ThreadPoolExecutor] = None
+        self.pending = Semaphore(self.settings.password_max_pending)
+
+    async def connect(self):
+        self.pool = ThreadPoolExecutor(
+            self.settings.password_workers, thread_name_prefix="password"
+        )
+        self.logger.info(f"Password hashing: {self.prefix}")
+
+    async def disconnect(self):
+        if self.pool:
+            await to_thread(self.pool.shutdown)
+
+    @property
+    def params(self) -> tuple[int, ...]:
+        if self.settings.password_scheme == "scrypt":
+            return (
+                self.settings.password_scrypt_n,
+                self.settings.password_scrypt_r,
+                self.settings.password_scrypt_p,
+            )
+        return (self.settings.password_pbkdf2_iterations,)
+
+    @property
+    def prefix(self) -> str:
+        """Scheme and parameters of the current hashes."""
+        return "$".join([self.settings.password_scheme, *map(str, self.params)]) + "$"
+
+    @TRACER.traced("password.hash")
+    async def hash(self, password: str) -> str:
+        """Hash the password with the current scheme and a new salt.
+
+        Args:
+            password: plain password
+
+        Returns:
+            str: encoded hash
+        """
+        salt = os.urandom(self.settings.password_salt_size)
+        return await self._run(
+            hash_password, password, self.settings.password_scheme, self.params, salt
+        )
+
+    @TRACER.traced("password.verify")
+    async def verify(self, password: str, encoded: str) -> bool:
+        """Check the password.
+
+        Args:
+            password: plain password
+            encoded: encoded hash from the database
+
+        Returns:
+            bool: True if the password matches
+        """
+        return await self._run(verify_password, password, encoded)
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """Whether the hash was made with an old scheme or old parameters."""
+        return not encoded.startswith(self.prefix)
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        async with self.pending:
+            return await get_running_loop().run_in_executor(self.pool, partial(func, *args))
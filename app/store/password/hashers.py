@@ -0,0 +1,69 @@
+"""Password hashing functions.
+
+The encoded hash keeps the scheme and its parameters: `scheme$param...$salt$hash`,
+so a hash stays verifiable after the parameters are changed in the settings.
+Hashes of the old format, the unsalted sha256 hex digest, are verified as well.
+"""
+import hashlib
+import hmac
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Literal
+
+SCHEME = Literal["scrypt", "pbkdf2_sha256"]
+DIGEST_SIZE = 32
+
+
+def hash_password(password: str, scheme: SCHEME, params: tuple[int, ...], salt: bytes) -> str:
+    """Hash the password.
+
+    Args:
+        password: plain password
+        scheme: key derivation function
+        params: scrypt - (n, r, p), pbkdf2_sha256 - (iterations,)
+        salt: random salt
+
+    Returns:
+        str: encoded hash
+    """
+    digest = derive_key(password.encode(), scheme, params, salt)
+    return "$".join([scheme, *map(str, params), b64encode(salt), b64encode(digest)])
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    """Constant-time comparison of the password with the encoded hash.
+
+    Args:
+        password: plain password
+        encoded: encoded hash
+
+    Returns:
+        bool: True if the password matches
+    """
+    if "$" not in encoded:
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, encoded)
+    scheme, *params, salt, digest = encoded.split("$")
+    expected = derive_key(
+        password.encode(), scheme, tuple(map(int, params)), b64decode(salt)  # noqa
+    )
+    return hmac.compare_digest(expected, b64decode(digest))
+
+
+def derive_key(password: bytes, scheme: SCHEME, params: tuple[int, ...], salt: bytes) -> bytes:
+    if scheme == "scrypt":
+        n, r, p = params
+        return hashlib.scrypt(
+            password, salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=DIGEST_SIZE
+        )
+    if scheme == "pbkdf2_sha256":
+        (iterations,) = params
+        return hashlib.pbkdf2_hmac("sha256", password, salt, iterations, DIGEST_SIZE)
+    raise ValueError(f"Unknown password hashing scheme: {scheme}")
+
+
+def b64encode(data: bytes) -> str:
+    return urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def b64decode(data: str) -> bytes:
+    return urlsafe_b64decode(data + "=" * (-len(data) % 4))
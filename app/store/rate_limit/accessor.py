@@ -0,0 +1,107 @@
+from asyncio import timeout
+from typing import Optional
+
+from base.base_accessor import BaseAccessor
+from base.cache import LRUCache
+from base.token_bucket import TokenBucket
+from core.settings import RateLimitRule, RateLimitSettings
+from redis.commands.core import AsyncScript
+
+# GCRA for several keys at once: the request is allowed only if every key allows it,
+# in that case the theoretical arrival time (TAT) of every key is moved forward.
+# ARGV: emission interval and burst tolerance of every key, in milliseconds.
+# Returns 0 if allowed, otherwise milliseconds until the request can be allowed.
+GCRA_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tats = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[i * 2 - 1])
+    local tolerance = tonumber(ARGV[i * 2])
+    local tat = math.max(tonumber(redis.call('GET', key)) or now, now) + interval
+    local wait = tat - tolerance - now
+    if wait > retry_after then
+        retry_after = wait
+    end
+    tats[i] = tat
+end
+if retry_after > 0 then
+    return retry_after
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, tats[i], 'PX', tats[i] - now)
+end
+return 0
+"""
+
+
+class RateLimitAccessor(BaseAccessor):
+    """Rate limiter, GCRA on Redis with a local token bucket in front of it.
+
+    The local bucket rejects the bursts coming to this worker without a trip to Redis,
+    Redis makes the decision shared by all workers.
+    If Redis is not available, the limiter fails open to the local bucket.
+    """
+
+    def _init(self):
+        self.settings = RateLimitSettings()
+        self.buckets = LRUCache(self.settings.rate_limit_local_size)
+        self.script: Optional[AsyncScript] = None
+
+    async def connect(self):
+        self.script = self.app.redis.connector.register_script(GCRA_SCRIPT)
+        self.logger.info(f"Rate limit rules: {list(self.settings.rate_limit_rules)}")
+
+    def get_rules(self, path: str) -> list[RateLimitRule]:
+        return self.settings.rate_limit_rules.get(path, [])
+
+    async def hit(self, path: str, keys: list[tuple[RateLimitRule, str]]) -> float:
+        """Count the request.
+
+        Args:
+            path: route path, the namespace of the keys
+            keys: rules and values of their keys, example: (rule, "127.0.0.1")
+
+        Returns:
+            float: 0 if the request is allowed, otherwise seconds until it can be allowed
+        """
+        if not keys:
+            return 0.0
+        names = [f"rate:{path}:{rule.key}:{value}" for rule, value in keys]
+        buckets = [self._get_bucket(name, rule) for name, (rule, _) in zip(names, keys)]
+        if retry_after := self._take_local(buckets):
+            return retry_after
+        if retry_after := await self._take_shared(names, [rule for rule, _ in keys]):
+            # the request is rejected by the shared limit, it is not counted locally either
+            for bucket in buckets:
+                bucket.refund()
+        return retry_after
+
+    async def _take_shared(self, names: list[str], rules: list[RateLimitRule]) -> float:
+        """GCRA on Redis, if Redis is not available the request is allowed."""
+        args = []
+        for rule in rules:
+            args += [rule.period * 1000 // rule.limit, rule.period * 1000]
+        try:
+            async with timeout(self.settings.rate_limit_redis_timeout):
+                return await self.script(keys=names, args=args) / 1000
+        except Exception as e:
+            self.logger.warning(f"Rate limit, Redis is not available, local limit is used: {e}")
+            return 0.0
+
+    def _get_bucket(self, name: str, rule: RateLimitRule) -> TokenBucket:
+        if (bucket := self.buckets.get(name)) is None:
+            bucket = TokenBucket(rule.limit, rule.period)
+            self.buckets.set(name, bucket)
+        return bucket
+
+    @staticmethod
+    def _take_local(buckets: list[TokenBucket]) -> float:
+        """Take a token from every bucket, if one of them is empty no token is taken."""
+        waits = [bucket.take() for bucket in buckets]
+        if retry_after := max(waits):
+            for bucket, wait in zip(buckets, waits):
+                if not wait:
+                    bucket.refund()
+        return retry_after
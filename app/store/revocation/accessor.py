@@ -0,0 +1,155 @@
+from asyncio import CancelledError, Task, create_task, get_running_loop, sleep
+from datetime import datetime
+from typing import Optional
+
+from base.base_accessor import BaseAccessor
+from base.bloom_filter import BloomFilter
+from core.settings import AuthorizationSettings
+from core.utils import Token
+from redis.asyncio.client import PubSub
+
+BLOCK_LIST_PREFIX = "revoked:"
+# before the revocation by `jti`, the whole encoded token was used as the key
+LEGACY_BLOCK_LIST_PATTERN = "eyJ*"
+
+
+class RevocationAccessor(BaseAccessor):
+    """Token block list.
+
+    Revoked tokens are stored in Redis by their `jti` in the `revoked:` namespace,
+    each worker keeps a local bloom filter of them.
+    The filter is kept in sync through the Redis pub/sub channel and is rebuilt
+    from Redis after reconnection and periodically, to forget the expired tokens.
+    Redis is consulted only if the filter contains the token.
+    """
+
+    def _init(self):
+        self.settings = AuthorizationSettings()
+        self.filter = self._create_filter()
+        self.is_synced = False
+        self.is_migrated = False
+        self._listener: Optional[Task] = None
+
+    async def connect(self):
+        self._listener = create_task(self._listen())
+        self.logger.info("Revocation listener started, channel: {}".format(self.channel))
+
+    async def disconnect(self):
+        if self._listener:
+            self._listener.cancel()
+        self.logger.info("Revocation listener stopped")
+
+    @property
+    def channel(self) -> str:
+        return self.settings.auth_revocation_channel
+
+    async def revoke(self, jti: str, user_id: str, expire: int):
+        """Add the token to the block list.
+
+        Args:
+            jti: unique identifier of the token
+            user_id: Unique identifier for the user, UUID
+            expire: number of seconds
+        """
+        await self.app.store.cache.set_and_publish(
+            BLOCK_LIST_PREFIX + jti, user_id, expire, self.channel, jti
+        )
+        self.filter.add(jti)
+
+    async def is_revoked(self, jti: str) -> bool:
+        """Check if the token is in the block list.
+
+        Until the filter is loaded, Redis is always consulted: at the start
+        and after an error of the listener, until the filter is reloaded on reconnection,
+        since the tokens revoked in the meantime are missing from it.
+
+        Args:
+            jti: unique identifier of the token
+
+        Returns:
+            bool: True if the token is revoked
+        """
+        if self.is_synced and jti not in self.filter:
+            return False
+        return -2 != await self.app.store.cache.ttl(BLOCK_LIST_PREFIX + jti)
+
+    def _create_filter(self) -> BloomFilter:
+        return BloomFilter(
+            self.settings.auth_revocation_capacity, self.settings.auth_revocation_error_rate
+        )
+
+    async def _load(self):
+        """Rebuild the filter from the block list stored in Redis."""
+        bloom_filter = self._create_filter()
+        for key in await self.app.store.cache.keys(BLOCK_LIST_PREFIX + "*"):
+            bloom_filter.add(key.removeprefix(BLOCK_LIST_PREFIX))
+        self.filter = bloom_filter
+        self.is_synced = True
+
+    async def _migrate_legacy_entries(self):
+        """Move the entries keyed by the encoded token to the `revoked:` namespace.
+
+        The lifetime of the new entry is limited by the token expiration time.
+        A failed migration is logged and repeated after the next reconnection,
+        it does not prevent the filter from being loaded.
+        """
+        try:
+            tokens = await self._legacy_tokens()
+            if tokens:
+                await self._move_legacy_entries(tokens)
+                self.logger.info(f"Revocation, legacy entries migrated: {len(tokens)}")
+            self.is_migrated = True
+        except Exception as e:
+            self.logger.error(f"Revocation, legacy entries are not migrated: {str(e)}")
+
+    async def _legacy_tokens(self) -> dict[str, Token]:
+        """Entries keyed by the encoded token, by the key."""
+        tokens = {}
+        for key in await self.app.store.cache.keys(LEGACY_BLOCK_LIST_PATTERN):
+            try:
+                tokens[key] = Token(key)
+            except Exception:  # noqa, not a token, the key belongs to someone else
+                continue
+        return tokens
+
+    async def _move_legacy_entries(self, tokens: dict[str, Token]):
+        now = int(datetime.now().timestamp())
+        user_ids = await self.app.store.cache.mget(*tokens)
+        async with self.app.store.cache.transaction() as pipe:
+            for token, user_id in zip(tokens.values(), user_ids):
+                if token.jti and user_id and token.exp > now:
+                    pipe.set(BLOCK_LIST_PREFIX + token.jti, user_id, ex=token.exp - now + 5)
+            await pipe.delete(*tokens).execute()
+
+    async def _listen(self):
+        """Listening to the channel of revoked tokens, reconnects in case of an error."""
+        while True:
+            pubsub = self.app.redis.connector.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                if not self.is_migrated:
+                    await self._migrate_legacy_entries()
+                # the filter is loaded after the subscription, so no message is lost
+                await self._load()
+                await self._receive(pubsub)
+            except CancelledError:
+                raise
+            except Exception as e:
+                # the messages published until the reconnection are lost
+                self.is_synced = False
+                self.logger.error(f"Revocation listener error: {str(e)}")
+                await sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def _receive(self, pubsub: PubSub):
+        """Add the revoked tokens to the filter, the filter is rebuilt periodically."""
+        loop = get_running_loop()
+        rebuild_at = loop.time() + self.settings.auth_revocation_rebuild_interval
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1)
+            if message and message["type"] == "message":
+                self.filter.add(message["data"])
+            if loop.time() > rebuild_at:
+                await self._load()
+                rebuild_at = loop.time() + self.settings.auth_revocation_rebuild_interval
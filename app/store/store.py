@@ -4,7 +4,13 @@ from store.cache.accessor import CacheAccessor
 from store.database.postgres import Postgres
 from store.database.redis import RedisAccessor
 from store.ems.ems import EmailMessageService
+from store.ems.outbox import EmailOutbox
+from store.executor.accessor import ExecutorAccessor
+from store.password.accessor import PasswordAccessor
+from store.rate_limit.accessor import RateLimitAccessor
+from store.revocation.accessor import RevocationAccessor
 from store.token.accessor import TokenAccessor
+from store.tracing.accessor import TracingAccessor
 from store.user.accessor import UserAccessor
 from store.user_manager.manager import UserManager
 
@@ -21,10 +27,14 @@ class Store:
 
         self.auth = UserAccessor(app)
         self.token = TokenAccessor(app)
+        self.password = PasswordAccessor(app)
         self.auth_manager = UserManager(app)
         self.cache = CacheAccessor(app)
+        self.rate_limit = RateLimitAccessor(app)
+        self.revocation = RevocationAccessor(app)
         self.blog = BlogAccessor(app)
         self.ems = EmailMessageService(app)
+        self.outbox = EmailOutbox(app)
 
 
 def setup_store(app):
@@ -34,9 +44,18 @@ def setup_store(app):
     data sources which we run when the application is launched,
     and how to disable them.
 
+    The data sources are connected in the order of creation and disconnected
+    in the reverse order: the services which use Redis, Postgres and the executors
+    stop first, then the executors, Redis and Postgres, the tracing is the last.
+
     Args:
         app: The application
     """
+    shutdown = app.router.on_shutdown
+    registered = len(shutdown)
+    app.tracing = TracingAccessor(app)
     app.postgres = Postgres(app)
     app.redis = RedisAccessor(app)
+    app.executor = ExecutorAccessor(app)
     app.store = Store(app)
+    shutdown[registered:] = reversed(shutdown[registered:])
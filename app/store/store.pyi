@@ -2,6 +2,10 @@ from core.components import Application
 from store.blog.accessor import BlogAccessor
 from store.cache.accessor import CacheAccessor
 from store.ems.ems import EmailMessageService
+from store.ems.outbox import EmailOutbox
+from store.password.accessor import PasswordAccessor
+from store.rate_limit.accessor import RateLimitAccessor
+from store.revocation.accessor import RevocationAccessor
 from store.token.accessor import TokenAccessor
 from store.user.accessor import UserAccessor
 from store.user_manager.manager import UserManager
@@ -12,9 +16,13 @@ class Store:
     blog: BlogAccessor
     auth: UserAccessor
     token: TokenAccessor
+    password: PasswordAccessor
     auth_manager: UserManager
     cache: CacheAccessor
+    rate_limit: RateLimitAccessor
+    revocation: RevocationAccessor
     ems: EmailMessageService
+    outbox: EmailOutbox
 
     def __init__(self, app: Application): ...
 
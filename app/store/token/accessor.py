@@ -1,17 +1,51 @@
-from datetime import datetime, timedelta
+from time import time
+from typing import Optional
 from uuid import uuid4
 
 from base.base_accessor import BaseAccessor
+from base.batcher import Batcher
+from base.tracing import TRACER
 from core.settings import AuthorizationSettings
-from jose import jwt
+from core.utils import Token
+from jose import JWSError
 from pydantic import EmailStr
+from store.token.crypto import decode_tokens, sign_tokens
 
 
 class TokenAccessor(BaseAccessor):
+    """Token signing and verification.
+
+    Depending on `auth_crypto_mode` the cryptography is executed on the event loop (inline),
+    or in the thread or process pool of the application in batches.
+    The codec is chosen by `auth_backend`, see `store.token.codec`.
+    """
+
     def _init(self):
         self.settings = AuthorizationSettings()
+        self.signer: Optional[Batcher] = None
+        self.verifier: Optional[Batcher] = None
+
+    async def connect(self):
+        if self.settings.auth_crypto_mode == "inline":
+            return
+        # the pool must be enabled, the error is raised on startup, not on the first login
+        self.app.executor.get(self.settings.auth_crypto_mode)
+        options = {
+            "executor": self.settings.auth_crypto_mode,
+            "batch_size": self.settings.auth_crypto_batch_size,
+            "delay": self.settings.auth_crypto_batch_delay,
+        }
+        self.signer = Batcher(sign_tokens, *self._sign_args(), **options)
+        self.verifier = Batcher(decode_tokens, *self._decode_args(), **options)
+        self.logger.info(f"Token crypto mode: {self.settings.auth_crypto_mode}")
 
-    def create_token(self, type_token: str, subject: dict, expire: int) -> str:
+    async def disconnect(self):
+        for batcher in (self.signer, self.verifier):
+            if batcher:
+                await batcher.close()
+
+    @TRACER.traced("token.sign")
+    async def create_token(self, type_token: str, subject: dict, expire: int) -> str:
         """Create a new token.
 
         Args:
@@ -22,42 +56,71 @@ class TokenAccessor(BaseAccessor):
         Returns:
             object: token
         """
-        return jwt.encode(
-            {
-                "subject": subject,
-                "type": type_token,
-                "exp": datetime.utcnow() + timedelta(seconds=expire),
-                "iat": datetime.utcnow(),
-                "jti": uuid4().hex,
-            },
-            self.settings.auth_key.get_secret_value(),
-            self.settings.auth_algorithms[0],
-        )
-
-    def create_access_token(self, user_id: str, email: EmailStr) -> str:
+        now = int(time())
+        claims = {
+            "subject": subject,
+            "type": type_token,
+            "exp": now + expire,
+            "iat": now,
+            "jti": uuid4().hex,
+        }
+        if self.signer is None:
+            return sign_tokens([claims], *self._sign_args())[0]
+        return await self.signer.submit(claims)
+
+    @TRACER.traced("token.decode")
+    async def decode_token(self, token: str) -> Token:
+        """Decode the token and verify its signature.
+
+        Args:
+            token: encoded token
+
+        Returns:
+            object: verified token
+
+        Raises:
+            JWSError: if the token is malformed or the signature is not valid
+        """
+        if self.verifier is None:
+            result = decode_tokens([token], *self._decode_args())[0]
+        else:
+            result = await self.verifier.submit(token)
+        if isinstance(result, str):
+            raise JWSError(result)
+        return result
+
+    def _sign_args(self) -> tuple[str, str, str]:
+        key = self.settings.auth_key.get_secret_value()
+        return key, self.settings.auth_algorithms[0], self.settings.auth_backend
+
+    def _decode_args(self) -> tuple[str, list[str], str]:
+        key = self.settings.auth_key.get_secret_value()
+        return key, self.settings.auth_algorithms, self.settings.auth_backend
+
+    async def create_access_token(self, user_id: str, email: EmailStr) -> str:
         subject = {
             "user_id": user_id,
             "email": email,
         }
-        return self.create_token("access", subject, 600)
+        return await self.create_token("access", subject, 600)
 
-    def create_refresh_token(self, user_id: str, email: EmailStr) -> str:
+    async def create_refresh_token(self, user_id: str, email: EmailStr) -> str:
         subject = {
             "user_id": user_id,
             "email": email,
         }
-        return self.create_token("refresh", subject, 172000)
+        return await self.create_token("refresh", subject, 172000)
 
-    def create_verification_token(self, user_id: str, email: EmailStr) -> str:
+    async def create_verification_token(self, user_id: str, email: EmailStr) -> str:
         subject = {
             "user_id": user_id,
             "email": email,
         }
-        return self.create_token("verification", subject, 180)
+        return await self.create_token("verification", subject, 180)
 
-    def create_reset_token(self, user_id: str, email: EmailStr) -> str:
+    async def create_reset_token(self, user_id: str, email: EmailStr) -> str:
         subject = {
             "user_id": user_id,
             "email": email,
         }
-        return self.create_token("reset", subject, 180)
+        return await self.create_token("reset", subject, 180)
@@ -0,0 +1,110 @@
+"""Token codecs: encoding, decoding and signature verification in one pass."""
+import hmac
+import json
+from abc import ABC, abstractmethod
+from base64 import urlsafe_b64encode
+from functools import lru_cache
+from hashlib import sha256, sha384, sha512
+from typing import Literal
+
+from core.utils import Token, decode_segments
+from jose import JWSError, jwk, jwt
+from jose.exceptions import JWKError
+
+__all__ = ["BACKEND", "CODECS", "TokenCodec", "JoseCodec", "HmacCodec"]
+
+BACKEND = Literal["jose", "hmac"]
+
+
+class TokenCodec(ABC):
+    """The base codec.
+
+    The token is split and decoded once, the signature is verified
+    on the already decoded segments, the result is a verified `Token`.
+    """
+
+    @abstractmethod
+    def encode(self, claims: dict, key: str, algorithm: str) -> str:
+        """Encode and sign the claims.
+
+        Args:
+            claims: claims of the token, `exp` and `iat` are unix timestamps
+            key: secret key
+            algorithm: signature algorithm
+
+        Returns:
+            object: encoded token
+        """
+
+    @abstractmethod
+    def verify_signature(self, signing_input: bytes, signature: bytes, key: str, alg: str) -> bool:
+        """Whether the signature of the signing input is valid."""
+
+    def decode(self, token: str, key: str, algorithms: list[str]) -> Token:
+        """Decode the token and verify its signature.
+
+        Args:
+            token: encoded token
+            key: secret key
+            algorithms: allowed signature algorithms
+
+        Returns:
+            object: verified token
+
+        Raises:
+            JWSError: if the token is malformed or the signature is not valid
+        """
+        header, claims, signing_input, signature = decode_segments(token)
+        alg = header.get("alg")
+        if alg not in algorithms:
+            raise JWSError("The specified alg value is not allowed")
+        if not self.verify_signature(signing_input, signature, key, alg):
+            raise JWSError("Signature verification failed.")
+        return Token(token, header, claims)
+
+
+class JoseCodec(TokenCodec):
+    """python-jose backend."""
+
+    def encode(self, claims: dict, key: str, algorithm: str) -> str:
+        return jwt.encode(claims, key, algorithm)
+
+    def verify_signature(self, signing_input: bytes, signature: bytes, key: str, alg: str) -> bool:
+        try:
+            return self._get_key(key, alg).verify(signing_input, signature)
+        except JWKError as e:
+            raise JWSError(str(e))
+
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _get_key(key: str, alg: str) -> jwk.Key:
+        return jwk.construct(key, alg)
+
+
+class HmacCodec(TokenCodec):
+    """Standard library backend, HMAC algorithms only."""
+
+    digests = {"HS256": sha256, "HS384": sha384, "HS512": sha512}
+
+    def encode(self, claims: dict, key: str, algorithm: str) -> str:
+        header = self._b64encode({"alg": algorithm, "typ": "JWT"}, sort_keys=True)
+        signing_input = header + b"." + self._b64encode(claims)
+        signature = urlsafe_b64encode(self._sign(signing_input, key, algorithm)).rstrip(b"=")
+        return (signing_input + b"." + signature).decode()
+
+    def verify_signature(self, signing_input: bytes, signature: bytes, key: str, alg: str) -> bool:
+        return hmac.compare_digest(self._sign(signing_input, key, alg), signature)
+
+    def _sign(self, signing_input: bytes, key: str, alg: str) -> bytes:
+        if alg not in self.digests:
+            raise JWSError(f"Algorithm {alg} is not supported, use one of: {list(self.digests)}")
+        # one-shot digest, computed in C without an HMAC object
+        return hmac.digest(key.encode(), signing_input, self.digests[alg])
+
+    @staticmethod
+    def _b64encode(data: dict, sort_keys: bool = False) -> bytes:
+        segment = json.dumps(data, separators=(",", ":"), sort_keys=sort_keys).encode()
+        return urlsafe_b64encode(segment).rstrip(b"=")
+
+
+CODECS: dict[str, TokenCodec] = {"jose": JoseCodec(), "hmac": HmacCodec()}
@@ -0,0 +1,48 @@
+"""Batch functions of token signing and verification.
+
+The functions are defined at the module level,
+so they can be executed in the process pool.
+"""
+from core.utils import Token
+from jose import JWSError
+from store.token.codec import BACKEND, CODECS
+
+
+def sign_tokens(claims: list[dict], key: str, algorithm: str, backend: BACKEND) -> list[str]:
+    """Sign the tokens.
+
+    Args:
+        claims: list of claims of the tokens
+        key: secret key
+        algorithm: signature algorithm
+        backend: name of the codec
+
+    Returns:
+        list: encoded tokens
+    """
+    codec = CODECS[backend]
+    return [codec.encode(item, key, algorithm) for item in claims]
+
+
+def decode_tokens(
+    tokens: list[str], key: str, algorithms: list[str], backend: BACKEND
+) -> list[Token | str]:
+    """Decode the tokens and verify their signatures.
+
+    Args:
+        tokens: encoded tokens
+        key: secret key
+        algorithms: allowed signature algorithms
+        backend: name of the codec
+
+    Returns:
+        list: verified token, or the error message for an invalid token
+    """
+    codec = CODECS[backend]
+    results = []
+    for token in tokens:
+        try:
+            results.append(codec.decode(token, key, algorithms))
+        except JWSError as e:
+            results.append(str(e.args[0]) if e.args else "Signature verification failed.")
+    return results
@@ -0,0 +1,50 @@
+from asyncio import to_thread
+from typing import Optional
+
+from base.base_accessor import BaseAccessor
+from base.trace_export import FileWriter, OtlpWriter, SpanExporter
+from base.tracing import TRACER
+from core.settings import TracingSettings
+
+
+class TracingAccessor(BaseAccessor):
+    """Request tracing, the exporter is started and stopped with the application."""
+
+    def _init(self):
+        self.settings = TracingSettings()
+        self.exporter: Optional[SpanExporter] = None
+
+    async def connect(self):
+        if not self.settings.tracing_enabled:
+            return
+        service = self.app.settings.app_name
+        if self.settings.tracing_exporter == "otlp":
+            writer = OtlpWriter(self.settings.tracing_otlp_endpoint, service)
+        else:
+            writer = FileWriter(self.settings.tracing_file, service)
+        self.exporter = SpanExporter(
+            writer,
+            self.settings.tracing_batch_size,
+            self.settings.tracing_flush_interval,
+            self.settings.tracing_queue_size,
+        )
+        self.exporter.start()
+        TRACER.configure(
+            self.exporter,
+            self.settings.tracing_sample_rate,
+            self.settings.tracing_tail_latency,
+            self.settings.tracing_tail_errors,
+        )
+        self.logger.info(f"Tracing started, exporter: {self.settings.tracing_exporter}")
+
+    async def disconnect(self):
+        if self.exporter is None:
+            return
+        TRACER.disable()
+        # the queued traces are written, it must not block the event loop
+        await to_thread(self.exporter.stop)
+        self.logger.info("Tracing stopped")
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return self.exporter.stats if self.exporter is not None else {}
@@ -48,19 +48,12 @@ class UserAccessor(BaseAccessor):
 
         Args:
             user_id: user identifier, UUID
-            refresh_token: refresh token
+            refresh_token: refresh token, None - reset the token
 
         Returns:
             object: UserModel
         """
-        update_data = {
-            name: value
-            for index, (name, value) in enumerate(locals().items())
-            if int(index) > 1 and value
-        }
-        query = self.app.postgres.get_query_update_by_field(
-            UserModel, "id", user_id, **update_data
-        )
+        query = self.get_query_update_refresh_token(user_id, refresh_token)
         result = await self.app.postgres.query_execute(query)
         return result.scalar_one_or_none()
 
@@ -77,12 +70,40 @@ class UserAccessor(BaseAccessor):
         return result.scalar_one_or_none()
 
     async def get_users(
-        self, page: int = 0, size: int = 10, sort_params: Sorted_order = None
+        self, page: int = 0, size: int = 10, sort_params: Sorted_order = None, cursor: str = None
     ) -> list[UserModel]:
-        query = self.app.postgres.get_query_filter(UserModel, page, size, sort_params)
+        """Get a page of users.
+
+        Args:
+            page: number of page, ignored if the cursor is specified
+            size: page size
+            sort_params: sort parameters
+            cursor: cursor of the previous page, enables keyset pagination
+
+        Returns:
+            list: users
+        """
+        if cursor:
+            query = self.app.postgres.get_query_keyset(UserModel, size, sort_params, cursor)
+        else:
+            query = self.app.postgres.get_query_filter(UserModel, page, size, sort_params)
         result = await self.app.postgres.query_execute(query)
         return result.scalars().all()  # noqa
 
+    def get_query_update_refresh_token(self, user_id: str, refresh_token: str = None) -> Query:
+        """Get query updated refresh token.
+
+        Args:
+            user_id: user identifier, UUID
+            refresh_token: refresh token, None - reset the token
+
+        Returns:
+            object: user Query
+        """
+        return self.app.postgres.get_query_update_by_field(
+            UserModel, "id", user_id, refresh_token=refresh_token
+        ).returning(UserModel)
+
     def get_query_create_user(
         self,
         name: str,
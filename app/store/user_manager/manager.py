@@ -1,13 +1,16 @@
 import json
+from asyncio import gather
+from datetime import datetime
 from typing import Any, Literal
 from uuid import uuid4
 
 from base.base_accessor import BaseAccessor
+from base.debug_trace import DebugTrace
+from base.tracing import TRACER
 from core.settings import AuthorizationSettings
 from pydantic import EmailStr, SecretStr
-from icecream import ic
 
-ic.includeContext = True
+trace = DebugTrace(__name__)
 Field_names = Literal["id", "name", "email", "password", "created", "modified"]
 
 USER_DATA_KEY = Literal[
@@ -25,41 +28,55 @@ class UserManager(BaseAccessor):
         self.settings = AuthorizationSettings()
         self.expire = 180
 
+    @TRACER.traced()
     async def create_user(self, name: str, email: EmailStr, password: str):
         """Create temporary user data.
 
-        1. Check email address in cache.
+        1. Reserve the email address in cache.
         2. Check email in database.
         3. Create token for verification email address
         4. Save the temporary data in Redis
         5. Send letter in email for verification email addresses.
 
+        The email is reserved first, in one round trip to Redis, so concurrent requests
+        for the same email do not query the database and do not hash the password.
+        The reservation is released if the user data is not saved or the letter is not sent.
+
         Args:
             name: User
             email: User email address
-            password: hash of password
+            password: plain password, it is saved hashed
         """
-        seconds = await self.app.store.cache.ttl(email)
-        assert -1 > seconds, (
-            f"A letter has been sent to this email address '{email}',"
-            f" check the email or the address is not specified correctly."
-            f"Resending an email is possible after {seconds} seconds"
-        )
-        user = await self.app.store.auth.get_user_by_email(email)
-        assert not user, f"Email is already in use, try other email address, not these '{email}'"
-        token = self.app.store.token.create_verification_token(uuid4().hex, email)
-        ic("create verification token ", token)
-        user_str = json.dumps(
-            {
-                "name": name or "Пользователь",
-                "email": email,
-                "password": password,
-                "id": uuid4().hex,
-            }
-        )
-        await self.app.store.cache.set(email, user_str, self.expire)
-        await self.app.store.ems.send_message_to_confirm_email(email, name, token, link="test")
+        await self._reserve_email(email, "", self.expire)
+        try:
+            user = await self.app.store.auth.get_user_by_email(email)
+            assert not user, (
+                f"Email is already in use, try other email address, not these '{email}'"
+            )
+            token, password = await gather(
+                self.app.store.token.create_verification_token(uuid4().hex, email),
+                self.app.store.password.hash(password),
+            )
+            if trace.enabled:
+                trace("verification token created", email=email)
+            user_str = json.dumps(
+                {
+                    "name": name or "Пользователь",
+                    "email": email,
+                    "password": password,
+                    "id": uuid4().hex,
+                }
+            )
+            await self.app.store.cache.set(email, user_str, self.expire)
+            await self.app.store.ems.send_message_to_confirm_email(
+                email, name, token, link="test"
+            )
+        except BaseException as e:
+            # also on cancellation, otherwise the email stays reserved until it expires
+            await self.app.store.cache.delete(email)
+            raise e
 
+    @TRACER.traced()
     async def user_registration(self, email: EmailStr) -> tuple[dict[USER_DATA_KEY, Any], str]:
         """Registration new user.
 
@@ -67,62 +84,79 @@ class UserManager(BaseAccessor):
         user_data = await self.app.store.cache.get(email)
         assert user_data, "User data, not found, please try again creating user"
         user_data = json.loads(user_data)
-        try:
-            async with self.app.postgres.session.begin().session as session:
-                query_user = self.app.store.auth.get_query_create_user(
-                    user_data["name"], email, user_data["password"]
-                )
-                query_user_blog = self.app.store.blog.get_query_create_user(
-                    user_data["name"], email
-                )
+        async with self.app.postgres.unit_of_work() as session:
+            query_user = self.app.store.auth.get_query_create_user(
+                user_data["name"], email, user_data["password"]
+            )
+            query_user_blog = self.app.store.blog.get_query_create_user(user_data["name"], email)
+            with TRACER.span("postgres.insert", tables="user,user_blog"):
                 user, user_blog = [
                     (await session.execute(q)).scalar_one_or_none()
                     for q in [query_user, query_user_blog]
                 ]
-                access, refresh = self._create_access_and_refresh_tokens(user.id.hex, user.email)
-                await self.app.store.auth.update_refresh_token(user.id, refresh)
-                await session.commit()
-                await self.app.store.cache.delete(email)
-        except Exception as e:
-            await session.rollback()
-            raise e
-        else:
-            return {**user.as_dict(), "access_token": access}, refresh
+            access, refresh = await self._create_access_and_refresh_tokens(
+                user.id.hex, user.email
+            )
+            query_refresh = self.app.store.auth.get_query_update_refresh_token(user.id, refresh)
+            with TRACER.span("postgres.update", tables="user"):
+                user = (await session.execute(query_refresh)).scalar_one_or_none()
+        await self.app.store.cache.delete(email)
+        return {**user.as_dict(), "access_token": access}, refresh
 
+    @TRACER.traced()
     async def login(
             self, email: EmailStr, password: SecretStr
     ) -> tuple[dict[USER_DATA_KEY, Any], str]:
         """Login user amd create new tokens.
 
         1. Check email in database
-        2. Compare password in database
-        3. Update refresh token in database
+        2. Compare password with the hash in database, in constant time
+        3. Replace the hash if it was made with old parameters
+        4. Update refresh token in database
 
         Args:
             email: user email address
-            password: hash password, for compare in database
+            password: plain password
 
         Returns:
              objects: user data, new refresh token
         """
         user = await self.app.store.auth.get_user_by_email(email)
         assert user, "User not found"
-        assert user.password == password.get_secret_value(), "Password is incorrect"
-        access, refresh = self._create_access_and_refresh_tokens(user.id.hex, user.email)
+        plain = password.get_secret_value()
+        assert await self.app.store.password.verify(plain, user.password), "Password is incorrect"
+        if self.app.store.password.needs_rehash(user.password):
+            await self.update_password(user.id, plain)
+        access, refresh = await self._create_access_and_refresh_tokens(user.id.hex, user.email)
         user = await self.app.store.auth.update_refresh_token(user.id, refresh)
         return {**user.as_dict(), "access_token": access}, refresh
 
-    async def logout(self, user_id: str, token: str, expire: int):
+    @TRACER.traced()
+    async def update_password(self, user_id: str, password: str):
+        """Save the new password of the user.
+
+        Args:
+            user_id: Unique identifier for the user, UUID
+            password: plain password
+        """
+        await self.app.store.auth.update_password(
+            user_id, await self.app.store.password.hash(password)
+        )
+
+    @TRACER.traced()
+    async def logout(self, user_id: str, jti: str, expire: int):
         """Logout the user.
 
         Args:
             user_id: Unique identifier for the user, UUID
-            token: refresh token
-            expire: number of seconds
+            jti: unique identifier of the access token
+            expire: token expiration time, unix timestamp
         """
-        await self.app.store.cache.set(token, user_id, expire + 5)
+        seconds = expire - int(datetime.now().timestamp())
+        await self.app.store.revocation.revoke(jti, user_id, seconds + 5)
         await self.app.store.auth.update_refresh_token(user_id)
 
+    @TRACER.traced()
     async def refresh(self, email: EmailStr) -> tuple[dict[USER_DATA_KEY, Any], str]:
         """Refresh the user tokens.
 
@@ -137,11 +171,12 @@ class UserManager(BaseAccessor):
         """
         user = await self.app.store.auth.get_user_by_email(email)
         assert not user, "User not found"
-        access, refresh = self._create_access_and_refresh_tokens(user.id.hex, user.email)
+        access, refresh = await self._create_access_and_refresh_tokens(user.id.hex, user.email)
         user = await self.app.store.auth.update_refresh_token(user.id, refresh)
         assert not user, "User not found"
         return {**user.as_dict(), "access_token": access}, refresh
 
+    @TRACER.traced()
     async def reset_password(self, email: EmailStr):
         """Initializing reset user password.
 
@@ -154,27 +189,37 @@ class UserManager(BaseAccessor):
         # try:
         user = await self.app.store.auth.get_user_by_email(email)
         assert user, f"User with email address {email} not found."
-        seconds = await self.app.store.cache.ttl(user.email)
-        assert -1 > seconds, (
-            f"A letter has been sent to this email address '{user.email}',"
-            f" check the email or the address is not specified correctly."
-            f"Resending an email is possible after {seconds} seconds"
-        )
-        token = self.app.store.token.create_reset_token(user.id.hex, user.email)
-        ic(token)
-        flag = False
+        token = await self.app.store.token.create_reset_token(user.id.hex, user.email)
+        if trace.enabled:
+            trace("reset token created", user_id=user.id.hex)
+        await self._reserve_email(user.email, token, 180)
         try:
-            await self.app.store.cache.set(user.email, token, 180)
-            flag = True
             await self.app.store.ems.send_message_to_reset_password(
                 user.email, user.name, token, "reset_ password"
             )
         except Exception as e:
-            if flag:
-                await self.app.store.cache.delete(user.email)
+            await self.app.store.cache.delete(user.email)
             raise e
 
-    def _create_access_and_refresh_tokens(self, user_id: str, email: EmailStr) -> tuple[str, str]:
+    async def _reserve_email(self, email: EmailStr, value: str, expire: int):
+        """Save the data for the email, if a letter has not been sent to it yet.
+
+        Args:
+            email: user email address
+            value: data to save
+            expire: number of seconds
+        """
+        async with self.app.store.cache.transaction() as pipe:
+            is_set, seconds = await pipe.set(email, value, ex=expire, nx=True).ttl(email).execute()
+        assert is_set, (
+            f"A letter has been sent to this email address '{email}',"
+            f" check the email or the address is not specified correctly."
+            f"Resending an email is possible after {seconds} seconds"
+        )
+
+    async def _create_access_and_refresh_tokens(
+            self, user_id: str, email: EmailStr
+    ) -> tuple[str, str]:
         """Create access, refresh tokens.
 
         Args:
@@ -184,6 +229,7 @@ class UserManager(BaseAccessor):
         Returns:
             list of tokens
         """
-        access_token = self.app.store.token.create_access_token(user_id, email)
-        refresh_token = self.app.store.token.create_refresh_token(user_id, email)
-        return access_token, refresh_token
+        return await gather(
+            self.app.store.token.create_access_token(user_id, email),
+            self.app.store.token.create_refresh_token(user_id, email),
+        )
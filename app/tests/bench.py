@@ -0,0 +1,46 @@
+"""Helpers of the benchmarks: timing of the calls and the report table."""
+import asyncio
+import gc
+from time import perf_counter
+from typing import Awaitable, Callable
+
+
+def measure(func: Callable[[], object], number: int) -> float:
+    """Mean time of a call, microseconds."""
+    gc.collect()
+    started = perf_counter()
+    for _ in range(number):
+        func()
+    return (perf_counter() - started) / number * 1e6
+
+
+async def measure_async(func: Callable[[], Awaitable], number: int) -> float:
+    """Mean time of a sequential call, microseconds."""
+    gc.collect()
+    started = perf_counter()
+    for _ in range(number):
+        await func()
+    return (perf_counter() - started) / number * 1e6
+
+
+async def throughput(func: Callable[[], Awaitable], number: int, concurrency: int) -> float:
+    """Calls per second, `concurrency` tasks make `number` calls together."""
+    counter = iter(range(number))
+
+    async def worker():
+        for _ in counter:
+            await func()
+
+    started = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return number / (perf_counter() - started)
+
+
+def report(title: str, header: tuple[str, ...], rows: list[tuple]):
+    """Print the results as a markdown table, it is copied to docs/benchmarks.md."""
+    lines = [f"\n#### {title}\n", "| " + " | ".join(header) + " |"]
+    lines.append("|" + "---|" * len(header))
+    for row in rows:
+        cells = (f"{cell:.2f}" if isinstance(cell, float) else str(cell) for cell in row)
+        lines.append("| " + " | ".join(cells) + " |")
+    print("\n".join(lines))
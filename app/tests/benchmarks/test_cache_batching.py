@@ -0,0 +1,74 @@
+"""Latency of the cache flows against a real Redis: several round trips against one.
+
+The baseline flows are reproduced as they were before the batched operations:
+a TTL check followed by SET, SET followed by PUBLISH, and GET of every key.
+"""
+from itertools import count
+from types import SimpleNamespace
+
+import pytest
+from redis.asyncio import Redis
+from store.cache.accessor import CacheAccessor
+from store.user_manager.manager import UserManager
+from tests.bench import measure_async, report
+from tests.conftest import FakeApp
+
+NUMBER = 2000
+KEYS = 10
+
+
+@pytest.fixture
+def cache_app(real_redis: Redis) -> FakeApp:
+    app = FakeApp()
+    app.redis = SimpleNamespace(connector=real_redis)
+    app.store = SimpleNamespace(cache=CacheAccessor(app))
+    return app
+
+
+@pytest.mark.benchmark
+async def test_cache_batching(cache_app: FakeApp):
+    cache, manager = cache_app.store.cache, UserManager(cache_app)
+    emails, names = count(), [f"bench:{index}" for index in range(KEYS)]
+    await cache.mset({name: "value" for name in names})
+
+    async def ttl_and_set():
+        email = f"bench-{next(emails)}@example.com"
+        assert await cache.ttl(email) == -2
+        await cache.set(email, "value", 180)
+
+    async def reserve_email():
+        await manager._reserve_email(f"bench-{next(emails)}@example.com", "value", 180)  # noqa
+
+    async def set_and_publish_sequential():
+        await cache.set("bench:revoked", "1", 60)
+        await cache.publish("bench:channel", "jti")
+
+    async def set_and_publish():
+        await cache.set_and_publish("bench:revoked", "1", 60, "bench:channel", "jti")
+
+    async def get_each():
+        assert [await cache.get(name) for name in names] == ["value"] * KEYS
+
+    async def mget():
+        assert await cache.mget(*names) == ["value"] * KEYS
+
+    flows = [
+        ("reserve an email", ttl_and_set, reserve_email),
+        ("revoke a token", set_and_publish_sequential, set_and_publish),
+        (f"read {KEYS} keys", get_each, mget),
+    ]
+    rows = []
+    for flow, sequential, batched in flows:
+        results = [float("inf"), float("inf")]
+        for _ in range(3):
+            for index, call in enumerate((sequential, batched)):
+                results[index] = min(results[index], await measure_async(call, NUMBER))
+        rows.append((flow, *results, results[0] / results[1]))
+    report(
+        "Cache flows against a local Redis, microseconds per flow",
+        ("flow", "sequential calls", "one round trip", "speedup"),
+        rows,
+    )
+    # MULTI/EXEC adds two commands to the round trip, the gain of a short flow is small
+    assert all(row[2] < row[1] * 1.1 for row in rows)
+    assert rows[-1][3] > 3
@@ -0,0 +1,93 @@
+"""Event loop lag during a login storm, by the token crypto mode.
+
+Every login signs two tokens, as `UserManager._create_access_and_refresh_tokens` does.
+A probe sleeps 1 ms in a loop, the lag is how much later than planned it wakes up;
+it is the delay added to every other request served by the worker at that time.
+"""
+import asyncio
+from statistics import quantiles
+from time import perf_counter
+
+import pytest
+from base.executor import Executors
+from store.executor.accessor import ExecutorAccessor
+from store.token.accessor import TokenAccessor
+from tests.bench import report
+from tests.conftest import FakeApp
+
+RATE = 1000
+SECONDS = 2
+TICK = 0.01
+PROBE = 0.001
+
+
+async def probe(lags: list[float], stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        planned = loop.time() + PROBE
+        await asyncio.sleep(PROBE)
+        lags.append((loop.time() - planned) * 1000)
+
+
+async def storm(tokens: TokenAccessor) -> list[float]:
+    """Logins at RATE per second, their latencies in milliseconds."""
+    latencies = []
+
+    async def login():
+        started = perf_counter()
+        await asyncio.gather(
+            tokens.create_access_token("id", "user@example.com"),
+            tokens.create_refresh_token("id", "user@example.com"),
+        )
+        latencies.append((perf_counter() - started) * 1000)
+
+    requests = []
+    started = perf_counter()
+    for tick in range(int(SECONDS / TICK)):
+        requests.extend(asyncio.create_task(login()) for _ in range(int(RATE * TICK)))
+        await asyncio.sleep(max(0.0, started + (tick + 1) * TICK - perf_counter()))
+    await asyncio.gather(*requests)
+    assert len(latencies) == RATE * SECONDS
+    return latencies
+
+
+def percentile(values: list[float], number: int) -> float:
+    return quantiles(values, n=100)[number - 1]
+
+
+@pytest.mark.benchmark
+async def test_crypto_mode_loop_lag(app):
+    app.executor = ExecutorAccessor(app)
+    Executors.start(4, 1)
+    rows = []
+    try:
+        for mode in ("inline", "thread", "process"):
+            tokens = TokenAccessor(FakeApp())
+            tokens.app.executor = app.executor
+            tokens.settings = tokens.settings.model_copy(update={"auth_crypto_mode": mode})
+            await tokens.connect()
+            # the process pool is started before the measurement
+            await tokens.create_access_token("id", "user@example.com")
+            lags, stop = [], asyncio.Event()
+            task = asyncio.create_task(probe(lags, stop))
+            latencies = await storm(tokens)
+            stop.set()
+            await task
+            await tokens.disconnect()
+            rows.append(
+                (
+                    mode,
+                    percentile(lags, 50),
+                    percentile(lags, 99),
+                    max(lags),
+                    percentile(latencies, 50),
+                    percentile(latencies, 99),
+                )
+            )
+    finally:
+        Executors.shutdown()
+    report(
+        f"Login storm, {RATE} logins per second, two tokens per login, milliseconds",
+        ("mode", "loop lag p50", "loop lag p99", "loop lag max", "login p50", "login p99"),
+        rows,
+    )
@@ -0,0 +1,64 @@
+"""Cost of the debug trace on the request path: disabled against enabled.
+
+The requests go through the pure ASGI middleware stack, the permission check
+writes one trace record per request. The enabled trace writes to a logger
+with an in-memory handler, so the cost of the terminal is not measured.
+"""
+import logging
+from io import StringIO
+
+import pytest
+from base.debug_trace import DebugTrace
+from core.middelware import AuthorizationMiddleware, ErrorHandlingMiddleware
+from tests.bench import measure, measure_async, report
+from tests.benchmarks.test_middleware import create_app, request
+
+NUMBER = 2000
+ROUNDS = 5
+
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger("tests.debug_trace")
+    stream = StringIO()
+    logger.addHandler(logging.StreamHandler(stream))
+    logger.propagate = False
+    yield logger
+    logger.handlers.clear()
+    DebugTrace.configure(logger, [])
+
+
+@pytest.mark.benchmark
+async def test_debug_trace_overhead(monkeypatch, logger: logging.Logger):
+    monkeypatch.setattr("core.middelware.PUBLIC_ACCESS", [["/topic/get/1", "GET"]])
+    app = create_app(lambda app: AuthorizationMiddleware(app, None, None), ErrorHandlingMiddleware)
+    trace = DebugTrace("tests.benchmarks.debug_trace")
+    enabled = ["core.middelware", trace.module]
+    modes = {
+        "disabled": ([], logging.DEBUG),
+        "enabled, DEBUG is filtered by the logger": (enabled, logging.INFO),
+        "enabled, record is written": (enabled, logging.DEBUG),
+    }
+    results = {name: float("inf") for name in modes}
+    calls = {}
+    statuses = set()
+    for _ in range(ROUNDS):
+        for name, (modules, level) in modes.items():
+            logger.setLevel(level)
+            DebugTrace.configure(logger, modules)
+            call = request(app, statuses)
+            results[name] = min(results[name], await measure_async(call, NUMBER))
+
+            def guarded():
+                if trace.enabled:
+                    trace("check permission", token_type="anonymous", path="/", method="GET")
+
+            calls[name] = min(calls.get(name, float("inf")), measure(guarded, NUMBER))
+    disabled = results["disabled"]
+    report(
+        "Debug trace, GET /topic/get/{id} through the pure ASGI stack",
+        ("trace", "µs per request", "overhead, µs", "µs per guarded call"),
+        [(name, value, value - disabled, calls[name]) for name, value in results.items()],
+    )
+    assert statuses == {200}
+    assert calls["disabled"] < 1
@@ -0,0 +1,71 @@
+"""Time of a page of topics by its depth: OFFSET against the cursor (keyset pagination).
+
+The table gets two million topics, they are generated by the server and deleted after.
+"""
+from time import perf_counter
+
+import pytest
+from sqlalchemy import delete, text
+from store.blog.models import TopicModel
+from store.database.postgres import Postgres
+from tests.bench import report
+
+TOPICS = 2_000_000
+SIZE = 20
+DEPTHS = (0, 10_000, 100_000, 1_000_000, 1_900_000)
+SORT_PARAMS = {"title": "ASC"}
+
+
+@pytest.fixture
+async def topics(postgres: Postgres):
+    table = f'"{TopicModel.__table__.schema}"."{TopicModel.__tablename__}"'
+    async with postgres.unit_of_work() as session:
+        await session.execute(delete(TopicModel).where(TopicModel.title.like("bench-%")))
+        await session.execute(
+            text(
+                f"INSERT INTO {table} (id, title, description) "
+                "SELECT gen_random_uuid(), 'bench-' || lpad(n::text, 8, '0'), 'description' "
+                "FROM generate_series(1, :number) AS n"
+            ),
+            {"number": TOPICS},
+        )
+        await session.execute(text(f"ANALYZE {table}"))
+    yield
+    async with postgres.unit_of_work() as session:
+        await session.execute(delete(TopicModel).where(TopicModel.title.like("bench-%")))
+
+
+async def timed(postgres: Postgres, query) -> tuple[float, list[TopicModel]]:
+    """Best of three, milliseconds."""
+    best, rows = float("inf"), []
+    for _ in range(3):
+        started = perf_counter()
+        rows = (await postgres.query_execute(query)).scalars().all()
+        best = min(best, (perf_counter() - started) * 1000)
+    return best, rows
+
+
+@pytest.mark.benchmark
+async def test_keyset_pagination(postgres: Postgres, topics):
+    rows = []
+    for depth in DEPTHS:
+        offset_ms, page = await timed(
+            postgres, Postgres.get_query_filter(TopicModel, depth // SIZE, SIZE, SORT_PARAMS)
+        )
+        # the cursor of the previous page, as the client gets it
+        cursor = None
+        if depth:
+            query = Postgres.get_query_filter(TopicModel, depth // SIZE - 1, SIZE, SORT_PARAMS)
+            previous = (await postgres.query_execute(query)).scalars().all()
+            cursor = Postgres.get_cursor(TopicModel, previous[-1].as_dict(), SORT_PARAMS)
+        keyset_ms, keyset_page = await timed(
+            postgres, Postgres.get_query_keyset(TopicModel, SIZE, SORT_PARAMS, cursor)
+        )
+        assert [topic.id for topic in keyset_page] == [topic.id for topic in page]
+        rows.append((depth, offset_ms, keyset_ms))
+    report(
+        f"Page of {SIZE} topics sorted by title, {TOPICS} topics, milliseconds",
+        ("rows before the page", "OFFSET", "cursor"),
+        rows,
+    )
+    assert rows[-1][2] * 10 < rows[-1][1]
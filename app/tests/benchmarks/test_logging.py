@@ -0,0 +1,96 @@
+"""Throughput of failing requests, every request writes a WARNING record.
+
+The baseline is the previous loguru handler: the record is formatted and written
+to the stream in the event loop, with `diagnose`. The buffered handler is configured
+as `setup_logging` does it: `enqueue`, `BatchedSink` and `LogFilter`.
+The records are written to a file, and to the same file through a stream whose
+write blocks for a while, as a pipe to a slow log collector does.
+"""
+import logging
+import sys
+from pathlib import Path
+from time import sleep
+from typing import TextIO
+
+import pytest
+from core.logger import BatchedSink, LogFilter
+from core.middelware import ErrorHandlingMiddleware
+from core.settings import Settings
+from fastapi import FastAPI
+from loguru import logger
+from tests.bench import report, throughput
+from tests.benchmarks.test_middleware import request
+
+NUMBER = 3000
+CONCURRENCY = 20
+# seconds, the time of a blocking write
+WRITE_DELAY = 0.0002
+
+
+class BlockingStream:
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def write(self, message: str):
+        sleep(WRITE_DELAY)
+        self.stream.write(message)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+    app.logger = logger
+    app.settings = Settings()
+
+    @app.get("/topic/get/{topic_id}")
+    async def get_topic(topic_id: int):
+        raise RuntimeError(f"topic {topic_id} is not available")
+
+    app.add_middleware(ErrorHandlingMiddleware)
+    return app
+
+
+@pytest.fixture
+def stream(tmp_path: Path):
+    with open(tmp_path / "app.log", "w") as stream:
+        yield stream
+    logger.configure(handlers=[{"sink": sys.stderr}])
+
+
+def buffered(stream: TextIO, enqueue: bool, dedup_window: float) -> dict:
+    return {
+        "sink": BatchedSink(stream),
+        "diagnose": False,
+        "enqueue": enqueue,
+        "filter": LogFilter({}, dedup_window).loguru,
+    }
+
+
+@pytest.mark.benchmark
+async def test_logging_throughput(stream):
+    app = create_app()
+    handlers = {
+        "baseline: written in the event loop": lambda sink: {"sink": sink, "diagnose": True},
+        "batched": lambda sink: buffered(sink, False, 0),
+        "batched, enqueue": lambda sink: buffered(sink, True, 0),
+        "batched, enqueue, repeats aggregated": lambda sink: buffered(sink, True, 10),
+    }
+    rows, statuses = [], set()
+    for stream_name, sink in (("file", stream), ("blocking write", BlockingStream(stream))):
+        for name, handler in handlers.items():
+            logger.configure(handlers=[{"level": logging.INFO, **handler(sink)}])
+            rate = await throughput(request(app, statuses), NUMBER, CONCURRENCY)
+            # the queued records are written by the background thread, after the requests
+            await logger.complete()
+            rows.append((stream_name, name, rate))
+    logger.remove()
+    report(
+        f"{NUMBER} failing requests, {CONCURRENCY} concurrent, one WARNING record per request",
+        ("stream", "handler", "requests per second"),
+        rows,
+    )
+    assert statuses == {400}
+    # the blocking write does not stop the event loop
+    assert rows[5][2] > rows[4][2] * 2
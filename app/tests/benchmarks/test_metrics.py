@@ -0,0 +1,53 @@
+"""Overhead of recording the metrics.
+
+The cost of a recording call, and the time of a request through the pure ASGI stack
+with the request histogram against the same stack where the recording does nothing.
+"""
+from types import SimpleNamespace
+
+import pytest
+from base.metrics import Counter, Histogram
+from core.middelware import AuthorizationMiddleware, ErrorHandlingMiddleware
+from tests.bench import measure, measure_async, report
+from tests.benchmarks.test_middleware import create_app, request
+
+NUMBER = 100_000
+REQUESTS = 2000
+ROUNDS = 5
+
+
+@pytest.mark.benchmark
+async def test_metrics_overhead(monkeypatch):
+    counter = Counter("calls", "calls", ("group",))
+    histogram = Histogram("seconds", "seconds", ("method", "route", "status"))
+    calls = [
+        ("Counter.inc", measure(lambda: counter.inc("redis"), NUMBER)),
+        (
+            "Histogram.observe",
+            measure(lambda: histogram.observe(0.003, "GET", "/topic/get/{id}", 200), NUMBER),
+        ),
+    ]
+
+    monkeypatch.setattr("core.middelware.PUBLIC_ACCESS", [["/topic/get/1", "GET"]])
+    app = create_app(lambda app: AuthorizationMiddleware(app, None, None), ErrorHandlingMiddleware)
+    recorder = SimpleNamespace(observe=lambda *args: None)
+    results = {"recorded": float("inf"), "not recorded": float("inf")}
+    statuses = set()
+    for _ in range(ROUNDS):
+        for name in results:
+            with monkeypatch.context() as patch:
+                if name == "not recorded":
+                    patch.setattr("core.middelware.REQUEST_SECONDS", recorder)
+                time = await measure_async(request(app, statuses), REQUESTS)
+            results[name] = min(results[name], time)
+    report(
+        "Recording of the metrics, µs",
+        ("call", "µs"),
+        [
+            *calls,
+            ("request, histogram recorded", results["recorded"]),
+            ("request, recording does nothing", results["not recorded"]),
+        ],
+    )
+    assert statuses == {200}
+    assert all(time < 5 for _, time in calls)
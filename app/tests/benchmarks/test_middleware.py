@@ -0,0 +1,110 @@
+"""Per-request overhead of the middleware stack: BaseHTTPMiddleware against pure ASGI.
+
+The baseline stack is reproduced with `BaseHTTPMiddleware` and the same checks,
+the requests are sent directly to the ASGI application, without a server and a client.
+"""
+import logging
+from asyncio import Event
+
+import pytest
+from core.exception_handler import ExceptionHandler
+from core.middelware import AuthorizationMiddleware, ErrorHandlingMiddleware
+from core.settings import Settings
+from core.utils import Token
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+from tests.bench import measure_async, report
+
+NUMBER = 2000
+ROUNDS = 5
+
+
+class BaseErrorHandlingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        try:
+            return await call_next(request)
+        except Exception as error:
+            return ExceptionHandler()(error, request.url)
+
+
+class BaseAuthorizationMiddleware(BaseHTTPMiddleware):
+    public_access = [["/topic/get/1", "GET"]]
+
+    async def dispatch(self, request, call_next):
+        AuthorizationMiddleware.check_permission(self, "anonymous", request.url.path, "GET")
+        request.state.token = Token()
+        return await call_next(request)
+
+
+def create_app(*middlewares) -> FastAPI:
+    app = FastAPI()
+    app.logger = logging.getLogger("tests")
+    app.settings = Settings()
+
+    @app.get("/topic/get/{topic_id}")
+    async def get_topic(topic_id: int):
+        return {"id": topic_id, "title": "title"}
+
+    for middleware in middlewares:
+        app.add_middleware(middleware)
+    return app
+
+
+def request(app: FastAPI, statuses: set[int]):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/topic/get/1",
+        "raw_path": b"/topic/get/1",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 1),
+        "server": ("localhost", 80),
+    }
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.add(message["status"])
+
+    def call():
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            # after the body the client waits for the response, as a real client does
+            return messages.pop() if messages else await Event().wait()
+
+        return app(scope, receive, send)
+
+    return call
+
+
+@pytest.mark.benchmark
+async def test_middleware_overhead(monkeypatch):
+    # the public path is enough, the tokens are verified by the same code in both stacks
+    monkeypatch.setattr("core.middelware.PUBLIC_ACCESS", [["/topic/get/1", "GET"]])
+    apps = {
+        "no middleware": create_app(),
+        "BaseHTTPMiddleware": create_app(BaseAuthorizationMiddleware, BaseErrorHandlingMiddleware),
+        "pure ASGI": create_app(
+            lambda app: AuthorizationMiddleware(app, None, None), ErrorHandlingMiddleware
+        ),
+    }
+    results = {name: float("inf") for name in apps}
+    statuses = set()
+    # the rounds are interleaved, the best round of each stack is taken
+    for _ in range(ROUNDS):
+        for name, app in apps.items():
+            call = request(app, statuses)
+            results[name] = min(results[name], await measure_async(call, NUMBER))
+    bare = results["no middleware"]
+    report(
+        "Middleware stack, GET /topic/get/{id}",
+        ("stack", "µs per request", "overhead, µs"),
+        [(name, value, value - bare) for name, value in results.items()],
+    )
+    assert statuses == {200}
+    assert results["pure ASGI"] < results["BaseHTTPMiddleware"]
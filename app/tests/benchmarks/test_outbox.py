@@ -0,0 +1,65 @@
+"""Letters sent from the request path against the outbox, with a local SMTP server.
+
+The baseline is reproduced as it was: every letter opens a connection, logs in,
+sends and closes the connection in the request path. With the outbox the request
+only adds the letter to the Redis stream, the workers send it over pooled connections.
+"""
+from time import perf_counter
+
+import pytest
+from aiosmtplib import SMTP
+from redis.asyncio import Redis
+from store.ems.ems import EmailMessageService
+from store.ems.outbox import EmailOutbox
+from store.ems.templates_letters import DEFAULT_LOCALE
+from tests.bench import measure_async, report
+from tests.conftest import FakeApp, SMTPHandler
+
+NUMBER = 300
+
+
+@pytest.mark.benchmark
+async def test_outbox_throughput(real_redis: Redis, smtp_server: SMTPHandler):
+    app = FakeApp()
+    app.redis = type("Redis", (), {"connector": real_redis})
+    ems, outbox = EmailMessageService(app), EmailOutbox(app)
+    app.store = type("Store", (), {"ems": ems, "outbox": outbox})
+    settings = ems._settings  # noqa
+    raw = ems._templates["confirm_email", DEFAULT_LOCALE].render(  # noqa
+        "user@example.com", name="user", token="token" * 20, link="confirm"
+    )
+
+    async def baseline():
+        smtp = SMTP(hostname=settings.ems_host, port=settings.ems_port)
+        await smtp.connect()
+        await smtp.login(settings.ems_user, settings.ems_password.get_secret_value())
+        await smtp.sendmail(settings.ems_sender, ["user@example.com"], raw)
+        smtp.close()
+
+    async def enqueue():
+        await outbox.enqueue_raw(settings.ems_sender, ["user@example.com"], raw)
+
+    baseline_us = await measure_async(baseline, NUMBER)
+    await outbox._create_group()  # noqa
+    enqueue_us = await measure_async(enqueue, NUMBER)
+    started = perf_counter()
+    await outbox.connect()
+    while outbox.sent < NUMBER:
+        await ems.app.redis.connector.ping()
+    drained = perf_counter() - started
+    await outbox.disconnect()
+    ems._pool.close()  # noqa
+    assert len(smtp_server.letters) == NUMBER * 2
+    report(
+        f"{NUMBER} letters to a local SMTP server",
+        ("path", "request latency, microseconds", "letters per second"),
+        [
+            ("baseline: connection per letter", baseline_us, 1e6 / baseline_us),
+            (
+                f"outbox: {settings.ems_outbox_workers} workers, pool of {settings.ems_pool_size}",
+                enqueue_us,
+                NUMBER / drained,
+            ),
+        ],
+    )
+    assert enqueue_us * 5 < baseline_us
@@ -0,0 +1,66 @@
+"""Throughput and latency of password hashing by the size of the pool.
+
+The hashes are made with the default parameters (scrypt, n=2**14, r=8, p=1),
+32 requests hash at once. The event loop lag shows that the hashing does not block it.
+"""
+import asyncio
+from statistics import quantiles
+from time import perf_counter
+
+import pytest
+from store.password.accessor import PasswordAccessor
+from tests.bench import report
+from tests.conftest import FakeApp
+
+NUMBER = 64
+CONCURRENCY = 32
+PROBE = 0.001
+
+
+async def probe(lags: list[float], stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        planned = loop.time() + PROBE
+        await asyncio.sleep(PROBE)
+        lags.append((loop.time() - planned) * 1000)
+
+
+@pytest.mark.benchmark
+async def test_password_pool():
+    rows = []
+    for workers in (1, 2, 4, 8):
+        passwords = PasswordAccessor(FakeApp())
+        passwords.settings = passwords.settings.model_copy(update={"password_workers": workers})
+        await passwords.connect()
+        latencies, lags, stop = [], [], asyncio.Event()
+        counter = iter(range(NUMBER))
+
+        async def worker():
+            for _ in counter:
+                started = perf_counter()
+                await passwords.hash("password")
+                latencies.append((perf_counter() - started) * 1000)
+
+        task = asyncio.create_task(probe(lags, stop))
+        started = perf_counter()
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+        elapsed = perf_counter() - started
+        stop.set()
+        await task
+        await passwords.disconnect()
+        percentiles = quantiles(latencies, n=100)
+        rows.append(
+            (
+                workers,
+                NUMBER / elapsed,
+                percentiles[49],
+                percentiles[98],
+                quantiles(lags, n=100)[98],
+            )
+        )
+    report(
+        f"Password hashing, {CONCURRENCY} concurrent requests, milliseconds",
+        ("workers", "hashes per second", "latency p50", "latency p99", "loop lag p99"),
+        rows,
+    )
+    assert all(row[4] < 50 for row in rows)
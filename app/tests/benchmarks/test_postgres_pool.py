@@ -0,0 +1,48 @@
+"""Throughput of the queries with concurrent requests: one shared session against the pool.
+
+Before the unit of work, all the requests used one `AsyncSession`, which can run
+one query at a time, so it is reproduced as a session behind a lock.
+Every query takes 5 ms on the server (`pg_sleep`), like a query doing real work.
+"""
+from asyncio import Lock
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from store.database.postgres import Postgres
+from tests.bench import report, throughput
+
+SLEEP = select(func.pg_sleep(0.005))
+NUMBER = 400
+
+
+@pytest.mark.benchmark
+async def test_pool_throughput(postgres: Postgres):
+    shared = AsyncSession(postgres._engine)  # noqa
+    lock = Lock()
+
+    async def shared_session():
+        async with lock:
+            await shared.execute(SLEEP)
+            await shared.commit()
+
+    async def unit_of_work():
+        await postgres.query_execute(SLEEP)
+
+    rows = []
+    for concurrency in (1, 4, 16, 32):
+        rows.append(
+            (
+                concurrency,
+                await throughput(shared_session, NUMBER, concurrency),
+                await throughput(unit_of_work, NUMBER, concurrency),
+            )
+        )
+    await shared.close()
+    report(
+        "Postgres, queries per second by the number of concurrent requests",
+        ("concurrent requests", "shared session", "unit of work (pool)"),
+        rows,
+    )
+    assert rows[-1][2] > rows[0][2] * 2
+    assert rows[-1][2] > rows[-1][1] * 2
@@ -0,0 +1,57 @@
+"""Throughput of `get_user_by_email`: SQL text with the value inlined against bound parameters.
+
+The baseline builder is reproduced with `text()`, as it was before the bound parameters:
+every email gives a new SQL string, which asyncpg prepares again.
+"""
+from random import choice
+
+import pytest
+from sqlalchemy import delete, insert, select, text
+from store.database.postgres import Postgres
+from store.user.accessor import UserAccessor
+from store.user.models import UserModel
+from tests.bench import measure_async, report
+
+USERS = 10000
+NUMBER = 2000
+
+
+def text_query(email: str):
+    return select(UserModel).where(text(f"email = '{email}'"))
+
+
+@pytest.fixture
+async def users(postgres: Postgres) -> list[str]:
+    emails = [f"bench-{index}@example.com" for index in range(USERS)]
+    async with postgres.unit_of_work() as session:
+        await session.execute(delete(UserModel).where(UserModel.email.like("bench-%")))
+        await session.execute(
+            insert(UserModel),
+            [{"name": email, "email": email, "password": "-"} for email in emails],
+        )
+    yield emails
+    async with postgres.unit_of_work() as session:
+        await session.execute(delete(UserModel).where(UserModel.email.like("bench-%")))
+
+
+@pytest.mark.benchmark
+async def test_get_user_by_email(app, postgres: Postgres, users: list[str]):
+    accessor = UserAccessor(app)
+
+    async def inlined():
+        result = await postgres.query_execute(text_query(choice(users)))
+        assert result.scalar_one_or_none()
+
+    async def bound():
+        assert await accessor.get_user_by_email(choice(users))
+
+    results = {"text() with the inlined value": 0.0, "bound parameters": 0.0}
+    for _ in range(3):
+        for name, call in zip(results, (inlined, bound)):
+            results[name] = max(results[name], 1e6 / await measure_async(call, NUMBER))
+    report(
+        f"get_user_by_email, {USERS} users, a random email per call",
+        ("query builder", "calls per second"),
+        list(results.items()),
+    )
+    assert results["bound parameters"] > results["text() with the inlined value"]
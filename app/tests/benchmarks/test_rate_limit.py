@@ -0,0 +1,63 @@
+"""Decision latency of the rate limiter against a real Redis.
+
+A request rejected by the local token bucket makes no trip to Redis,
+the other requests are decided by GCRA on Redis for all the workers.
+"""
+from itertools import count
+from types import SimpleNamespace
+
+import pytest
+from core.settings import RateLimitRule
+from redis.asyncio import Redis
+from store.rate_limit.accessor import RateLimitAccessor
+from tests.bench import measure_async, report
+from tests.conftest import FakeApp
+
+NUMBER = 5000
+PATH = "/auth/login"
+
+
+@pytest.mark.benchmark
+async def test_rate_limit_decision(real_redis: Redis):
+    app = FakeApp()
+    app.redis = SimpleNamespace(connector=real_redis)
+    limiter, shared = RateLimitAccessor(app), RateLimitAccessor(app)
+    await limiter.connect()
+    await shared.connect()
+    ips = count()
+    wide = RateLimitRule(key="ip", limit=10**9, period=60)
+    narrow = RateLimitRule(key="ip", limit=1, period=3600)
+    email = RateLimitRule(key="email", limit=10**9, period=60)
+
+    async def allowed():
+        assert not await limiter.hit(PATH, [(wide, "1.1.1.1"), (email, "a@example.com")])
+
+    async def rejected_locally():
+        assert await limiter.hit(PATH, [(narrow, "2.2.2.2")])
+
+    async def rejected_by_redis():
+        # the limit is taken by another worker, this one has its local token
+        ip = str(next(ips))
+        await shared.hit(PATH, [(narrow, ip)])
+        assert await limiter.hit(PATH, [(narrow, ip)])
+
+    async def other_worker():
+        await shared.hit(PATH, [(narrow, str(next(ips)))])
+
+    await limiter.hit(PATH, [(narrow, "2.2.2.2")])
+    rows = [
+        ("allowed, two keys", await measure_async(allowed, NUMBER)),
+        ("rejected by the local bucket", await measure_async(rejected_locally, NUMBER)),
+        (
+            "rejected by Redis",
+            # the call of the other worker is subtracted
+            await measure_async(rejected_by_redis, NUMBER)
+            - await measure_async(other_worker, NUMBER),
+        ),
+    ]
+    report(
+        "Rate limit decision, microseconds",
+        ("decision", "latency"),
+        rows,
+    )
+    assert rows[1][1] * 5 < rows[0][1]
@@ -0,0 +1,60 @@
+"""Letters sent to a local SMTP server over the pool, with the metrics of the pool.
+
+The letters are sent one by one, by concurrent senders and in bulk with `send_many`,
+every way gets a new pool; its measured rate is compared with the `stats` of the pool.
+"""
+from time import perf_counter
+
+import pytest
+from core.settings import EmailMessageServiceSettings
+from store.ems.smtp_pool import RATE_WINDOW, SMTPPool
+from tests.bench import report, throughput
+from tests.conftest import SMTPHandler
+
+NUMBER = 500
+BODY = (b"text " * 15 + b"\r\n") * 14
+LETTER = ("from@example.com", ["to@example.com"], b"Subject: letter\r\n\r\n" + BODY)
+
+
+@pytest.mark.benchmark
+async def test_smtp_pool_metrics(smtp_server: SMTPHandler):
+    settings = EmailMessageServiceSettings()
+
+    async def send_one_by_one(pool: SMTPPool) -> float:
+        return await throughput(lambda: pool.send(*LETTER), NUMBER, 1)
+
+    async def send_concurrently(pool: SMTPPool) -> float:
+        return await throughput(lambda: pool.send(*LETTER), NUMBER, settings.ems_pool_size * 2)
+
+    async def send_many(pool: SMTPPool) -> float:
+        started = perf_counter()
+        assert not any(await pool.send_many([LETTER] * NUMBER))
+        return NUMBER / (perf_counter() - started)
+
+    rows = []
+    for name, run in (
+        ("one by one", send_one_by_one),
+        (f"{settings.ems_pool_size * 2} senders", send_concurrently),
+        ("send_many", send_many),
+    ):
+        pool = SMTPPool(settings)
+        rate = await run(pool)
+        stats = pool.stats
+        pool.close()
+        rows.append(
+            (
+                name,
+                rate,
+                stats["messages_per_second"] * RATE_WINDOW,
+                stats["connections_opened"],
+                stats["reuse_ratio"],
+            )
+        )
+        assert stats["messages"] == NUMBER
+    assert len(smtp_server.letters) == NUMBER * 3
+    report(
+        f"{NUMBER} letters, pool of {settings.ems_pool_size},"
+        f" a connection sends {settings.ems_pool_max_messages} letters",
+        ("sender", "letters per second", f"letters in {RATE_WINDOW} s", "opened", "reuse ratio"),
+        rows,
+    )
@@ -0,0 +1,46 @@
+"""Letters rendered per second: the `EmailMessage` tree against the precompiled template.
+
+The baseline is reproduced as it was: the templates are formatted with `str.format`
+and the letter is built as `EmailMessage` and serialized with `as_bytes`.
+"""
+from email.message import EmailMessage
+from html import escape
+
+import pytest
+from store.ems.templates import LetterTemplate
+from store.ems.templates_letters import DEFAULT_LOCALE, LETTERS
+from tests.bench import measure, report
+
+NUMBER = 2000
+VALUES = {"name": "Иван", "token": "t" * 300, "link": "confirm-email"}
+
+
+@pytest.mark.benchmark
+def test_templates_render():
+    letter = LETTERS["confirm_email", DEFAULT_LOCALE]
+    template = LetterTemplate("noreply@example.com", **letter)
+
+    def baseline():
+        msg = EmailMessage()
+        msg["Subject"] = letter["subject"]
+        msg["From"] = "noreply@example.com"
+        msg["To"] = "user@example.com"
+        msg.set_content(letter["text"].format(**VALUES))
+        html_values = {**letter["constants"], **VALUES, "name": escape(VALUES["name"])}
+        msg.add_alternative(letter["html"].format(**html_values), subtype="html")
+        msg.as_bytes()
+
+    def precompiled():
+        template.render("user@example.com", **VALUES)
+
+    baseline_us = measure(baseline, NUMBER)
+    precompiled_us = measure(precompiled, NUMBER)
+    report(
+        f"Letter confirm_email, {len(VALUES['token'])} characters token",
+        ("render", "microseconds", "letters per second"),
+        [
+            ("EmailMessage", baseline_us, 1e6 / baseline_us),
+            ("precompiled template", precompiled_us, 1e6 / precompiled_us),
+        ],
+    )
+    assert precompiled_us * 10 < baseline_us
@@ -0,0 +1,61 @@
+"""Encode, decode and verify throughput of the token codecs.
+
+The baseline decoding is reproduced as it was before the codecs: the headers,
+the claims and the signature were decoded by three separate python-jose calls.
+"""
+import pytest
+from core.utils import decode_segments
+from jose import jws
+from store.token.codec import CODECS
+from tests.bench import measure, report
+
+NUMBER = 5000
+KEY = "144bcc7e564373040999aac89e7622f3ca71fba1d972fd94a31c3bfbf24e3938"
+CLAIMS = {
+    "subject": {"user_id": "0" * 32, "email": "user@example.com"},
+    "type": "access",
+    "exp": 2000000000,
+    "iat": 1700000000,
+    "jti": "0" * 32,
+}
+
+
+def baseline_decode(token: str, algorithm: str):
+    jws.get_unverified_headers(token)
+    jws.get_unverified_claims(token)
+    jws.verify(token, KEY, [algorithm])
+
+
+def per_second(func) -> float:
+    return max(1e6 / measure(func, NUMBER) for _ in range(3))
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("algorithm", ["HS256", "HS512"])
+def test_token_codec(algorithm: str):
+    rows = []
+    token = CODECS["jose"].encode(CLAIMS, KEY, algorithm)
+    rows.append(
+        (
+            "baseline: three python-jose calls",
+            per_second(lambda: CODECS["jose"].encode(CLAIMS, KEY, algorithm)),
+            per_second(lambda: baseline_decode(token, algorithm)),
+            "-",
+        )
+    )
+    _, _, signing_input, signature = decode_segments(token)
+    for backend, codec in CODECS.items():
+        rows.append(
+            (
+                backend,
+                per_second(lambda: codec.encode(CLAIMS, KEY, algorithm)),
+                per_second(lambda: codec.decode(token, KEY, [algorithm])),
+                per_second(lambda: codec.verify_signature(signing_input, signature, KEY, algorithm)),
+            )
+        )
+    report(
+        f"Token codecs, {algorithm}, operations per second",
+        ("backend", "encode", "decode and verify", "verify only"),
+        rows,
+    )
+    assert all(row[2] > rows[0][2] for row in rows[1:])
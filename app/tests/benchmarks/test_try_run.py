@@ -0,0 +1,87 @@
+"""Overhead of a TryRun-decorated call: the baseline wrapper against the retry engine.
+
+The baseline wrapper is reproduced as it was: an `Event`, a sleeper task which lives
+`total_timeout` seconds, a task for the call and `wait_for`. The load is 5000 calls
+per second for one second, the tasks left after it are counted.
+"""
+import asyncio
+from asyncio import Event, create_task, sleep, wait_for
+from time import perf_counter
+
+import pytest
+from base.utils import TryRun, run_method
+from tests.bench import measure_async, report
+
+NUMBER = 20000
+RATE = 5000
+TICK = 0.01
+
+
+async def sleeper(event: Event, seconds: float):
+    await sleep(seconds)
+    event.set()
+
+
+def baseline(func, total_timeout: float = 10, request_timeout: float = 2):
+    async def inner(*args, **kwargs):
+        event = Event()
+        create_task(sleeper(event, total_timeout))
+        while not event.is_set():
+            try:
+                task = create_task(run_method(func, *args, **kwargs))
+                return await wait_for(task, request_timeout)
+            except Exception:
+                await sleep(1)
+
+    return inner
+
+
+@TryRun(total_timeout=10, group="benchmark")
+class Service:
+    async def call(self) -> int:
+        return 1
+
+
+async def plain() -> int:
+    return 1
+
+
+async def load(call) -> int:
+    """Calls at RATE per second for one second, the number of tasks left after."""
+    requests = []
+    started = perf_counter()
+    for tick in range(int(1 / TICK)):
+        requests.extend(create_task(call()) for _ in range(int(RATE * TICK)))
+        await sleep(max(0.0, started + (tick + 1) * TICK - perf_counter()))
+    await asyncio.gather(*requests)
+    return len(asyncio.all_tasks()) - 1
+
+
+async def cancel_left():
+    for task in asyncio.all_tasks() - {asyncio.current_task()}:
+        task.cancel()
+    await sleep(0)
+
+
+@pytest.mark.benchmark
+async def test_try_run_overhead():
+    service = Service()
+    calls = {
+        "without a wrapper": plain,
+        "baseline: sleeper task and wait_for": baseline(plain),
+        "retry engine": service.call,
+    }
+    rows = []
+    for name, call in calls.items():
+        overhead = min([await measure_async(call, NUMBER) for _ in range(3)])
+        await cancel_left()
+        rows.append((name, overhead, await load(call)))
+        await cancel_left()
+    report(
+        f"Decorated call, {RATE} calls per second",
+        ("wrapper", "microseconds per call", "tasks left after 1 second"),
+        rows,
+    )
+    assert rows[2][2] == 0
+    assert rows[1][2] >= RATE * 0.9
+    assert rows[2][1] < rows[1][1]
@@ -0,0 +1,141 @@
+"""Common fixtures of the tests.
+
+The settings are read from the environment, the required values are set here,
+so the tests do not need the `.env` file. Redis is replaced by fakeredis,
+the benchmarks which measure the round trips use a real Redis.
+The letters are sent to a local SMTP server (aiosmtpd).
+The tests which need Postgres or a real Redis are skipped if it is not available,
+the connection is set by the same POSTGRES_* and REDIS_* variables as for the application.
+"""
+import logging
+import os
+from socket import socket
+
+ENVIRONMENT = {
+    "APP_SECRET_KEY": "test secret key",
+    "POSTGRES_DB": "test",
+    "POSTGRES_USER": "test",
+    "POSTGRES_PASSWORD": "test",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_DB_SCHEMA": "my_salary",
+    "REDIS_DB": "0",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "REDIS_PASSWORD": "test",
+    "AUTH_KEY": "144bcc7e564373040999aac89e7622f3ca71fba1d972fd94a31c3bfbf24e3938",
+    "AUTH_ALGORITHMS": "HS256",
+    "AUTH_ACCESS_EXPIRES_DELTA": "60",
+    "AUTH_REFRESH_EXPIRES_DELTA": "172800",
+    "EMS_HOST": "localhost",
+    "EMS_USER": "user",
+    "EMS_PASSWORD": "password",
+    "EMS_SENDER": "noreply@example.com",
+}
+for name, value in ENVIRONMENT.items():
+    os.environ.setdefault(name, value)
+
+import pytest  # noqa: E402
+from aiosmtpd.controller import Controller  # noqa: E402
+from aiosmtpd.smtp import AuthResult  # noqa: E402
+from fakeredis import FakeServer  # noqa: E402
+from core.settings import RedisSettings  # noqa: E402
+from fakeredis.aioredis import FakeRedis  # noqa: E402
+from redis.asyncio import Redis  # noqa: E402
+from redis.exceptions import RedisError  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.exc import DBAPIError  # noqa: E402
+from store.database.postgres import Base, Postgres  # noqa: E402
+
+
+class FakeApp:
+    """The part of the application which the accessors use, without the startup events."""
+
+    def __init__(self):
+        self.logger = logging.getLogger("tests")
+        self.handlers: dict[str, list] = {"startup": [], "shutdown": []}
+
+    def on_event(self, event: str):
+        return self.handlers[event].append
+
+
+class SMTPHandler:
+    """Handler of the local SMTP server, the received letters are kept."""
+
+    def __init__(self):
+        self.letters = []
+
+    async def handle_DATA(self, server, session, envelope):  # noqa: N802
+        self.letters.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+@pytest.fixture
+def app() -> FakeApp:
+    return FakeApp()
+
+
+@pytest.fixture
+def redis_server() -> FakeServer:
+    return FakeServer()
+
+
+@pytest.fixture
+async def redis(redis_server: FakeServer) -> FakeRedis:
+    """Client of an empty fake Redis, as `RedisAccessor.connector` creates it."""
+    client = FakeRedis(server=redis_server, decode_responses=True)
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+async def real_redis() -> Redis:
+    """Client of a real Redis, its database is flushed."""
+    client = Redis.from_url(RedisSettings().dsn(True), decode_responses=True)
+    try:
+        await client.flushdb()
+    except (OSError, RedisError) as e:
+        await client.aclose()
+        pytest.skip(f"Redis is not available: {e}")
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+async def postgres(app: FakeApp) -> Postgres:
+    """Connected Postgres accessor, the tables of the models are created if needed."""
+    accessor = Postgres(app)
+    await accessor.connect()
+    try:
+        await accessor.query_execute(text("SELECT 1"))
+    except (OSError, DBAPIError) as e:
+        await accessor.disconnect()
+        pytest.skip(f"Postgres is not available: {e}")
+    async with accessor.unit_of_work() as session:
+        for schema in {table.schema for table in Base.metadata.tables.values()}:
+            await session.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+        await session.run_sync(lambda sync: Base.metadata.create_all(sync.connection()))
+    app.postgres = accessor
+    yield accessor
+    await accessor.disconnect()
+
+
+@pytest.fixture
+def smtp_server(monkeypatch) -> SMTPHandler:
+    """Local SMTP server, any login is accepted; EMS_HOST and EMS_PORT are set to it."""
+    with socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    handler = SMTPHandler()
+    controller = Controller(
+        handler,
+        hostname="127.0.0.1",
+        port=port,
+        authenticator=lambda *args: AuthResult(success=True),
+        auth_require_tls=False,
+    )
+    controller.start()
+    monkeypatch.setenv("EMS_HOST", "127.0.0.1")
+    monkeypatch.setenv("EMS_PORT", str(port))
+    yield handler
+    controller.stop()
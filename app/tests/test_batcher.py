@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+import pytest
+from base.batcher import Batcher
+
+
+def double(items: list, calls: list) -> list:
+    calls.append(list(items))
+    return [item * 2 for item in items]
+
+
+def check(items: list, calls: list) -> list:
+    calls.append(list(items))
+    return [ValueError(item) if item < 0 else item for item in items]
+
+
+def broken(items: list, calls: list) -> list:
+    raise ConnectionError("broken")
+
+
+async def test_batch_is_sent_when_full():
+    calls = []
+    batcher = Batcher(double, calls, batch_size=3, delay=10)
+    assert await asyncio.gather(*(batcher.submit(item) for item in range(3))) == [0, 2, 4]
+    assert calls == [[0, 1, 2]]
+    assert batcher.stats == {"batches": 1, "jobs": 3, "batch_avg": 3.0}
+
+
+async def test_batch_is_sent_after_delay():
+    calls = []
+    batcher = Batcher(double, calls, batch_size=100, delay=0.05)
+    jobs = [asyncio.create_task(batcher.submit(item)) for item in range(2)]
+    await asyncio.sleep(0.02)
+    assert calls == []
+    assert await asyncio.wait_for(asyncio.gather(*jobs), 1) == [0, 2]
+    assert calls == [[0, 1]]
+
+
+async def test_returned_exception_reaches_its_job_only():
+    batcher = Batcher(check, [], batch_size=3, delay=10)
+    jobs = (batcher.submit(item) for item in (1, -1, 2))
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+    assert results[0::2] == [1, 2]
+    assert isinstance(results[1], ValueError)
+
+
+async def test_raised_exception_reaches_every_job():
+    batcher = Batcher(broken, [], batch_size=2, delay=10)
+    jobs = (batcher.submit(item) for item in range(2))
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+    assert [type(result) for result in results] == [ConnectionError, ConnectionError]
+
+
+async def test_cancelled_job_is_skipped():
+    release = threading.Event()
+
+    def slow(items: list) -> list:
+        release.wait(1)
+        return items
+
+    batcher = Batcher(slow, batch_size=2, delay=10)
+    cancelled = asyncio.create_task(batcher.submit("cancelled"))
+    kept = asyncio.create_task(batcher.submit("kept"))
+    await asyncio.sleep(0.01)
+    cancelled.cancel()
+    release.set()
+    assert await kept == "kept"
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    await batcher.close()
+    assert batcher.stats["jobs"] == 2
+
+
+async def test_close_sends_collected_jobs():
+    calls = []
+    batcher = Batcher(double, calls, batch_size=100, delay=10)
+    job = asyncio.create_task(batcher.submit(1))
+    await asyncio.sleep(0)
+    await batcher.close()
+    assert await job == 2
+    assert calls == [[1]]
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from base.circuit_breaker import AdaptiveLimiter, CircuitBreaker, ConcurrencyLimitError
+from base.utils import guarded_call
+
+
+async def hold(event: asyncio.Event):
+    await event.wait()
+
+
+async def fail():
+    raise ConnectionError("down")
+
+
+async def test_concurrency_limit_is_not_a_failure():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    limiter = AdaptiveLimiter("test", initial_limit=1)
+    release = asyncio.Event()
+    busy = asyncio.create_task(guarded_call(hold, (release,), {}, 1, breaker, limiter))
+    await asyncio.sleep(0)
+    with pytest.raises(ConcurrencyLimitError):
+        await guarded_call(hold, (release,), {}, 0.01, breaker, limiter)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+    release.set()
+    await busy
+    assert limiter.in_flight == 0
+
+
+async def test_half_open_probe_is_released_without_a_slot():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    limiter = AdaptiveLimiter("test", initial_limit=1)
+    with pytest.raises(ConnectionError):
+        await guarded_call(fail, (), {}, 1, breaker, limiter)
+    assert breaker.state == CircuitBreaker.OPEN
+    release = asyncio.Event()
+    limiter.in_flight = 1
+    assert breaker.allow()
+    with pytest.raises(ConcurrencyLimitError):
+        await guarded_call(hold, (release,), {}, 0.01, breaker, limiter)
+    limiter.in_flight = 0
+    # the trial call did not happen, the next one is allowed
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.failures == 1
+    assert breaker.allow()
+
+
+async def test_breaker_opens_after_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        assert breaker.allow()
+        with pytest.raises(ConnectionError):
+            await guarded_call(fail, (), {}, 1, breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+async def test_cancelled_waiter_leaves_the_queue():
+    limiter = AdaptiveLimiter("test", initial_limit=1)
+    await limiter.acquire(1)
+    waiter = asyncio.create_task(limiter.acquire(1))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert limiter.stats["waiting"] == 0
+    limiter.cancel()
+    assert limiter.in_flight == 0
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import random
+
+import pytest
+from base.circuit_breaker import CircuitBreaker, CircuitOpenError, ConcurrencyLimitError
+from base.utils import retry_call
+from core.middelware import ErrorHandlingMiddleware
+from core.settings import Settings
+from fastapi import FastAPI, HTTPException
+from httpx import ASGITransport, AsyncClient
+
+REQUESTS = 2000
+
+
+@pytest.fixture
+def client() -> AsyncClient:
+    app = FastAPI()
+    app.logger = logging.getLogger("tests")
+    app.settings = Settings()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        # the handlers of the concurrent requests fail in turn
+        await asyncio.sleep(random.random() / 1000)
+        match item_id % 4:
+            case 0:
+                raise AssertionError([f"Item {item_id} is locked", 423])
+            case 1:
+                raise HTTPException(404, f"Item {item_id} not found")
+            case 2:
+                raise ConcurrencyLimitError(f"Limit of item {item_id} is reached")
+        return {"id": item_id}
+
+    app.add_middleware(ErrorHandlingMiddleware)
+    return AsyncClient(transport=ASGITransport(app), base_url="http://test")
+
+
+def expected(item_id: int) -> tuple[int, str | None]:
+    return {
+        0: (423, f"Item {item_id} is locked"),
+        1: (404, f"Item {item_id} not found"),
+        2: (503, "Service is temporarily unavailable, try again later..."),
+        3: (200, None),
+    }[item_id % 4]
+
+
+async def test_overload_is_503_with_retry_after(client: AsyncClient, caplog):
+    with caplog.at_level(logging.INFO, "tests"):
+        response = await client.get("/items/2")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    [record] = caplog.records
+    assert record.levelno == logging.WARNING
+    assert "Traceback" not in record.getMessage()
+
+
+async def test_open_circuit_retry_after():
+    breaker = CircuitBreaker("service", failure_threshold=1, reset_timeout=30)
+    breaker.on_failure()
+
+    async def call():
+        return None
+
+    with pytest.raises(CircuitOpenError) as error:
+        await retry_call(call, (), {}, 1, 1, logging.getLogger("tests"), True, breaker=breaker)
+    assert error.value.headers == {"Retry-After": "30"}
+
+
+async def test_concurrent_errors_do_not_cross(client: AsyncClient):
+    async def get(item_id: int):
+        response = await client.get(f"/items/{item_id}")
+        # HTTPException is answered by the application itself, with the `detail` field only
+        body = response.json()
+        message = body.get("message", body.get("detail"))
+        return item_id, response.status_code, message
+
+    results = await asyncio.gather(*(get(item_id) for item_id in range(REQUESTS)))
+    assert [(status, message) for _, status, message in results] == [
+        expected(item_id) for item_id, *_ in results
+    ]
@@ -0,0 +1,120 @@
+import io
+import logging
+import threading
+import time
+
+import pytest
+from core import logger
+from core.logger import BatchedSink, LogFilter
+
+
+class Stream(io.StringIO):
+    """Stream which records the batches, the writing can be held."""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def write(self, data: str) -> int:
+        self.release.wait()
+        self.batches.append(data)
+        return super().write(data)
+
+
+@pytest.fixture
+def sink():
+    sinks = []
+
+    def create(**settings) -> tuple[BatchedSink, Stream]:
+        stream = Stream()
+        sinks.append(BatchedSink(stream, **settings))
+        return sinks[-1], stream
+
+    yield create
+    for batched_sink in sinks:
+        batched_sink.stop()
+
+
+def wait_for(condition, timeout: float = 1):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("share, written", [(0.5, [True, False]), (0, [False, False])])
+def test_sampling(monkeypatch, share, written):
+    values = iter([0.1, 0.9])
+    monkeypatch.setattr(logger, "random", lambda: next(values))
+    log_filter = LogFilter({"info": share}, dedup_window=0)
+    assert [log_filter.check("INFO", logging.INFO, "message")[0] for _ in written] == written
+    assert log_filter.check("ERROR", logging.ERROR, "message") == (True, 0)
+
+
+def test_repeated_records_are_aggregated(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(logger, "monotonic", lambda: now[0])
+    log_filter = LogFilter({}, dedup_window=10)
+    assert log_filter.check("ERROR", logging.ERROR, "failed") == (True, 0)
+    assert log_filter.check("ERROR", logging.ERROR, "failed") == (False, 0)
+    assert log_filter.check("ERROR", logging.ERROR, "failed") == (False, 0)
+    assert log_filter.check("ERROR", logging.ERROR, "other") == (True, 0)
+    assert log_filter.check("INFO", logging.INFO, "failed") == (True, 0)
+    now[0] += 10
+    assert log_filter.check("ERROR", logging.ERROR, "failed") == (True, 2)
+    assert log_filter.check("ERROR", logging.ERROR, "failed") == (False, 0)
+
+
+def test_repeated_count_is_added_to_the_message(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(logger, "monotonic", lambda: now[0])
+    stdlib_filter = logger.StdlibLogFilter(LogFilter({}, dedup_window=10))
+    records = [
+        logging.LogRecord("tests", logging.ERROR, __file__, 1, "failed %s", ("call",), None)
+        for _ in range(3)
+    ]
+    assert [stdlib_filter.filter(record) for record in records[:2]] == [True, False]
+    now[0] += 10
+    assert stdlib_filter.filter(records[2])
+    assert records[2].getMessage() == "failed call (repeated 1 times)"
+
+
+def test_sink_flushes_by_size(sink):
+    batched_sink, stream = sink(batch_size=3, flush_interval=10)
+    for message in "ab":
+        batched_sink.write(message)
+    assert stream.batches == []
+    batched_sink.write("c")
+    assert stream.batches == ["abc"]
+
+
+def test_sink_flushes_by_interval(sink):
+    batched_sink, stream = sink(batch_size=100, flush_interval=0.05)
+    batched_sink.write("a")
+    wait_for(lambda: stream.batches)
+    assert stream.batches == ["a"]
+
+
+def test_sink_flushes_on_stop(sink):
+    batched_sink, stream = sink(batch_size=100, flush_interval=10)
+    batched_sink.write("a")
+    batched_sink.stop()
+    assert stream.getvalue() == "a"
+
+
+def test_slow_stream_does_not_block_writers(sink):
+    batched_sink, stream = sink(batch_size=100, flush_interval=0.01)
+    stream.release.clear()
+    batched_sink.write("a")
+    # the flusher takes the batch and waits for the stream
+    time.sleep(0.05)
+    writer = threading.Thread(target=batched_sink.write, args=("b",))
+    writer.start()
+    writer.join(0.5)
+    try:
+        assert not writer.is_alive()
+    finally:
+        stream.release.set()
+    wait_for(lambda: len(stream.batches) == 2)
+    assert stream.batches == ["a", "b"]
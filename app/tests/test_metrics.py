@@ -0,0 +1,40 @@
+import logging
+
+import pytest
+from core.metrics import TOKEN_HEADER, metrics_route
+from core.middelware import AuthorizationMiddleware, ErrorHandlingMiddleware
+from core.settings import Settings
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from pydantic import SecretStr
+
+
+@pytest.fixture
+def client():
+    def create(token: str | None) -> AsyncClient:
+        app = FastAPI()
+        app.logger = logging.getLogger("tests")
+        app.settings = Settings().model_copy(
+            update={"app_metrics_token": token and SecretStr(token)}
+        )
+        app.include_router(metrics_route)
+        app.add_middleware(AuthorizationMiddleware, revocation=None, tokens=None)
+        app.add_middleware(ErrorHandlingMiddleware)
+        return AsyncClient(transport=ASGITransport(app), base_url="http://test")
+
+    return create
+
+
+async def test_open_metrics(client):
+    response = await client(None).get("/metrics")
+    assert response.status_code == 200
+    assert "# TYPE http_request_seconds histogram" in response.text
+
+
+@pytest.mark.parametrize(
+    "headers, status_code",
+    [({}, 401), ({TOKEN_HEADER: "wrong"}, 401), ({TOKEN_HEADER: "secret"}, 200)],
+)
+async def test_metrics_token(client, headers: dict[str, str], status_code: int):
+    response = await client("secret").get("/metrics", headers=headers)
+    assert response.status_code == status_code
@@ -0,0 +1,123 @@
+import logging
+from time import time
+
+import pytest
+from base import cache
+from base.metrics import REGISTRY
+from core.middelware import REQUEST_SECONDS, AuthorizationMiddleware, ErrorHandlingMiddleware
+from core.settings import Settings
+from core.utils import Token
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+
+class Tokens:
+    """Token accessor stand-in, the decoded tokens are counted."""
+
+    def __init__(self):
+        self.exp = int(time()) + 60
+        self.decoded = 0
+
+    async def decode_token(self, raw_token: str) -> Token:
+        self.decoded += 1
+        token = Token()
+        token.type, token.jti, token.user_id, token.exp = "access", raw_token, "1", self.exp
+        return token
+
+
+class Revocation:
+    def __init__(self):
+        self.revoked = set()
+
+    async def is_revoked(self, jti: str) -> bool:
+        return jti in self.revoked
+
+
+@pytest.fixture
+def tokens() -> Tokens:
+    return Tokens()
+
+
+@pytest.fixture
+def revocation() -> Revocation:
+    return Revocation()
+
+
+@pytest.fixture
+def client(monkeypatch, tokens: Tokens, revocation: Revocation) -> AsyncClient:
+    monkeypatch.setattr("core.middelware.PUBLIC_ACCESS", [["/items/1", "GET"]])
+    app = FastAPI()
+    app.logger = logging.getLogger("tests")
+    app.settings = Settings()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        assert item_id == 1, "Item not found"
+        return {"id": item_id}
+
+    @app.get("/private")
+    async def private():
+        return {}
+
+    app.add_middleware(AuthorizationMiddleware, revocation=revocation, tokens=tokens)
+    app.add_middleware(ErrorHandlingMiddleware)
+    return AsyncClient(transport=ASGITransport(app), base_url="http://test")
+
+
+async def test_public_route(client: AsyncClient):
+    response = await client.get("/items/1")
+    assert response.status_code == 200
+    assert response.json() == {"id": 1}
+    assert REQUEST_SECONDS.values[("GET", "/items/{item_id}", 200)][-1] > 0
+
+
+async def test_anonymous_access_denied(client: AsyncClient):
+    response = await client.get("/private")
+    assert response.status_code == 403
+    assert response.json()["message"] == "Access denied"
+
+
+async def test_unknown_route(client: AsyncClient):
+    response = await client.get("/unknown")
+    assert response.status_code == 404
+    assert ("GET", "unmatched", 404) in REQUEST_SECONDS.values
+
+
+async def test_bad_authorization_header(client: AsyncClient):
+    response = await client.get("/items/1", headers={"Authorization": "Basic abc"})
+    assert response.status_code == 400
+    assert response.json()["message"] == "Bearer header not specified"
+
+
+async def test_wrong_method(client: AsyncClient):
+    """The known path is checked before the authorization, so it is not 403."""
+    response = await client.post("/items/1")
+    assert response.status_code == 405
+    assert response.json()["message"].startswith("Method Not Allowed")
+    assert ("POST", "unmatched", 405) in REQUEST_SECONDS.values
+
+
+BEARER = {"Authorization": "Bearer token-1"}
+
+
+async def test_token_cache_hit(client: AsyncClient, tokens: Tokens):
+    for _ in range(3):
+        assert (await client.get("/private", headers=BEARER)).status_code == 200
+    assert tokens.decoded == 1
+    assert 'auth_token_cache_hits{cache="tokens"} 2' in REGISTRY.render()
+
+
+async def test_cached_token_is_revoked(client: AsyncClient, revocation: Revocation):
+    assert (await client.get("/private", headers=BEARER)).status_code == 200
+    revocation.revoked.add("token-1")
+    response = await client.get("/private", headers=BEARER)
+    assert response.status_code == 401
+    assert "blocked" in response.json()["message"]
+
+
+async def test_cached_token_expires_at_exp(client: AsyncClient, tokens: Tokens, monkeypatch):
+    assert (await client.get("/private", headers=BEARER)).status_code == 200
+    monkeypatch.setattr(cache, "time", lambda: tokens.exp)
+    # the record is not used at `exp`, the token is verified again
+    assert (await client.get("/private", headers=BEARER)).status_code == 200
+    assert tokens.decoded == 2
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from store.ems import outbox as outbox_module
+from store.ems.outbox import EmailOutbox
+from tests.conftest import FakeApp
+
+
+class Ems:
+    """SMTP stand-in, the first `failures` letters are not sent."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.letters = []
+
+    async def send_raw(self, sender: str, recipients: list[str], raw: str):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("SMTP server is not available")
+        self.letters.append((sender, recipients, raw))
+
+
+@pytest.fixture
+def worker(redis, monkeypatch):
+    monkeypatch.setattr(outbox_module, "delta_time", lambda: 0)
+
+    async def create(ems: Ems, **settings) -> EmailOutbox:
+        app = FakeApp()
+        app.redis = SimpleNamespace(connector=redis)
+        app.store = SimpleNamespace(ems=ems)
+        outbox = EmailOutbox(app)
+        outbox.settings = outbox.settings.model_copy(update=settings)
+        await outbox._create_group()  # noqa
+        return outbox
+
+    return create
+
+
+async def test_retried_letter_is_not_claimed(worker, redis):
+    ems = Ems(failures=3)
+    settings = {"ems_outbox_claim_idle": 1, "ems_outbox_retry_delay": 0.4}
+    outbox, other = await worker(ems, **settings), await worker(Ems(), **settings)
+    await outbox.enqueue_raw("from@example.com", ["to@example.com"], b"letter")
+    [(entry_id, fields)] = await outbox._read("first")  # noqa
+    delivery = asyncio.create_task(outbox._deliver("first", entry_id, fields))  # noqa
+    # the retries last longer than the claim idle time
+    while not delivery.done():
+        assert not await other._claim("second")  # noqa
+        await asyncio.sleep(0.1)
+    await delivery
+    assert ems.letters == [("from@example.com", ["to@example.com"], "letter")]
+    assert await redis.xlen(outbox.settings.ems_outbox_stream) == 0
+
+
+async def test_dead_letter(worker, redis):
+    outbox = await worker(Ems(failures=2), ems_outbox_max_attempts=2, ems_outbox_retry_delay=0)
+    await outbox.enqueue_raw("from@example.com", ["to@example.com"], b"letter")
+    [(entry_id, fields)] = await outbox._read("first")  # noqa
+    await outbox._deliver("first", entry_id, fields)  # noqa
+    assert outbox.stats == {"sent": 0, "failed": 1}
+    [(_, dead)] = await redis.xrange(outbox.settings.ems_outbox_dead_letter_stream)
+    assert dead["error"] == "SMTP server is not available"
+    assert await redis.xlen(outbox.settings.ems_outbox_stream) == 0
+
+
+async def test_workers_send_and_stop(worker):
+    ems = Ems()
+    outbox = await worker(ems, ems_outbox_workers=2)
+    await outbox.enqueue_raw("from@example.com", ["to@example.com"], b"letter")
+    await outbox.connect()
+    while not ems.letters:
+        await asyncio.sleep(0.01)
+    # the workers wait for new letters in a blocking read
+    await asyncio.wait_for(outbox.disconnect(), 3)
+    assert outbox.stats == {"sent": 1, "failed": 0}
@@ -0,0 +1,78 @@
+from base64 import urlsafe_b64encode
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import delete, insert
+from store.blog.models import TopicModel
+from store.database.postgres import Postgres
+from store.user.models import UserModel
+
+
+def encode(data: str) -> str:
+    return urlsafe_b64encode(data.encode()).decode()
+
+
+def test_cursor_round_trip():
+    row = {"id": uuid4(), "created": datetime(2024, 1, 2, 3, 4, 5), "title": "a"}
+    sort_params = {"created": "desc", "title": "ASC"}
+    cursor = Postgres.get_cursor(TopicModel, row, sort_params)
+    keyset_order = Postgres.get_keyset_order(sort_params)
+    assert Postgres.decode_cursor(TopicModel, keyset_order, cursor) == [
+        row["created"],
+        row["title"],
+        row["id"],
+    ]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        encode("[1, 2]"),
+        encode('{"title": "a", "id": 1}'),
+        encode('{"title": "a", "id": ["x"]}'),
+        encode('{"title": "a", "id": "not a uuid"}'),
+        encode('{"title": 1, "id": "%s"}' % uuid4()),
+        encode('{"title": null, "id": "%s"}' % uuid4()),
+        encode('{"id": "%s", "title": "a"}' % uuid4()),
+    ],
+)
+def test_invalid_cursor(cursor: str):
+    keyset_order = Postgres.get_keyset_order({"title": "ASC"})
+    with pytest.raises(AssertionError):
+        Postgres.decode_cursor(TopicModel, keyset_order, cursor)
+
+
+def test_nullable_sort_column():
+    sort_params = {"is_superuser": "ASC"}
+    row = {"id": uuid4(), "is_superuser": None}
+    assert Postgres.get_cursor(UserModel, row, sort_params) is None
+    cursor = encode('{"is_superuser": true, "id": "%s"}' % uuid4())
+    with pytest.raises(AssertionError):
+        Postgres.get_query_keyset(UserModel, 10, sort_params, cursor)
+
+
+@pytest.mark.parametrize("sort_params", [{"title": "DESC"}, {"description": "ASC", "title": "DESC"}])
+async def test_keyset_pages(postgres: Postgres, sort_params: dict[str, str]):
+    topics = [{"title": f"page-{index:02}", "description": str(index % 3)} for index in range(25)]
+    async with postgres.unit_of_work() as session:
+        await session.execute(delete(TopicModel).where(TopicModel.title.like("page-%")))
+        await session.execute(insert(TopicModel), topics)
+    try:
+        where = TopicModel.title.like("page-%")
+        query = Postgres.get_query_filter(TopicModel, 0, 1000, sort_params).where(where)
+        expected = (await postgres.query_execute(query)).scalars().all()
+        expected = [topic.id for topic in expected]
+        pages, cursor = [], None
+        while True:
+            query = Postgres.get_query_keyset(TopicModel, 10, sort_params, cursor).where(where)
+            page = (await postgres.query_execute(query)).scalars().all()
+            pages.extend(topic.id for topic in page)
+            if len(page) < 10:
+                break
+            cursor = Postgres.get_cursor(TopicModel, page[-1].as_dict(), sort_params)
+        assert pages == expected
+    finally:
+        async with postgres.unit_of_work() as session:
+            await session.execute(delete(TopicModel).where(TopicModel.title.like("page-%")))
@@ -0,0 +1,76 @@
+import hashlib
+import os
+
+import pytest
+from store.password.accessor import PasswordAccessor
+from store.password.hashers import hash_password, verify_password
+from tests.conftest import FakeApp
+
+# cheap parameters, the tests check the format and not the cost
+FAST = {"password_scrypt_n": 2**4, "password_pbkdf2_iterations": 10}
+
+
+@pytest.fixture
+def passwords():
+    def create(**settings) -> PasswordAccessor:
+        accessor = PasswordAccessor(FakeApp())
+        accessor.settings = accessor.settings.model_copy(update={**FAST, **settings})
+        return accessor
+
+    return create
+
+
+@pytest.mark.parametrize(
+    "scheme, params", [("scrypt", (2**4, 8, 1)), ("pbkdf2_sha256", (10,))]
+)
+def test_hash_then_verify(scheme, params):
+    encoded = hash_password("password", scheme, params, os.urandom(16))
+    assert encoded.startswith("$".join([scheme, *map(str, params)]) + "$")
+    assert verify_password("password", encoded)
+    assert not verify_password("Password", encoded)
+
+
+def test_salt_makes_hashes_differ():
+    first, second = (
+        hash_password("password", "scrypt", (2**4, 8, 1), os.urandom(16)) for _ in range(2)
+    )
+    assert first != second
+
+
+def test_legacy_sha256():
+    legacy = hashlib.sha256(b"password").hexdigest()
+    assert verify_password("password", legacy)
+    assert not verify_password("wrong", legacy)
+
+
+def test_unknown_scheme():
+    with pytest.raises(ValueError, match="Unknown password hashing scheme"):
+        verify_password("password", "md5$1$c2FsdA$aGFzaA")
+
+
+@pytest.mark.parametrize("scheme", ["scrypt", "pbkdf2_sha256"])
+async def test_accessor_round_trip(passwords, scheme):
+    accessor = passwords(password_scheme=scheme)
+    encoded = await accessor.hash("password")
+    assert await accessor.verify("password", encoded)
+    assert not await accessor.verify("wrong", encoded)
+    assert not accessor.needs_rehash(encoded)
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {"password_scheme": "pbkdf2_sha256"},
+        {"password_scrypt_n": 2**5},
+        {"password_scrypt_r": 4},
+    ],
+)
+async def test_needs_rehash_after_settings_change(passwords, settings):
+    encoded = await passwords().hash("password")
+    changed = passwords(**settings)
+    assert changed.needs_rehash(encoded)
+    assert await changed.verify("password", encoded)
+
+
+def test_legacy_hash_needs_rehash(passwords):
+    assert passwords().needs_rehash(hashlib.sha256(b"password").hexdigest())
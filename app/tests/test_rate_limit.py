@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+from core.rate_limit import RateLimit
+from core.settings import RateLimitRule
+from starlette.requests import Request
+from store.rate_limit.accessor import RateLimitAccessor
+from tests.conftest import FakeApp
+
+PATH = "/auth/login"
+IP = RateLimitRule(key="ip", limit=2, period=60)
+EMAIL = RateLimitRule(key="email", limit=1, period=60)
+
+
+@pytest.fixture
+def worker(redis):
+    """Creates the limiters of separate workers, they share only Redis."""
+
+    async def create() -> RateLimitAccessor:
+        app = FakeApp()
+        app.redis = SimpleNamespace(connector=redis)
+        limiter = RateLimitAccessor(app)
+        await limiter.connect()
+        return limiter
+
+    return create
+
+
+def tokens(limiter: RateLimitAccessor, name: str) -> float:
+    return limiter.buckets.get(name).tokens
+
+
+async def test_shared_limit(worker):
+    first, second = await worker(), await worker()
+    assert await first.hit(PATH, [(IP, "1.1.1.1")]) == 0
+    assert await second.hit(PATH, [(IP, "1.1.1.1")]) == 0
+    assert await first.hit(PATH, [(IP, "1.1.1.1")]) > 0
+
+
+async def test_rejected_by_redis_is_refunded_locally(worker):
+    first, second = await worker(), await worker()
+    for _ in range(2):
+        assert await second.hit(PATH, [(IP, "1.1.1.1")]) == 0
+    assert await first.hit(PATH, [(IP, "1.1.1.1")]) > 0
+    assert tokens(first, f"rate:{PATH}:ip:1.1.1.1") == pytest.approx(2, abs=0.01)
+
+
+async def test_rejected_locally_takes_no_token(worker):
+    limiter = await worker()
+    assert await limiter.hit(PATH, [(IP, "1.1.1.1"), (EMAIL, "a@example.com")]) == 0
+    assert await limiter.hit(PATH, [(IP, "1.1.1.1"), (EMAIL, "a@example.com")]) > 0
+    assert tokens(limiter, f"rate:{PATH}:ip:1.1.1.1") == pytest.approx(1, abs=0.01)
+
+
+def request(header: str = None, **settings) -> Request:
+    settings = {"rate_limit_ip_header": None, "rate_limit_trusted_proxies": 1, **settings}
+    limiter = SimpleNamespace(settings=SimpleNamespace(**settings))
+    headers = [(b"x-forwarded-for", header.encode())] if header else []
+    scope = {
+        "type": "http",
+        "headers": headers,
+        "client": ("10.0.0.1", 1000),
+        "app": SimpleNamespace(store=SimpleNamespace(rate_limit=limiter)),
+    }
+    return Request(scope)
+
+
+@pytest.mark.parametrize(
+    "header, settings, ip",
+    [
+        ("1.1.1.1", {}, "10.0.0.1"),
+        (None, {"rate_limit_ip_header": "X-Forwarded-For"}, "10.0.0.1"),
+        ("1.1.1.1", {"rate_limit_ip_header": "X-Forwarded-For"}, "1.1.1.1"),
+        ("6.6.6.6, 1.1.1.1", {"rate_limit_ip_header": "X-Forwarded-For"}, "1.1.1.1"),
+        (
+            "6.6.6.6, 1.1.1.1, 10.0.0.2",
+            {"rate_limit_ip_header": "X-Forwarded-For", "rate_limit_trusted_proxies": 2},
+            "1.1.1.1",
+        ),
+    ],
+)
+def test_client_ip(header: str, settings: dict, ip: str):
+    assert RateLimit.get_ip(request(header, **settings)) == ip
@@ -0,0 +1,135 @@
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from store.cache.accessor import CacheAccessor
+from store.cache.read_through import ReadThroughCache
+from tests.conftest import FakeApp
+
+
+@pytest.fixture
+def worker(redis):
+    """Creates the caches of separate workers, they share only Redis."""
+
+    def create() -> ReadThroughCache:
+        app = FakeApp()
+        app.redis = SimpleNamespace(connector=redis)
+        app.store = SimpleNamespace(cache=CacheAccessor(app))
+        return ReadThroughCache(app, "topics:id")
+
+    return create
+
+
+class Source:
+    """Source of the values, a load can be held until it is released."""
+
+    def __init__(self, value):
+        self.value = value
+        self.loads = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def load(self):
+        self.loads += 1
+        value = self.value
+        await self.release.wait()
+        return value
+
+    async def started(self, loads: int = 1):
+        """Wait for the load, the scripts of the cache are run before it."""
+        while self.loads < loads:
+            await asyncio.sleep(0.001)
+
+
+async def test_miss_and_hit_return_the_same_types(worker):
+    topic_id = uuid4()
+    source = Source({"id": topic_id, "title": "a"})
+    first, second = worker(), worker()
+    assert await first.get("1", source.load) == {"id": str(topic_id), "title": "a"}
+    assert await second.get("1", source.load) == {"id": str(topic_id), "title": "a"}
+    assert source.loads == 1
+    assert second.redis_hits == 1
+
+
+async def test_single_flight(worker):
+    cache, source = worker(), Source("a")
+    source.release.clear()
+    tasks = [asyncio.create_task(cache.get("1", source.load)) for _ in range(10)]
+    await source.started()
+    source.release.set()
+    assert await asyncio.gather(*tasks) == ["a"] * 10
+    assert source.loads == 1
+    assert cache.coalesced == 9
+
+
+async def test_cancelled_leader_does_not_block_waiters(worker):
+    cache, source = worker(), Source("a")
+    source.release.clear()
+    leader = asyncio.create_task(cache.get("1", source.load))
+    await source.started()
+    waiters = [asyncio.create_task(cache.get("1", source.load)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    await asyncio.sleep(0.01)
+    source.release.set()
+    assert await asyncio.wait_for(asyncio.gather(*waiters), 1) == ["a"] * 3
+    assert leader.cancelled()
+    assert not cache._in_flight  # noqa
+
+
+async def test_cancelled_waiter_is_cancelled(worker):
+    cache, source = worker(), Source("a")
+    source.release.clear()
+    leader = asyncio.create_task(cache.get("1", source.load))
+    await source.started()
+    waiter = asyncio.create_task(cache.get("1", source.load))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    source.release.set()
+    assert await leader == "a"
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+
+async def test_clear_by_another_worker_during_load(worker):
+    """The load started before the change does not save the stale value for all workers."""
+    reader, writer, other = worker(), worker(), worker()
+    source = Source("old")
+    source.release.clear()
+    load = asyncio.create_task(reader.get("page=0", source.load))
+    await source.started()
+    source.value = "new"
+    await writer.clear()
+    source.release.set()
+    assert await load == "old"
+    assert await other.get("page=0", source.load) == "new"
+
+
+async def test_invalidate_by_another_worker_during_load(worker):
+    reader, writer, other = worker(), worker(), worker()
+    source = Source("old")
+    source.release.clear()
+    load = asyncio.create_task(reader.get("1", source.load))
+    await source.started()
+    source.value = "new"
+    await writer.invalidate("1")
+    source.release.set()
+    assert await load == "old"
+    assert await other.get("1", source.load) == "new"
+
+
+async def test_clear_and_invalidate(worker, redis):
+    first, second = worker(), worker()
+    source = Source("a")
+    await first.get("1", source.load)
+    await first.get("2", source.load)
+    source.value = "b"
+    await second.invalidate("1")
+    first.local.clear()
+    assert await first.get("1", source.load) == "b"
+    assert await first.get("2", source.load) == "a"
+    await second.clear()
+    first.local.clear()
+    assert await first.get("2", source.load) == "b"
+    assert source.loads == 4
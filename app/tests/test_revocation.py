@@ -0,0 +1,78 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from store.cache.accessor import CacheAccessor
+from store.revocation import accessor
+from store.revocation.accessor import BLOCK_LIST_PREFIX, RevocationAccessor
+
+
+@pytest.fixture
+def revocation(app, redis) -> RevocationAccessor:
+    app.redis = SimpleNamespace(connector=redis)
+    app.store = SimpleNamespace(cache=CacheAccessor(app))
+    return RevocationAccessor(app)
+
+
+async def wait_synced(revocation: RevocationAccessor):
+    for _ in range(100):
+        if revocation.is_synced:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def test_revoke(revocation: RevocationAccessor, redis):
+    await revocation.revoke("jti-1", "user-1", 60)
+    assert await redis.get(BLOCK_LIST_PREFIX + "jti-1") == "user-1"
+    assert "jti-1" in revocation.filter
+    assert await revocation.is_revoked("jti-1")
+    assert not await revocation.is_revoked("jti-2")
+
+
+async def test_failed_migration_does_not_block_filter_load(revocation, redis, monkeypatch):
+    await redis.set(BLOCK_LIST_PREFIX + "jti-1", "user-1")
+
+    async def broken():
+        raise ConnectionError("migration failed")
+
+    monkeypatch.setattr(revocation, "_legacy_tokens", broken)
+    await revocation.connect()
+    try:
+        await wait_synced(revocation)
+        assert revocation.is_synced
+        assert not revocation.is_migrated
+        assert "jti-1" in revocation.filter
+    finally:
+        await revocation.disconnect()
+
+
+async def test_filter_is_reloaded_after_listener_error(revocation, redis, monkeypatch):
+    received, reconnect = [], asyncio.Event()
+
+    async def receive(pubsub):
+        received.append(pubsub)
+        if len(received) == 1:
+            raise ConnectionError("connection lost")
+        await asyncio.Event().wait()
+
+    async def pause(seconds):
+        await reconnect.wait()
+
+    monkeypatch.setattr(revocation, "_receive", receive)
+    monkeypatch.setattr(accessor, "sleep", pause)
+    await revocation.connect()
+    try:
+        while not received:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+        assert not revocation.is_synced
+        # revoked while the listener is disconnected, the message is lost
+        await redis.set(BLOCK_LIST_PREFIX + "jti-1", "user-1")
+        assert "jti-1" not in revocation.filter
+        assert await revocation.is_revoked("jti-1")
+        reconnect.set()
+        await wait_synced(revocation)
+        assert "jti-1" in revocation.filter
+        assert len(received) == 2
+    finally:
+        await revocation.disconnect()
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+from core.settings import EmailMessageServiceSettings
+from store.ems import smtp_pool as smtp_pool_module
+from store.ems.smtp_pool import SMTPPool
+from tests.conftest import SMTPHandler
+
+
+@pytest.fixture
+def pool(smtp_server: SMTPHandler):
+    def create(**settings) -> SMTPPool:
+        return SMTPPool(EmailMessageServiceSettings().model_copy(update=settings))
+
+    return create
+
+
+async def test_letters_are_sent_over_one_connection(pool, smtp_server: SMTPHandler):
+    smtp = pool()
+    for _ in range(3):
+        await smtp.send("from@example.com", ["to@example.com"], b"Subject: a\r\n\r\nletter")
+    smtp.close()
+    assert len(smtp_server.letters) == 3
+    assert smtp.stats["connections_opened"] == 1
+    assert smtp.stats["reuse_ratio"] == pytest.approx(2 / 3)
+
+
+async def test_cancelled_use_closes_the_connection(pool):
+    smtp = pool(ems_pool_size=1)
+    with pytest.raises(asyncio.CancelledError):
+        async with smtp.connection() as connection:
+            raise asyncio.CancelledError
+    # the state of the connection is unknown, it is not returned to the pool
+    assert not connection.smtp.is_connected
+    assert smtp.stats["connections_idle"] == 0
+    # the slot is released
+    async with asyncio.timeout(1), smtp.connection() as connection:
+        assert connection.smtp.is_connected
+    smtp.close()
+
+
+async def test_reuse_ratio_is_not_negative(pool):
+    smtp = pool()
+    async with smtp.connection(), smtp.connection():
+        pass
+    await smtp.send("from@example.com", ["to@example.com"], b"letter")
+    smtp.close()
+    assert smtp.stats["reuse_ratio"] == 0.0
+
+
+async def test_reap_and_rate_window(pool, monkeypatch):
+    smtp = pool(ems_pool_idle_timeout=60)
+    now = 1000.0
+    monkeypatch.setattr(smtp_pool_module, "monotonic", lambda: now)
+    await smtp.send("from@example.com", ["to@example.com"], b"letter")
+    smtp.reap()
+    assert smtp.stats["connections_idle"] == 1
+    assert smtp.stats["messages_per_second"] == 1 / smtp_pool_module.RATE_WINDOW
+    now += 61
+    smtp.reap()
+    assert smtp.stats == {
+        "messages": 1,
+        "messages_per_second": 0.0,
+        "connections_opened": 1,
+        "connections_idle": 0,
+        "reuse_ratio": 0.0,
+    }
+
+
+async def test_connection_in_use_is_closed_after_close(pool):
+    smtp = pool()
+    async with smtp.connection() as first, smtp.connection() as second:
+        smtp.close()
+    assert not first.smtp.is_connected
+    assert not second.smtp.is_connected
+    assert smtp.stats["connections_idle"] == 0
+
+
+@pytest.mark.parametrize("max_messages", [0, -1])
+def test_max_messages_must_be_positive(max_messages):
+    with pytest.raises(ValidationError, match="ems_pool_max_messages"):
+        EmailMessageServiceSettings(ems_pool_max_messages=max_messages)
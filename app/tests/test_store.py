@@ -0,0 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from base.executor import Executors
+from fastapi import FastAPI
+from store.store import setup_store
+from tests.conftest import FakeApp
+
+
+def test_shutdown_in_reverse_order():
+    app = FastAPI()
+    app.logger = FakeApp().logger
+    setup_store(app)
+    stopped = [handler.__self__ for handler in app.router.on_shutdown]
+    assert stopped[:4] == [app.store.outbox, app.store.ems, app.store.blog, app.store.revocation]
+    assert stopped.index(app.store.token) < stopped.index(app.executor)
+    assert stopped[-4:] == [app.executor, app.redis, app.postgres, app.tracing]
+    started = [handler.__self__ for handler in app.router.on_startup]
+    assert started == stopped[::-1]
+
+
+def test_start_replaces_the_lazy_pool():
+    lazy = Executors.get()
+    try:
+        Executors.start(2)
+        assert lazy._shutdown  # noqa
+        assert Executors.get() is not lazy
+        assert Executors.stats() == {"thread": 2}
+    finally:
+        Executors.shutdown()
+    assert isinstance(Executors.get(), ThreadPoolExecutor)
+    Executors.shutdown()
@@ -0,0 +1,31 @@
+from email import message_from_bytes, policy
+
+import pytest
+from store.ems.templates import LetterTemplate, encode_body
+from store.ems.templates_letters import DEFAULT_LOCALE, LETTERS
+
+
+@pytest.fixture
+def template() -> LetterTemplate:
+    return LetterTemplate("noreply@example.com", **LETTERS["confirm_email", DEFAULT_LOCALE])
+
+
+def test_letter_is_7bit_with_short_lines(template: LetterTemplate):
+    token = "t" * 2000
+    raw = template.render("user@example.com", name="Иван <b>", token=token, link="confirm")
+    raw.decode("ascii")
+    assert b"\n" not in raw.replace(b"\r\n", b"")
+    _, _, body = raw.partition(b"\r\n\r\n")
+    assert max(len(line) for line in body.split(b"\r\n")) <= 76
+    text, html = message_from_bytes(raw, policy=policy.default).iter_parts()
+    assert "Здравствуйте Иван <b>" in text.get_content()
+    assert f"confirm?token={token}" in html.get_content()
+    assert "Иван &lt;b&gt;" in html.get_content()
+
+
+def test_shorter_encoding_is_chosen():
+    assert encode_body(b"<p>ascii</p>\r\n")[0] == "quoted-printable"
+    encoding, body = encode_body(("Здравствуйте " * 20).encode())
+    assert encoding == "base64"
+    *lines, last = body.split(b"\r\n")
+    assert {len(line) for line in lines} == {76} and len(last) <= 76
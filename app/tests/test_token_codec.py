@@ -0,0 +1,39 @@
+import pytest
+from core.settings import AuthorizationSettings
+from jose import JWSError
+from store.token.codec import CODECS, HmacCodec, JoseCodec, TokenCodec
+
+KEY = "secret"
+CLAIMS = {"subject": {"user_id": "1", "email": "user@example.com"}, "type": "access", "jti": "a"}
+
+
+def test_codec_is_abstract():
+    with pytest.raises(TypeError):
+        TokenCodec()  # noqa
+
+
+@pytest.mark.parametrize("algorithm", ["HS256", "HS384", "HS512"])
+@pytest.mark.parametrize("encoder", ["jose", "hmac"])
+@pytest.mark.parametrize("decoder", ["jose", "hmac"])
+def test_backends_are_compatible(encoder: str, decoder: str, algorithm: str):
+    token = CODECS[encoder].encode(CLAIMS, KEY, algorithm)
+    decoded = CODECS[decoder].decode(token, KEY, [algorithm])
+    assert (decoded.alg, decoded.user_id, decoded.type) == (algorithm, "1", "access")
+
+
+@pytest.mark.parametrize("codec", [JoseCodec(), HmacCodec()])
+def test_invalid_tokens(codec: TokenCodec):
+    token = codec.encode(CLAIMS, KEY, "HS256")
+    with pytest.raises(JWSError):
+        codec.decode(token, "other", ["HS256"])
+    with pytest.raises(JWSError):
+        codec.decode(token, KEY, ["HS512"])
+    with pytest.raises(JWSError):
+        codec.decode(token[:-2], KEY, ["HS256"])
+    with pytest.raises(JWSError):
+        codec.decode("not a token", KEY, ["HS256"])
+
+
+def test_settings_accept_hs512(monkeypatch):
+    monkeypatch.setenv("AUTH_ALGORITHMS", "HS512, HS256")
+    assert AuthorizationSettings().auth_algorithms == ["HS512", "HS256"]
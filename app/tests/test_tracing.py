@@ -0,0 +1,211 @@
+import asyncio
+import threading
+
+import pytest
+from base import tracing
+from base.trace_export import SpanExporter, otlp_attributes, otlp_span
+from base.tracing import NOOP_SPAN, TRACER, Tracer, parse_traceparent
+from core.middelware import TracingMiddleware
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+TRACE_ID = 0x4BF92F3577B34DA6A3CE929D0E0E4736
+PARENT_ID = 0x00F067AA0BA902B7
+
+
+class Exporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(spans)
+
+
+@pytest.fixture
+def exporter() -> Exporter:
+    return Exporter()
+
+
+@pytest.fixture
+def tracer(exporter: Exporter):
+    def create(**settings) -> Tracer:
+        tracer = Tracer()
+        tracer.configure(exporter, **settings)
+        return tracer
+
+    return create
+
+
+def test_disabled_tracer_creates_no_spans():
+    assert Tracer().span("request") is NOOP_SPAN
+
+
+@pytest.mark.parametrize("random, is_kept", [(0.4, True), (0.6, False)])
+def test_head_sampling(tracer, exporter: Exporter, monkeypatch, random: float, is_kept: bool):
+    monkeypatch.setattr(tracing, "random", lambda: random)
+    tracer = tracer(sample_rate=0.5)
+    with tracer.span("request"):
+        # the spans of a dropped trace are not created
+        assert (tracer.span("query") is NOOP_SPAN) is not is_kept
+    assert len(exporter.traces) == is_kept
+
+
+def test_tail_keeps_failed_trace(tracer, exporter: Exporter):
+    tracer = tracer(sample_rate=0, tail_errors=True)
+    with tracer.span("request"):
+        with tracer.span("ok"):
+            pass
+    with pytest.raises(ValueError):
+        with tracer.span("request"):
+            with tracer.span("query"):
+                raise ValueError("broken")
+    [spans] = exporter.traces
+    assert [(span.name, span.error) for span in spans] == [
+        ("query", "ValueError: broken"),
+        ("request", "ValueError: broken"),
+    ]
+
+
+def test_tail_keeps_slow_trace(tracer, exporter: Exporter):
+    tracer = tracer(sample_rate=0, tail_latency=0.01)
+    with tracer.span("fast"):
+        pass
+    with tracer.span("slow"):
+        threading.Event().wait(0.02)
+    assert [[span.name for span in spans] for spans in exporter.traces] == [["slow"]]
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (f"00-{TRACE_ID:032x}-{PARENT_ID:016x}-01", (TRACE_ID, PARENT_ID, True)),
+        (f" 00-{TRACE_ID:032x}-{PARENT_ID:016x}-00 ", (TRACE_ID, PARENT_ID, False)),
+        (f"00-{0:032x}-{PARENT_ID:016x}-01", None),
+        (f"00-{TRACE_ID:032x}-{0:016x}-01", None),
+        (f"000-{TRACE_ID:032x}-{PARENT_ID:016x}-01", None),
+        ("00-xyz-abc-01", None),
+        ("garbage", None),
+    ],
+)
+def test_parse_traceparent(header: str, expected):
+    assert parse_traceparent(header) == expected
+
+
+def test_caller_trace_is_continued(tracer, exporter: Exporter):
+    tracer = tracer(sample_rate=0)
+    # the sampled flag of the caller wins over the sample rate
+    with tracer.start_trace("request", f"00-{TRACE_ID:032x}-{PARENT_ID:016x}-01") as span:
+        assert span.trace.trace_id == TRACE_ID
+        assert span.parent_id == PARENT_ID
+    with tracer.start_trace("request", f"00-{TRACE_ID:032x}-{PARENT_ID:016x}-00"):
+        pass
+    assert len(exporter.traces) == 1
+
+
+async def test_spans_of_gathered_tasks(tracer, exporter: Exporter):
+    tracer = tracer()
+
+    async def query(name: str):
+        with tracer.span(name):
+            await asyncio.sleep(0)
+            with tracer.span(f"{name}.fetch"):
+                await asyncio.sleep(0)
+
+    with tracer.span("request") as root:
+        await asyncio.gather(query("first"), query("second"))
+    spans = {span.name: span for span in exporter.traces[0]}
+    assert root.parent_id is None
+    assert spans["first"].parent_id == spans["second"].parent_id == root.span_id
+    assert spans["first.fetch"].parent_id == spans["first"].span_id
+    assert spans["second.fetch"].parent_id == spans["second"].span_id
+    assert {span.trace.trace_id for span in spans.values()} == {root.trace.trace_id}
+
+
+async def test_traceparent_through_the_middleware(exporter: Exporter):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        with TRACER.span("query"):
+            return {"id": item_id}
+
+    app.add_middleware(TracingMiddleware)
+    client = AsyncClient(transport=ASGITransport(app), base_url="http://test")
+    TRACER.configure(exporter, sample_rate=0)
+    try:
+        headers = {"traceparent": f"00-{TRACE_ID:032x}-{PARENT_ID:016x}-01"}
+        assert (await client.get("/items/1", headers=headers)).status_code == 200
+    finally:
+        TRACER.disable()
+    query, root = exporter.traces[0]
+    assert (root.trace.trace_id, root.parent_id) == (TRACE_ID, PARENT_ID)
+    assert root.name == "GET /items/{item_id}"
+    assert root.attributes["http.status_code"] == 200
+    assert query.parent_id == root.span_id
+
+
+def test_exporter_drops_when_full(tracer):
+    exporter = SpanExporter(lambda batch: None, queue_size=1)
+    tracer = tracer()
+    tracer.exporter = exporter
+    for _ in range(3):
+        with tracer.span("request"):
+            with tracer.span("query"):
+                pass
+    assert exporter.stats == {"exported": 0, "dropped": 4, "failed": 0, "queued": 1}
+
+
+def test_exporter_flushes_on_stop(tracer):
+    batches = []
+    exporter = SpanExporter(batches.append, flush_interval=60)
+    tracer = tracer()
+    tracer.exporter = exporter
+    exporter.start()
+    for _ in range(3):
+        with tracer.span("request"):
+            pass
+    exporter.stop()
+    assert sum(len(batch) for batch in batches) == 3
+    assert exporter.stats["exported"] == 3
+
+
+def test_exporter_counts_failed(tracer):
+    def writer(batch):
+        raise OSError("collector is not available")
+
+    exporter = SpanExporter(writer, batch_size=2, flush_interval=60)
+    tracer = tracer()
+    tracer.exporter = exporter
+    exporter.start()
+    for _ in range(3):
+        with tracer.span("request"):
+            pass
+    exporter.stop()
+    # the thread survives the failed batch and writes the next one
+    assert exporter.stats == {"exported": 0, "dropped": 0, "failed": 3, "queued": 0}
+
+
+def test_otlp_span(tracer):
+    tracer = tracer()
+    with tracer.span("request", route="/items") as root:
+        with tracer.span("query") as child:
+            child.set_error("timeout")
+    root_data, child_data = otlp_span(root), otlp_span(child)
+    assert root_data["kind"] == 2
+    assert "parentSpanId" not in root_data
+    assert root_data["status"] == {"code": 1}
+    assert root_data["traceId"] == f"{root.trace.trace_id:032x}"
+    assert root_data["startTimeUnixNano"] == str(root.start)
+    assert child_data["kind"] == 1
+    assert child_data["parentSpanId"] == f"{root.span_id:016x}"
+    assert child_data["status"] == {"code": 2, "message": "timeout"}
+
+
+def test_otlp_attributes():
+    # bool is an int subclass, it must be checked first
+    assert otlp_attributes({"a": True, "b": 3, "c": 0.5, "d": None}) == [
+        {"key": "a", "value": {"boolValue": True}},
+        {"key": "b", "value": {"intValue": "3"}},
+        {"key": "c", "value": {"doubleValue": 0.5}},
+        {"key": "d", "value": {"stringValue": "None"}},
+    ]
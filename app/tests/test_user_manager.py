@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from pydantic import SecretStr
+from store.cache.accessor import CacheAccessor
+from store.password.accessor import PasswordAccessor
+from store.password.hashers import hash_password
+from store.user_manager.manager import UserManager
+from tests.conftest import FakeApp
+
+EMAIL = "user@example.com"
+
+
+class Services:
+    """Stand-ins of the services used by `create_user`, the calls are recorded."""
+
+    def __init__(self, user=None, send_error: Exception = None):
+        self.user = user
+        self.send_error = send_error
+        self.calls = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def get_user_by_email(self, email):
+        self.calls.append("get_user_by_email")
+        return self.user
+
+    async def create_verification_token(self, user_id, email):
+        self.calls.append("token")
+        return "token"
+
+    async def hash(self, password):
+        self.calls.append("hash")
+        await self.release.wait()
+        return "hash"
+
+    async def send_message_to_confirm_email(self, email, name, token, link):
+        if self.send_error:
+            raise self.send_error
+
+
+@pytest.fixture
+def manager(redis):
+    def create(services: Services) -> UserManager:
+        app = FakeApp()
+        app.redis = SimpleNamespace(connector=redis)
+        app.store = SimpleNamespace(
+            cache=CacheAccessor(app), auth=services, token=services, password=services, ems=services
+        )
+        return UserManager(app)
+
+    return create
+
+
+async def test_concurrent_requests_hash_once(manager, redis):
+    services = Services()
+    services.release.clear()
+    users = manager(services)
+    first = asyncio.create_task(users.create_user("name", EMAIL, "password"))
+    await asyncio.sleep(0.01)
+    with pytest.raises(AssertionError, match="A letter has been sent"):
+        await users.create_user("name", EMAIL, "password")
+    services.release.set()
+    await first
+    assert services.calls.count("get_user_by_email") == 1
+    assert services.calls.count("hash") == 1
+    assert '"password": "hash"' in await redis.get(EMAIL)
+
+
+@pytest.mark.parametrize(
+    "services", [Services(user=object()), Services(send_error=ConnectionError("smtp"))]
+)
+async def test_reservation_is_released_on_error(manager, redis, services: Services):
+    with pytest.raises((AssertionError, ConnectionError)):
+        await manager(services).create_user("name", EMAIL, "password")
+    assert await redis.get(EMAIL) is None
+
+
+async def test_reservation_is_released_on_cancel(manager, redis):
+    services = Services()
+    services.release.clear()
+    task = asyncio.create_task(manager(services).create_user("name", EMAIL, "password"))
+    await asyncio.sleep(0.01)
+    assert await redis.get(EMAIL) == ""
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert await redis.get(EMAIL) is None
+
+
+class Users:
+    """Stand-in of the auth accessor for `login`, keeps one user."""
+
+    def __init__(self, password: str):
+        self.user = SimpleNamespace(
+            id=uuid4(), email=EMAIL, password=password, as_dict=lambda: {"email": EMAIL}
+        )
+        self.updates = []
+
+    async def get_user_by_email(self, email):
+        return self.user
+
+    async def update_password(self, user_id, password):
+        self.updates.append(password)
+        self.user.password = password
+
+    async def update_refresh_token(self, user_id, refresh=None):
+        return self.user
+
+    async def create_access_token(self, user_id, email):
+        return "access"
+
+    async def create_refresh_token(self, user_id, email):
+        return "refresh"
+
+
+@pytest.fixture
+def login():
+    def create(password: str, **settings) -> tuple[UserManager, Users]:
+        app = FakeApp()
+        users = Users(password)
+        passwords = PasswordAccessor(app)
+        passwords.settings = passwords.settings.model_copy(
+            update={"password_scrypt_n": 2**4, "password_pbkdf2_iterations": 10, **settings}
+        )
+        app.store = SimpleNamespace(auth=users, token=users, password=passwords)
+        return UserManager(app), users
+
+    return create
+
+
+@pytest.mark.parametrize(
+    "old",
+    [
+        hashlib.sha256(b"password").hexdigest(),
+        hash_password("password", "pbkdf2_sha256", (10,), b"salt"),
+        hash_password("password", "scrypt", (2**3, 8, 1), b"salt"),
+    ],
+)
+async def test_login_replaces_old_hash(login, old):
+    users, auth = login(old)
+    data, refresh = await users.login(EMAIL, SecretStr("password"))
+    assert (data, refresh) == ({"email": EMAIL, "access_token": "access"}, "refresh")
+    assert len(auth.updates) == 1
+    assert auth.user.password.startswith("scrypt$16$8$1$")
+    await users.login(EMAIL, SecretStr("password"))
+    assert len(auth.updates) == 1
+
+
+async def test_login_wrong_password(login):
+    users, auth = login(hashlib.sha256(b"password").hexdigest())
+    with pytest.raises(AssertionError, match="Password is incorrect"):
+        await users.login(EMAIL, SecretStr("wrong"))
+    assert auth.updates == []
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+
+import pytest
+from base.circuit_breaker import AdaptiveLimiter, ConcurrencyLimitError
+from base.utils import retry_call, run_method
+
+
+class CustomError(Exception):
+    pass
+
+
+def fail():
+    raise CustomError("sync")
+
+
+async def fail_async():
+    raise CustomError("async")
+
+
+@pytest.mark.parametrize("func", [fail, fail_async])
+async def test_run_method_raises_the_original_exception(func):
+    with pytest.raises(CustomError):
+        await run_method(func)
+
+
+async def test_run_method_passes_kwargs():
+    def divide(a, b):
+        return a / b
+
+    assert await run_method(divide, b=4, a=2) == 0.5
+
+
+async def test_retry_call_creates_no_tasks():
+    tasks = len(asyncio.all_tasks())
+
+    async def call(value):
+        assert len(asyncio.all_tasks()) == tasks
+        return value
+
+    assert await retry_call(call, (1,), {}, 10, 2, logging.getLogger(), True) == 1
+    assert len(asyncio.all_tasks()) == tasks
+
+
+async def test_retry_call_gives_up_after_the_deadline():
+    """The pause before a retry is at least 0.1 second, it is after the deadline."""
+    calls = []
+
+    async def call():
+        calls.append(1)
+        raise CustomError("down")
+
+    with pytest.raises(CustomError):
+        await retry_call(call, (), {}, 0.05, 0.1, logging.getLogger(), True)
+    assert await retry_call(call, (), {}, 0.05, 0.1, logging.getLogger(), False) is None
+    assert len(calls) == 2
+
+
+async def test_retry_call_fails_fast_when_the_limit_is_reached(caplog):
+    limiter = AdaptiveLimiter("service", initial_limit=1)
+    release = asyncio.Event()
+
+    async def call():
+        await release.wait()
+
+    busy = asyncio.create_task(
+        retry_call(call, (), {}, 10, 1, logging.getLogger("tests"), True, limiter=limiter)
+    )
+    await asyncio.sleep(0)
+    with caplog.at_level(logging.WARNING, "tests"):
+        started = asyncio.get_running_loop().time()
+        callers = [
+            retry_call(call, (), {}, 10, 0.05, logging.getLogger("tests"), True, limiter=limiter)
+            for _ in range(10)
+        ]
+        results = await asyncio.gather(*callers, return_exceptions=True)
+    assert asyncio.get_running_loop().time() - started < 0.5
+    assert all(isinstance(result, ConcurrencyLimitError) for result in results)
+    # the rejection is an expected overload, not an error of the call
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+    release.set()
+    await busy
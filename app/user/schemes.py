@@ -1,6 +1,5 @@
 """Schemas сервиса Авторизации (AUTH)."""
 from datetime import datetime
-from hashlib import sha256
 from uuid import UUID
 
 from base.type_hint import Sorted_direction
@@ -21,6 +20,11 @@ query_page_size: int = Query(
     gt=0,
     le=100,
 )
+query_cursor: str = Query(
+    default=None,
+    description="Cursor of the previous page, it is returned in the `X-Next-Cursor` header. "
+    "If specified, the page number is ignored",
+)
 query_sort_user_id: Sorted_direction = Query(
     default=None,
     description="Sort unique identification of user",
@@ -75,18 +79,6 @@ class UserPasswordSchema(BaseSchema):
         exclude=True,
     )
 
-    @field_validator("password", "password_confirmation")
-    def hash_passwords(cls, password: str) -> str:  # noqa
-        """Хэшируем пароль.
-
-        Args:
-            password: plain password
-
-        Returns:
-            str:  Hashing password
-        """
-        return sha256(password.encode("utf-8")).hexdigest()
-
     @field_validator("password_confirmation")
     def passwords_match(
         cls,  # noqa
@@ -135,18 +127,6 @@ class UserSchemaLogin(BaseModel):
         description="Пароль, который был указан при регистрации пользователя",
     )
 
-    @field_validator("password")
-    def hash_passwords(cls, password: SecretStr) -> str:  # noqa
-        """Password hashing.
-
-        Args:
-            password: string SecretStr
-
-        Returns:
-            str:  Hashing password
-        """
-        return sha256(password.get_secret_value().encode("utf-8")).hexdigest()
-
 
 class RefreshSchema(BaseSchema):
     """Scheme for returning token after method /refresh."""
@@ -3,16 +3,19 @@ from typing import Any
 
 from base.type_hint import Sorted_direction
 from core.components import Request
+from core.rate_limit import RateLimit
 from core.utils import Token
 from fastapi import APIRouter, Depends, Response
 from fastapi.security import HTTPBearer
 from pydantic import EmailStr
+from store.user.models import UserModel
 from user.schemes import (BaseUserSchema, OkSchema, TokenSchema,
                           UserPasswordSchema, UserSchemaLogin, UserSchemaOut,
-                          UserSchemaRegistration, query_page_number,
-                          query_page_size, query_sort_created,
-                          query_sort_email, query_sort_modified,
-                          query_sort_name, query_sort_user_id)
+                          UserSchemaRegistration, query_cursor,
+                          query_page_number, query_page_size,
+                          query_sort_created, query_sort_email,
+                          query_sort_modified, query_sort_name,
+                          query_sort_user_id)
 from user.utils import (description_create_user, description_login_user,
                         description_logout_user, description_refresh_tokens,
                         description_registration_user)
@@ -22,6 +25,7 @@ auth_route = APIRouter(prefix="/auth", tags=["AUTH"])
 
 @auth_route.post(
     "/create_user",
+    dependencies=[Depends(RateLimit())],
     summary="Создание учетной записи пользователя",
     description=description_create_user,
     response_description="Анкетные данные пользователя, кроме секретных данных.",
@@ -73,6 +77,7 @@ async def user_registration(request: "Request", response: Response) -> Any:
 
 @auth_route.post(
     "/login",
+    dependencies=[Depends(RateLimit())],
     summary="Авторизация",
     description=description_login_user,
     response_description="Анкетные данные пользователя, кроме секретных данных.",
@@ -113,7 +118,7 @@ async def logout(request: "Request", response: Response) -> Any:
         object: OkSchema
     """
     token = request.state.token
-    await request.app.store.auth_manager.logout(token.user_id, token.token, token.exp)
+    await request.app.store.auth_manager.logout(token.user_id, token.jti, token.exp)
     response.set_cookie(key="refresh", httponly=True, max_age=-1)
     return OkSchema(message="Log out user")
 
@@ -160,6 +165,7 @@ def get_token(request: Request, authorization=Depends(HTTPBearer(auto_error=True
 
 @auth_route.get(
     "/reset_password",
+    dependencies=[Depends(RateLimit())],
     summary="Инициализация сброса пароля",
     response_model=OkSchema,
 )
@@ -183,7 +189,9 @@ async def reset_password(request: Request, email: EmailStr) -> Any:
     response_model=OkSchema,
 )
 async def update_password(request: Request, password: UserPasswordSchema) -> Any:
-    await request.app.store.auth.update_password(request.state.user_id, password.password)
+    await request.app.store.auth_manager.update_password(
+        request.state.user_id, password.password
+    )
     return OkSchema(message="Password changed successfully")
 
 
@@ -191,12 +199,14 @@ async def update_password(request: Request, password: UserPasswordSchema) -> Any
     "/users",
     summary="Получить список пользователей",
     description="Получить список зарегистрированных "
-    "пользователей согласно заданным параметрам фильтрации",
+    "пользователей согласно заданным параметрам фильтрации. "
+    "Курсор следующей страницы возвращается в заголовке `X-Next-Cursor`.",
     response_description="Список пользователей",
     response_model=list[BaseUserSchema],
 )
 async def get_users(
     request: Request,
+    response: Response,
     page: int = query_page_number,
     size: int = query_page_size,
     id: Sorted_direction = query_sort_user_id,
@@ -204,11 +214,21 @@ async def get_users(
     name: Sorted_direction = query_sort_name,
     created: Sorted_direction = query_sort_created,
     modified: Sorted_direction = query_sort_modified,
+    cursor: str = query_cursor,
 ) -> Any:
-    sorted_params = {
-        name: value
-        for index, (name, value) in enumerate(locals().items())
-        if int(index) > 2 and value
+    sort_fields = {
+        "id": id,
+        "email": email,
+        "name": name,
+        "created": created,
+        "modified": modified,
     }
-    users_data = await request.app.store.auth.get_users(page - 1, size, sorted_params)
+    sorted_params = {name: value for name, value in sort_fields.items() if value}
+    users_data = await request.app.store.auth.get_users(page - 1, size, sorted_params, cursor)
+    if len(users_data) == size and (
+        next_cursor := request.app.postgres.get_cursor(
+            UserModel, users_data[-1].as_dict(), sorted_params
+        )
+    ):
+        response.headers["X-Next-Cursor"] = next_cursor
     return [BaseUserSchema(execute=["access_token"], **user.as_dict()) for user in users_data]